@@ -95,7 +95,7 @@ modprobe w1-therm
 
 # Create directories
 echo "📁 Creating directories..."
-mkdir -p logs
+mkdir -p logs state
 touch logs/.gitkeep
 
 # Copy config file
@@ -117,6 +117,9 @@ systemctl daemon-reload
 echo "⏰ Enabling timers..."
 systemctl enable pump-morning.timer
 systemctl enable pump-evening.timer
+systemctl enable log-retention.timer
+systemctl enable fermentation-web.service
+systemctl enable pump-resume.service
 echo "✓ Timers enabled (will start on next boot)"
 
 # Test sensor
@@ -133,6 +136,8 @@ echo ""
 echo "📊 Services enabled (will start on reboot):"
 echo "   - pump-morning.timer (09:00)"
 echo "   - pump-evening.timer (21:00)"
+echo "   - log-retention.timer (00:15)"
+echo "   - fermentation-web.service (http://raspberry.lan:8080/)"
 echo ""
 echo "To start services now without rebooting:"
 echo "   sudo ./scripts/start.sh"
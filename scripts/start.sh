@@ -20,6 +20,8 @@ echo ""
 # Start timers
 systemctl start pump-morning.timer && echo "✓ Morning timer started (will run at 09:00)"
 systemctl start pump-evening.timer && echo "✓ Evening timer started (will run at 21:00)"
+systemctl start log-retention.timer && echo "✓ Log retention timer started (will run at 00:15)"
+systemctl start fermentation-web.service && echo "✓ Web dashboard started (port 8080)"
 
 echo ""
 echo "✅ All services started"
@@ -20,10 +20,12 @@ echo ""
 # Stop timers
 systemctl stop pump-morning.timer 2>/dev/null && echo "✓ Morning timer stopped" || echo "  Morning timer not running"
 systemctl stop pump-evening.timer 2>/dev/null && echo "✓ Evening timer stopped" || echo "  Evening timer not running"
+systemctl stop log-retention.timer 2>/dev/null && echo "✓ Log retention timer stopped" || echo "  Log retention timer not running"
 
 # Stop services
 systemctl stop pump-morning.service 2>/dev/null && echo "✓ Morning service stopped" || echo "  Morning service not running"
 systemctl stop pump-evening.service 2>/dev/null && echo "✓ Evening service stopped" || echo "  Evening service not running"
+systemctl stop fermentation-web.service 2>/dev/null && echo "✓ Web dashboard stopped" || echo "  Web dashboard not running"
 
 # Turn off relay
 echo ""
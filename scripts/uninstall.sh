@@ -33,8 +33,10 @@ echo "Stopping services..."
 # Stop and disable timers
 systemctl stop pump-morning.timer 2>/dev/null || true
 systemctl stop pump-evening.timer 2>/dev/null || true
+systemctl stop log-retention.timer 2>/dev/null || true
 systemctl disable pump-morning.timer 2>/dev/null || true
 systemctl disable pump-evening.timer 2>/dev/null || true
+systemctl disable log-retention.timer 2>/dev/null || true
 echo "✓ Timers stopped and disabled"
 
 # Stop and disable services
@@ -42,6 +44,9 @@ systemctl stop pump-morning.service 2>/dev/null || true
 systemctl stop pump-evening.service 2>/dev/null || true
 systemctl disable pump-morning.service 2>/dev/null || true
 systemctl disable pump-evening.service 2>/dev/null || true
+systemctl stop fermentation-web.service 2>/dev/null || true
+systemctl disable fermentation-web.service 2>/dev/null || true
+systemctl disable pump-resume.service 2>/dev/null || true
 echo "✓ Services stopped and disabled"
 
 echo ""
@@ -52,6 +57,10 @@ rm -f /etc/systemd/system/pump-morning.timer
 rm -f /etc/systemd/system/pump-evening.timer
 rm -f /etc/systemd/system/pump-morning.service
 rm -f /etc/systemd/system/pump-evening.service
+rm -f /etc/systemd/system/log-retention.timer
+rm -f /etc/systemd/system/log-retention.service
+rm -f /etc/systemd/system/fermentation-web.service
+rm -f /etc/systemd/system/pump-resume.service
 echo "✓ Service files removed"
 
 # Reload systemd
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Alerts Module
+Deduplicated, rate-limited alerts from controller events, delivered to
+pluggable sinks (command hook, local MTA, webhook) from a background queue
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from settings import load_config
+
+
+SEVERITY_LEVELS = {
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+}
+
+# Conditions raised by the controller
+TEMPERATURE_HIGH = 'temperature_high'
+TEMPERATURE_CRITICAL = 'temperature_critical'
+TEMPERATURE_LOW = 'temperature_low'
+SENSOR_FAILURE = 'sensor_failure'
+CYCLE_ERROR = 'cycle_error'
+
+_STOP = object()
+
+
+class CommandSink:
+    """Runs a local command with the alert as JSON on stdin"""
+
+    def __init__(self, command, timeout=10):
+        """
+        Args:
+            command: Command line; ALERT_* variables are set in its environment
+            timeout: Seconds before the command is killed
+        """
+        self.command = shlex.split(command) if isinstance(command, str) else command
+        self.timeout = timeout
+
+    def send(self, alert):
+        """Run the command, raising on failure or timeout"""
+        env = dict(os.environ)
+        for key in ('condition', 'severity', 'message'):
+            env[f"ALERT_{key.upper()}"] = str(alert[key])
+        subprocess.run(
+            self.command, input=json.dumps(alert).encode('utf-8'),
+            env=env, timeout=self.timeout, check=True,
+            stdout=subprocess.DEVNULL
+        )
+
+
+class EmailSink:
+    """Sends mail through an SMTP server, normally the local MTA"""
+
+    def __init__(self, to, sender=None, host='localhost', port=25, timeout=10):
+        """
+        Args:
+            to: Recipient address or list of addresses
+            sender: From address (default: pump@<hostname>)
+            host: SMTP server
+            port: SMTP port
+            timeout: Connection timeout in seconds
+        """
+        self.to = [to] if isinstance(to, str) else list(to)
+        self.sender = sender or f"pump@{socket.gethostname()}"
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, alert):
+        """Send one mail"""
+        # Imported on first use, they are slow to load and not needed to start
+        import smtplib
+        from email.message import EmailMessage
+
+        msg = EmailMessage()
+        msg['Subject'] = (
+            f"[fermentation] {alert['severity'].upper()}: {alert['condition']}"
+        )
+        msg['From'] = self.sender
+        msg['To'] = ', '.join(self.to)
+        msg.set_content(f"{alert['message']}\n\n{json.dumps(alert, indent=2)}\n")
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(msg)
+
+
+class WebhookSink:
+    """POSTs the alert as JSON"""
+
+    def __init__(self, url, timeout=10):
+        """
+        Args:
+            url: Webhook URL
+            timeout: Request timeout in seconds
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        """POST the alert, raising on HTTP errors"""
+        import urllib.request
+
+        request = urllib.request.Request(
+            self.url, data=json.dumps(alert).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+            resp.read()
+
+
+SINK_TYPES = {
+    'command': CommandSink,
+    'email': EmailSink,
+    'webhook': WebhookSink,
+}
+
+
+def create_sinks(specs, timeout=10):
+    """
+    Build sinks from the 'sinks' list of the alerts section
+
+    Args:
+        specs: List of dicts with a 'type' key plus sink arguments
+        timeout: Default timeout for every sink
+
+    Returns:
+        list: Sinks (invalid entries are logged and skipped)
+    """
+    sinks = []
+    for spec in specs or []:
+        spec = dict(spec)
+        sink_type = spec.pop('type', None)
+        spec.setdefault('timeout', timeout)
+        try:
+            sinks.append(SINK_TYPES[sink_type](**spec))
+        except (KeyError, TypeError) as e:
+            logging.error(f"❌ Invalid alert sink {sink_type!r}: {e}")
+    return sinks
+
+
+class AlertManager:
+    """Tracks alert conditions and queues notifications for the sinks"""
+
+    def __init__(self, config, sinks=None, clock=time):
+        """
+        Initialize the manager and start the dispatcher thread
+
+        Args:
+            config: Configuration dict (alerts and temperature sections)
+            sinks: Sinks to use instead of the configured ones
+            clock: Object providing time()
+        """
+        alert_config = config['alerts']
+        self.temperature = config['temperature']
+        self.enabled = alert_config['enabled']
+        self.hysteresis = alert_config['hysteresis']
+        self.rate_limit = alert_config['rate_limit']
+        self.repeat_interval = alert_config['repeat_interval']
+        self.notify_resolved = alert_config['notify_resolved']
+        self.drain_timeout = alert_config['drain_timeout']
+        self.state_file = Path(alert_config['state_file'])
+        self.clock = clock
+        self.host = socket.gethostname()
+        self.sinks = (
+            sinks if sinks is not None
+            else create_sinks(alert_config['sinks'], alert_config['timeout'])
+        )
+
+        # condition -> {'active', 'notified', 'last_sent', 'suppressed'}
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(alert_config['queue_size'])
+        self._thread = None
+        if self.enabled:
+            self._thread = threading.Thread(
+                target=self._run, name='alerts', daemon=True
+            )
+            self._thread.start()
+
+    def _load_state(self):
+        """Conditions persisted by earlier runs (the controller is a oneshot)"""
+        if not self.enabled:
+            return {}
+        try:
+            return json.loads(self.state_file.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self):
+        """Atomically write the condition state (dispatcher thread only)"""
+        with self._lock:
+            data = json.dumps(self.state)
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_name(self.state_file.name + '.tmp')
+        tmp.write_text(data)
+        os.replace(tmp, self.state_file)
+
+    def _enqueue(self, item):
+        """Hand an item to the dispatcher without ever blocking"""
+        if not self.enabled:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            logging.warning("⚠️ Alert queue full, dropping alert")
+
+    def raise_alert(self, condition, severity, message):
+        """
+        Report that a condition is present
+
+        A condition that is already active is only re-sent every
+        repeat_interval seconds; one that clears and comes back is sent at
+        most every rate_limit seconds. Suppressed alerts are counted and
+        the count is included in the next one.
+
+        Args:
+            condition: Condition name, e.g. TEMPERATURE_HIGH
+            severity: 'info', 'warning', 'error' or 'critical'
+            message: Human-readable text
+
+        Returns:
+            bool: True if the alert was queued for delivery
+        """
+        now = self.clock.time()
+        with self._lock:
+            state = self.state.setdefault(
+                condition, {'active': False, 'notified': False,
+                            'last_sent': 0, 'suppressed': 0}
+            )
+            since_sent = now - state['last_sent']
+            limit = self.repeat_interval if state['active'] else self.rate_limit
+            changed = not state['active']
+            state['active'] = True
+            if since_sent < limit:
+                state['suppressed'] += 1
+                if changed:
+                    state['notified'] = False
+                send = False
+            else:
+                alert = self._alert(condition, severity, message, now,
+                                    state['suppressed'])
+                state['last_sent'] = now
+                state['suppressed'] = 0
+                state['notified'] = True
+                send = True
+
+        if send:
+            logging.log(SEVERITY_LEVELS.get(severity, logging.WARNING),
+                        f"🔔 Alert {condition}: {message}")
+            self._enqueue(alert)
+        elif changed:
+            self._enqueue(None)
+        return send
+
+    def clear(self, condition, message=None):
+        """
+        Report that a condition is no longer present
+
+        Args:
+            condition: Condition name
+            message: Text for the resolved notification
+        """
+        now = self.clock.time()
+        with self._lock:
+            state = self.state.get(condition)
+            if not state or not state['active']:
+                return
+            state['active'] = False
+            # Only resolve what somebody was told about
+            notified = state.get('notified', False)
+            state['notified'] = False
+        logging.info(f"🔕 Alert {condition} resolved")
+        if self.notify_resolved and notified:
+            alert = self._alert(condition, 'info',
+                                message or f"{condition} resolved", now)
+            alert['resolved'] = True
+            self._enqueue(alert)
+        else:
+            self._enqueue(None)
+
+    def _alert(self, condition, severity, message, now, suppressed=0):
+        """Alert payload handed to the sinks"""
+        return {
+            'condition': condition,
+            'severity': severity,
+            'message': message,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)),
+            'host': self.host,
+            'suppressed': suppressed,
+            'resolved': False,
+        }
+
+    def _active(self, condition):
+        """Whether a condition is currently raised"""
+        state = self.state.get(condition)
+        return bool(state and state['active'])
+
+    def check_temperature(self, temp):
+        """
+        Raise or clear the temperature and sensor conditions for a reading
+
+        A condition raised at a threshold only clears once the temperature
+        is `hysteresis` degrees back on the safe side, so a reading
+        hovering around the threshold produces one alert.
+
+        Args:
+            temp: Temperature in C, or None for a failed read
+        """
+        if temp is None:
+            self.raise_alert(SENSOR_FAILURE, 'error', "Cannot read temperature")
+            return
+        self.clear(SENSOR_FAILURE, "Temperature sensor readable again")
+
+        t = self.temperature
+        h = self.hysteresis
+        checks = (
+            (TEMPERATURE_CRITICAL, 'critical', temp > t['max'],
+             temp <= t['max'] - h,
+             f"Critical temperature {temp}C > {t['max']}C, pump stopped"),
+            (TEMPERATURE_HIGH, 'warning', temp > t['warning'],
+             temp < t['warning'] - h,
+             f"High temperature {temp}C > {t['warning']}C"),
+            (TEMPERATURE_LOW, 'warning', temp < t['min'],
+             temp > t['min'] + h,
+             f"Temperature too low {temp}C < {t['min']}C, cycles skipped"),
+        )
+        for condition, severity, present, recovered, message in checks:
+            if present:
+                self.raise_alert(condition, severity, message)
+                # A critical reading is not also reported as high
+                break
+            if recovered and self._active(condition):
+                self.clear(condition, f"Temperature back to {temp}C")
+
+    def _run(self):
+        """Dispatcher: persist state and deliver alerts to every sink"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            try:
+                self._save_state()
+            except OSError as e:
+                logging.error(f"❌ Cannot save alert state: {e}")
+            if item is None:
+                continue
+            for sink in self.sinks:
+                try:
+                    sink.send(item)
+                except Exception as e:
+                    # Never re-alert on a failing sink
+                    logging.error(
+                        f"❌ Alert sink {type(sink).__name__} failed: {e}"
+                    )
+
+    def close(self, timeout=None):
+        """
+        Deliver queued alerts, waiting at most the drain timeout
+
+        Args:
+            timeout: Seconds to wait (default: drain_timeout from config)
+        """
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=1)
+        except queue.Full:
+            pass
+        self._thread.join(self.drain_timeout if timeout is None else timeout)
+        if self._thread.is_alive():
+            logging.warning("⚠️ Alert delivery still pending at exit")
+        self._thread = None
+
+
+def main():
+    """Send a test alert to the configured sinks"""
+    parser = argparse.ArgumentParser(description='Send a test alert')
+    parser.add_argument('--message', default='Test alert from the pump controller')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    config = load_config(args.config)
+    if not config['alerts']['sinks']:
+        print("❌ No alert sinks configured")
+        return 1
+    sinks = create_sinks(config['alerts']['sinks'], config['alerts']['timeout'])
+    alert = {
+        'condition': 'test', 'severity': 'info', 'message': args.message,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'host': socket.gethostname(), 'suppressed': 0, 'resolved': False,
+    }
+    failed = 0
+    for sink in sinks:
+        try:
+            sink.send(alert)
+            print(f"✓ {type(sink).__name__}")
+        except Exception as e:
+            print(f"❌ {type(sink).__name__}: {e}")
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Energy Accounting Module
+Relay on-time, actuation and energy counters kept in a small binary file,
+so duty cycle and relay wear are available without scanning logs
+"""
+
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from settings import load_config
+
+
+_MAGIC = b'FEAC'
+_VERSION = 1
+# magic, version, relay cycles, on seconds, hour buckets, day buckets
+_HEADER = struct.Struct('<4sHQdHH')
+# bucket start (epoch), on seconds, relay cycles
+_BUCKET = struct.Struct('<IdI')
+
+HOUR = 3600
+
+
+def _day_start(epoch):
+    """Local midnight of an epoch timestamp"""
+    day = datetime.fromtimestamp(epoch).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return int(day.timestamp())
+
+
+def _duty(on_seconds, span):
+    """Fraction of a time span the pump was on"""
+    if span <= 0:
+        return 0.0
+    # Monotonic durations can drift slightly from wall-clock bucket edges
+    return round(min(1.0, on_seconds / span), 4)
+
+
+class RelayAccounting:
+    """Cumulative and bucketed relay counters"""
+
+    def __init__(self, path, flush_interval=60, hourly_buckets=168,
+                 daily_buckets=400, clock=time):
+        """
+        Initialize the counters from disk
+
+        Args:
+            path: Counter file (persistent storage)
+            flush_interval: Minimum seconds between writes while the pump
+                is on; transitions are always written
+            hourly_buckets: Hours of per-hour history kept
+            daily_buckets: Days of per-day history kept
+            clock: Object providing monotonic() and time()
+        """
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.hourly_buckets = hourly_buckets
+        self.daily_buckets = daily_buckets
+        self.clock = clock
+        self.cycles = 0
+        self.on_seconds = 0.0
+        # bucket start -> [on seconds, relay cycles]
+        self.hours = {}
+        self.days = {}
+        self._on_since = None
+        self._last_flush = 0.0
+        self.load()
+
+    def load(self):
+        """Read the counters (missing or unreadable file starts from zero)"""
+        try:
+            data = self.path.read_bytes()
+            magic, version, cycles, on_seconds, n_hours, n_days = \
+                _HEADER.unpack_from(data)
+            if magic != _MAGIC or version != _VERSION:
+                return
+            offset = _HEADER.size
+            hours, days = {}, {}
+            for buckets, count in ((hours, n_hours), (days, n_days)):
+                for _ in range(count):
+                    start, seconds, n = _BUCKET.unpack_from(data, offset)
+                    buckets[start] = [seconds, n]
+                    offset += _BUCKET.size
+        except (FileNotFoundError, struct.error):
+            return
+        except OSError as e:
+            logging.error(f"❌ Could not read energy counters {self.path}: {e}")
+            return
+        self.cycles = cycles
+        self.on_seconds = on_seconds
+        self.hours = hours
+        self.days = days
+
+    def flush(self):
+        """
+        Atomically write the counters
+
+        Best effort: a failing card is logged and never stops the pump, only
+        the on-time since the last successful write is at risk.
+        """
+        self._prune(self.hours, self.hourly_buckets)
+        self._prune(self.days, self.daily_buckets)
+        data = bytearray(_HEADER.pack(
+            _MAGIC, _VERSION, self.cycles, self.on_seconds,
+            len(self.hours), len(self.days)
+        ))
+        for buckets in (self.hours, self.days):
+            for start in sorted(buckets):
+                seconds, n = buckets[start]
+                data += _BUCKET.pack(start, seconds, n)
+
+        # Also after a failure, so a dead card is not retried on every check
+        self._last_flush = self.clock.monotonic()
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"❌ Could not write energy counters {self.path}: {e}")
+
+    @staticmethod
+    def _prune(buckets, keep):
+        """Drop the oldest buckets beyond the history size"""
+        for start in sorted(buckets)[:-keep or None]:
+            del buckets[start]
+
+    def _add(self, buckets, start, seconds, cycles):
+        """Add to one bucket, creating it if needed"""
+        bucket = buckets.setdefault(start, [0.0, 0])
+        bucket[0] += seconds
+        bucket[1] += cycles
+
+    def _credit(self, start, seconds):
+        """Add on-time beginning at a wall-clock epoch, split per bucket"""
+        self.on_seconds += seconds
+        end = start + seconds
+        while start < end:
+            hour = int(start // HOUR) * HOUR
+            day = _day_start(start)
+            part = min(end, hour + HOUR, day + 86400) - start
+            self._add(self.hours, hour, part, 0)
+            self._add(self.days, day, part, 0)
+            start += part
+
+    def relay_on(self):
+        """Record an OFF -> ON transition"""
+        if self._on_since is not None:
+            return
+        now = self.clock.time()
+        self._on_since = (self.clock.monotonic(), now)
+        self.cycles += 1
+        self._add(self.hours, int(now // HOUR) * HOUR, 0.0, 1)
+        self._add(self.days, _day_start(now), 0.0, 1)
+        self.flush()
+
+    def checkpoint(self, force=False):
+        """
+        Credit on-time so far and write it if flush_interval has passed
+
+        Only time already credited survives a crash, so this is called
+        from the monitoring loop.
+
+        Args:
+            force: Write regardless of flush_interval
+        """
+        if self._on_since is not None:
+            since, wall = self._on_since
+            now = self.clock.monotonic()
+            # Measured on the monotonic clock, bucketed by wall time
+            self._credit(wall, now - since)
+            self._on_since = (now, wall + (now - since))
+        if force or self.clock.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def relay_off(self):
+        """Record an ON -> OFF transition (no-op if already off)"""
+        if self._on_since is None:
+            return
+        self.checkpoint(force=True)
+        self._on_since = None
+
+
+class EnergyReport:
+    """Duty cycle, energy and relay wear computed from the counters"""
+
+    def __init__(self, config, accounting=None):
+        """
+        Initialize the report
+
+        Args:
+            config: Configuration dict
+            accounting: RelayAccounting to report on (default: read the
+                counter file from the energy section)
+        """
+        energy = config['energy']
+        self.watts = energy['pump_watts']
+        self.rated_cycles = energy['relay_rated_cycles']
+        self.batches = config.get('batches') or []
+        self.accounting = accounting or RelayAccounting(
+            energy['path'], hourly_buckets=energy['hourly_buckets'],
+            daily_buckets=energy['daily_buckets']
+        )
+
+    def refresh(self):
+        """Re-read the counters written by the controller process"""
+        self.accounting.load()
+
+    def kwh(self, seconds):
+        """Energy used by the pump running for some seconds"""
+        return round(seconds / 3600 * self.watts / 1000, 4)
+
+    def _series(self, buckets, length, count, now):
+        """Last `count` buckets ending with the current one"""
+        current = int(now // HOUR) * HOUR if length == HOUR else _day_start(now)
+        series = []
+        start = current
+        for _ in range(count):
+            seconds, cycles = buckets.get(start, (0.0, 0))
+            # The current bucket is only partly over
+            span = min(length, now - start) if start == current else length
+            series.append({
+                'start': datetime.fromtimestamp(start).isoformat(timespec='minutes'),
+                'on_seconds': round(seconds, 1),
+                'cycles': cycles,
+                'duty_cycle': _duty(seconds, span),
+                'kwh': self.kwh(seconds),
+            })
+            start = (start - HOUR if length == HOUR
+                     else _day_start(start - 1))
+        return list(reversed(series))
+
+    def _batch(self, batch, now):
+        """Totals of the days a batch covers"""
+        start = datetime.fromisoformat(str(batch['start']))
+        # The end day is part of the batch
+        end = (
+            datetime.fromisoformat(str(batch['end'])) + timedelta(days=1)
+            if batch.get('end') else datetime.fromtimestamp(now)
+        )
+        first, last = int(start.timestamp()), int(end.timestamp())
+        seconds = cycles = 0
+        for day, (on, n) in self.accounting.days.items():
+            if first <= day < last:
+                seconds += on
+                cycles += n
+        span = min(last, now) - first
+        return {
+            'name': batch['name'],
+            'on_seconds': round(seconds, 1),
+            'cycles': cycles,
+            'duty_cycle': _duty(seconds, span),
+            'kwh': self.kwh(seconds),
+        }
+
+    def summary(self, hours=24, days=30, now=None):
+        """
+        Counters as a JSON-friendly dict
+
+        Args:
+            hours: Hourly buckets to include
+            days: Daily buckets to include
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            dict: totals, relay wear, hourly/daily series and batches
+        """
+        acc = self.accounting
+        now = now if now is not None else time.time()
+        return {
+            'pump_watts': self.watts,
+            'on_hours': round(acc.on_seconds / 3600, 3),
+            'kwh': self.kwh(acc.on_seconds),
+            'relay_cycles': acc.cycles,
+            'relay_rated_cycles': self.rated_cycles,
+            'relay_life_used': round(acc.cycles / self.rated_cycles, 6),
+            'hourly': self._series(acc.hours, HOUR, hours, now),
+            'daily': self._series(acc.days, 86400, days, now),
+            'batches': [self._batch(b, now) for b in self.batches],
+        }
+
+    def metrics(self):
+        """
+        Counters in Prometheus text exposition format
+
+        Returns:
+            str: Metrics text
+        """
+        acc = self.accounting
+        now = time.time()
+        today = acc.days.get(_day_start(now), (0.0, 0))[0]
+        hour = acc.hours.get(int(now // HOUR) * HOUR, (0.0, 0))[0]
+        lines = [
+            '# TYPE fermentation_pump_on_seconds_total counter',
+            f'fermentation_pump_on_seconds_total {acc.on_seconds:.1f}',
+            '# TYPE fermentation_pump_energy_kwh_total counter',
+            f'fermentation_pump_energy_kwh_total {self.kwh(acc.on_seconds)}',
+            '# TYPE fermentation_relay_cycles_total counter',
+            f'fermentation_relay_cycles_total {acc.cycles}',
+            '# TYPE fermentation_relay_life_used_ratio gauge',
+            f'fermentation_relay_life_used_ratio {acc.cycles / self.rated_cycles:.6f}',
+            '# TYPE fermentation_pump_duty_cycle gauge',
+            f'fermentation_pump_duty_cycle{{window="hour"}} '
+            f'{_duty(hour, now % HOUR):.4f}',
+            f'fermentation_pump_duty_cycle{{window="day"}} '
+            f'{_duty(today, now - _day_start(now)):.4f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def main():
+    """Print energy and duty-cycle accounting"""
+    parser = argparse.ArgumentParser(description='Pump energy and relay wear')
+    parser.add_argument('--days', type=int, default=7, help='Days to show')
+    parser.add_argument('--json', action='store_true', help='Print JSON')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+
+    report = EnergyReport(load_config(args.config))
+    summary = report.summary(days=args.days)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    print(f"⚡ Pump: {summary['on_hours']} h, {summary['kwh']} kWh "
+          f"at {summary['pump_watts']} W")
+    print(f"🔁 Relay: {summary['relay_cycles']}/{summary['relay_rated_cycles']} "
+          f"cycles ({summary['relay_life_used']:.2%} of rated life)")
+    for day in summary['daily']:
+        print(f"   {day['start'][:10]}  duty {day['duty_cycle']:6.2%}  "
+              f"{day['cycles']:3d} cycles  {day['kwh']:.3f} kWh")
+    for batch in summary['batches']:
+        print(f"🥬 {batch['name']}: duty {batch['duty_cycle']:.2%}, "
+              f"{batch['cycles']} cycles, {batch['kwh']:.3f} kWh")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+History Export Module
+Streams temperature history and cycle events as chunked columnar files
+(Parquet/Arrow IPC when pyarrow is installed, otherwise gzip CSV) with
+incremental "since last export" cursors
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import log_history
+from settings import load_config
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+COLUMNS = ['time', 'kind', 'temperature', 't_min', 't_max', 'samples']
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow', 'csv': 'csv.gz'}
+
+
+def iter_rows(log_file, archive_dir=None, since=None, until=None):
+    """
+    Stream history as export rows
+
+    Args:
+        log_file: Path to the live log
+        archive_dir: Directory with compressed archives
+        since: Only rows at or after this datetime
+        until: Only rows before this datetime
+
+    Yields:
+        tuple: (time, kind, temperature, t_min, t_max, samples)
+    """
+    for when, kind, value in log_history.iter_events(
+            log_file, since, until, archive_dir):
+        if kind == log_history.TEMPERATURE:
+            yield when, kind, value, value, value, 1
+        elif kind == log_history.TEMPERATURE_ROLLUP:
+            t_min, t_max, t_mean, count = value
+            yield when, kind, t_mean, t_min, t_max, count
+        else:
+            yield when, kind, None, None, None, None
+
+
+def _csv_row(row):
+    """Format an export row for the CSV writer"""
+    return [row[0].strftime(TIME_FORMAT)] + [
+        '' if value is None else value for value in row[1:]
+    ]
+
+
+def write_csv(rows, fileobj):
+    """
+    Write rows as gzip-compressed CSV to a binary stream
+
+    Args:
+        rows: Iterable of export rows
+        fileobj: Binary file-like object
+
+    Returns:
+        int: Number of rows written
+    """
+    count = 0
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as gz:
+        text = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow(_csv_row(row))
+            count += 1
+        text.flush()
+        text.detach()
+    return count
+
+
+class ChunkWriter:
+    """Writes one time chunk to a file in the chosen format"""
+
+    def __init__(self, path, fmt):
+        """
+        Initialize the writer
+
+        Args:
+            path: Output file path
+            fmt: 'parquet', 'arrow' or 'csv'
+        """
+        self.path = Path(path)
+        self.fmt = fmt
+        self.count = 0
+        self._tmp = self.path.with_name(self.path.name + '.tmp')
+        if fmt == 'csv':
+            self._file = open(self._tmp, 'wb')
+            self._gz = gzip.GzipFile(fileobj=self._file, mode='wb')
+            self._text = io.TextIOWrapper(self._gz, encoding='utf-8', newline='')
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(COLUMNS)
+        else:
+            # Columns for one chunk only, so memory is bounded by chunk size
+            self._columns = [[] for _ in COLUMNS]
+
+    def add(self, row):
+        """Append one row"""
+        if self.fmt == 'csv':
+            self._csv.writerow(_csv_row(row))
+        else:
+            for column, value in zip(self._columns, row):
+                column.append(value)
+        self.count += 1
+
+    def close(self):
+        """Finish the file and move it into place"""
+        if self.fmt == 'csv':
+            self._text.flush()
+            self._text.detach()
+            self._gz.close()
+            self._file.close()
+        else:
+            table = pyarrow.table({
+                'time': pyarrow.array(self._columns[0], pyarrow.timestamp('s')),
+                'kind': pyarrow.array(self._columns[1], pyarrow.string()),
+                'temperature': pyarrow.array(self._columns[2], pyarrow.float32()),
+                't_min': pyarrow.array(self._columns[3], pyarrow.float32()),
+                't_max': pyarrow.array(self._columns[4], pyarrow.float32()),
+                'samples': pyarrow.array(self._columns[5], pyarrow.int32()),
+            })
+            if self.fmt == 'parquet':
+                pyarrow.parquet.write_table(table, self._tmp, compression='zstd')
+            else:
+                options = pyarrow.ipc.IpcWriteOptions(compression='zstd')
+                with pyarrow.ipc.new_file(self._tmp, table.schema,
+                                          options=options) as writer:
+                    writer.write_table(table)
+            self._columns = None
+        os.replace(self._tmp, self.path)
+
+
+class HistoryExporter:
+    """Chunked export of the stored history"""
+
+    def __init__(self, config, output_dir, fmt='auto', chunk_hours=24):
+        """
+        Initialize the exporter
+
+        Args:
+            config: Configuration dict
+            output_dir: Directory for exported chunks
+            fmt: 'parquet', 'arrow', 'csv' or 'auto'
+            chunk_hours: Hours of history per output file
+        """
+        if fmt == 'auto':
+            fmt = 'parquet' if pyarrow is not None else 'csv'
+        if fmt in ('parquet', 'arrow') and pyarrow is None:
+            raise RuntimeError(f"pyarrow is required for {fmt} export")
+        self.log_file = config['logging']['pump_log']
+        self.archive_dir = config['retention']['archive_dir']
+        self.output_dir = Path(output_dir)
+        self.fmt = fmt
+        self.chunk = timedelta(hours=chunk_hours)
+
+    def _chunk_start(self, when):
+        """Start of the chunk a timestamp belongs to"""
+        day = datetime(when.year, when.month, when.day)
+        return day + ((when - day) // self.chunk) * self.chunk
+
+    def export(self, since=None, until=None):
+        """
+        Export rows in [since, until) as one file per chunk
+
+        Args:
+            since: First datetime to export (default: beginning)
+            until: End datetime, exclusive (default: now)
+
+        Returns:
+            list: Paths of written files
+        """
+        until = until or datetime.now().replace(microsecond=0)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        writer = None
+        current = None
+
+        for row in iter_rows(self.log_file, self.archive_dir, since, until):
+            chunk = self._chunk_start(row[0])
+            if chunk != current:
+                if writer:
+                    writer.close()
+                    files.append(writer.path)
+                current = chunk
+                name = f"history_{chunk:%Y%m%d_%H%M}"
+                if since and chunk < since:
+                    # Partial chunk continuing an earlier export
+                    name += f"_from_{since:%H%M%S}"
+                path = self.output_dir / f"{name}.{EXTENSIONS[self.fmt]}"
+                writer = ChunkWriter(path, self.fmt)
+            writer.add(row)
+
+        if writer:
+            writer.close()
+            files.append(writer.path)
+        return files
+
+
+class ExportCursor:
+    """Remembers where the last export stopped"""
+
+    def __init__(self, path):
+        """
+        Initialize the cursor
+
+        Args:
+            path: Cursor file path
+        """
+        self.path = Path(path)
+
+    def load(self):
+        """
+        Returns:
+            datetime: End of the last export or None
+        """
+        try:
+            data = json.loads(self.path.read_text())
+            return datetime.strptime(data['until'], TIME_FORMAT)
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def save(self, until):
+        """Atomically store the end of an export"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps({'until': until.strftime(TIME_FORMAT)}))
+        os.replace(tmp, self.path)
+
+
+def safe_until(margin=5):
+    """
+    Export end that excludes lines still being written
+
+    Args:
+        margin: Seconds to stay behind the current time
+
+    Returns:
+        datetime: Exclusive end of the export window
+    """
+    return datetime.now().replace(microsecond=0) - timedelta(seconds=margin)
+
+
+def pull_remote(url, output_dir, cursor):
+    """
+    Download new history from a controller's /api/export endpoint
+
+    Args:
+        url: Base URL of the web dashboard, e.g. http://raspberry.lan:8080
+        output_dir: Local directory for the downloaded chunk
+        cursor: ExportCursor stored on this machine
+
+    Returns:
+        Path: Downloaded file or None if there was nothing new
+    """
+    params = {}
+    since = cursor.load()
+    if since:
+        params['since'] = since.strftime(TIME_FORMAT)
+    query = f"?{urllib.parse.urlencode(params)}" if params else ''
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with urllib.request.urlopen(f"{url.rstrip('/')}/api/export{query}") as resp:
+        until = datetime.strptime(resp.headers['X-Export-Until'], TIME_FORMAT)
+        start = since.strftime('%Y%m%d_%H%M%S') if since else 'start'
+        name = f"history_{start}_{until:%Y%m%d_%H%M%S}.csv.gz"
+        path = output_dir / name
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            while True:
+                block = resp.read(65536)
+                if not block:
+                    break
+                f.write(block)
+
+    with gzip.open(tmp, 'rt', encoding='utf-8') as f:
+        rows = sum(1 for _ in f) - 1
+    if rows <= 0:
+        tmp.unlink()
+        cursor.save(until)
+        return None
+    os.replace(tmp, path)
+    cursor.save(until)
+    return path
+
+
+def main():
+    """Export history"""
+    parser = argparse.ArgumentParser(description='Export fermentation history')
+    parser.add_argument('--output', default='export', help='Output directory')
+    parser.add_argument('--format', choices=['auto', 'parquet', 'arrow', 'csv'],
+                        default='auto')
+    parser.add_argument('--since', help="Start 'YYYY-MM-DD[ HH:MM:SS]'")
+    parser.add_argument('--until', help="End, exclusive 'YYYY-MM-DD[ HH:MM:SS]'")
+    parser.add_argument('--incremental', action='store_true',
+                        help='Continue from the last export cursor')
+    parser.add_argument('--remote', help='Pull from a controller web dashboard URL')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    export_config = config['export']
+
+    if args.remote:
+        cursor = ExportCursor(Path(args.output) / '.cursor.json')
+        path = pull_remote(args.remote, args.output, cursor)
+        print(f"✓ Downloaded: {path}" if path else "✓ No new history")
+        return 0
+
+    cursor = ExportCursor(export_config['cursor_file'])
+    since = datetime.fromisoformat(args.since) if args.since else None
+    if args.incremental:
+        since = cursor.load() or since
+    until = datetime.fromisoformat(args.until) if args.until else safe_until()
+
+    exporter = HistoryExporter(
+        config, args.output, args.format, export_config['chunk_hours']
+    )
+    files = exporter.export(since, until)
+    if args.incremental:
+        cursor.save(until)
+
+    for path in files:
+        print(f"✓ {path}")
+    if not files:
+        print("✓ No new history")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fleet Aggregator Module
+Follows the Server-Sent Event streams of many controllers from one
+asyncio process and merges them into a fleet view, a merged stream and
+a daily CSV store
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import random
+import sys
+import time
+import urllib.parse
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from settings import load_config
+
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+STORE_COLUMNS = ['time', 'node', 'kind', 'state', 'temperature']
+
+
+class NodeStatus:
+    """Latest known state of one controller"""
+
+    __slots__ = ('name', 'url', 'connected', 'state', 'temperature', 'time',
+                 'last_seen', 'reconnects', 'error')
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+        self.connected = False
+        self.state = None
+        self.temperature = None
+        self.time = None
+        self.last_seen = None
+        self.reconnects = 0
+        self.error = None
+
+    def to_dict(self):
+        """JSON-friendly view"""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def parse_node(entry):
+    """
+    Node entry from the fleet section
+
+    Args:
+        entry: 'host[:port]', a URL, or a dict with 'url' and optional 'name'
+
+    Returns:
+        tuple: (name, host, port)
+    """
+    if isinstance(entry, dict):
+        name, url = entry.get('name'), entry['url']
+    else:
+        name, url = None, str(entry)
+    if '//' not in url:
+        url = f"http://{url}"
+    parts = urllib.parse.urlsplit(url)
+    host, port = parts.hostname, parts.port or 8080
+    return name or f"{host}:{port}", host, port
+
+
+def check_event(event, data):
+    """
+    Validate the data of one node event before it is merged
+
+    Args:
+        event: SSE event name
+        data: Decoded event data
+
+    Raises:
+        ValueError: Data the fleet view or the store cannot hold
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"{event} event data is not an object")
+    if event == 'state' and 'state' not in data:
+        raise ValueError("state event without a state")
+    state = data.get('state')
+    if state is not None and not isinstance(state, str):
+        raise ValueError(f"bad state {state!r}")
+    temp = data.get('temperature')
+    if temp is not None and (isinstance(temp, bool)
+                             or not isinstance(temp, (int, float))):
+        raise ValueError(f"bad temperature {temp!r}")
+    when = data.get('time')
+    if when is not None:
+        # Also names the store's day file, so only the exact format
+        try:
+            datetime.strptime(when, TIME_FORMAT)
+        except (TypeError, ValueError):
+            raise ValueError(f"bad time {when!r}") from None
+
+
+class FleetStore:
+    """Buffered daily CSV files of fleet readings and state changes"""
+
+    def __init__(self, store_dir):
+        """
+        Args:
+            store_dir: Directory for fleet-YYYY-MM-DD.csv files
+        """
+        self.store_dir = Path(store_dir)
+        self._rows = []
+
+    def add(self, when, node, kind, state=None, temperature=None):
+        """Queue one row (written on the next flush)"""
+        self._rows.append((when, node, kind, state, temperature))
+
+    def flush(self):
+        """
+        Append queued rows to their day files
+
+        Each day is written on its own, a day that cannot be written is
+        logged and dropped without losing the others.
+
+        Returns:
+            int: Rows written
+        """
+        rows, self._rows = self._rows, []
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row[0][:10], []).append(row)
+        written = 0
+        for day, day_rows in by_day.items():
+            path = self.store_dir / f"fleet-{day}.csv"
+            try:
+                self.store_dir.mkdir(parents=True, exist_ok=True)
+                new = not path.exists()
+                with open(path, 'a', newline='') as f:
+                    writer = csv.writer(f)
+                    if new:
+                        writer.writerow(STORE_COLUMNS)
+                    writer.writerows(
+                        ['' if value is None else value for value in row]
+                        for row in day_rows
+                    )
+            except OSError as e:
+                logging.error(f"❌ Cannot write fleet store {path}: {e}")
+                continue
+            written += len(day_rows)
+        return written
+
+
+class NodeClient:
+    """Persistent connection to one controller's /events stream"""
+
+    def __init__(self, name, host, port, aggregator):
+        """
+        Args:
+            name: Node name shown in the fleet view
+            host: Controller host
+            port: Controller web dashboard port
+            aggregator: FleetAggregator receiving the events
+        """
+        self.name = name
+        self.host = host
+        self.port = port
+        self.aggregator = aggregator
+        self.status = NodeStatus(name, f"http://{host}:{port}/")
+
+    async def run(self):
+        """Follow the stream forever, reconnecting with backoff"""
+        config = self.aggregator.config
+        failures = 0
+        while True:
+            started = time.monotonic()
+            try:
+                await self._follow()
+                self.status.error = 'stream closed'
+            except (OSError, asyncio.TimeoutError, ValueError) as e:
+                self.status.error = str(e) or type(e).__name__
+            except Exception as e:
+                # A bug must not end the task, gather() would stop the fleet
+                self.status.error = f"{type(e).__name__}: {e}"
+                logging.exception(f"❌ {self.name} failed")
+            if self.status.connected:
+                self.status.connected = False
+                self.aggregator.node_changed(self.status)
+                logging.warning(f"⚠️ {self.name} disconnected: {self.status.error}")
+
+            # A connection that stayed up for a while resets the backoff
+            if time.monotonic() - started > config['reconnect_max']:
+                failures = 0
+            delay = min(config['reconnect_max'],
+                        config['reconnect_min'] * 2 ** failures)
+            failures += 1
+            self.status.reconnects += 1
+            # Jitter keeps dozens of nodes from reconnecting in lockstep
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def _follow(self):
+        """Connect, then read events until the stream ends"""
+        config = self.aggregator.config
+        # Bounded number of simultaneous connection attempts
+        async with self.aggregator.connecting:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                config['connect_timeout']
+            )
+        try:
+            writer.write(
+                f"GET /events HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Accept: text/event-stream\r\n\r\n".encode('ascii')
+            )
+            await writer.drain()
+            read_timeout = config['read_timeout']
+
+            status_line = await asyncio.wait_for(reader.readline(), read_timeout)
+            if b' 200 ' not in status_line:
+                raise ValueError(f"unexpected response {status_line.strip()!r}")
+            while (await asyncio.wait_for(reader.readline(), read_timeout)).strip():
+                pass
+
+            self.status.connected = True
+            self.status.error = None
+            logging.info(f"🔗 {self.name} connected")
+            event, data = 'message', []
+            while True:
+                line = await asyncio.wait_for(reader.readline(), read_timeout)
+                if not line:
+                    return
+                self.status.last_seen = datetime.now().strftime(TIME_FORMAT)
+                line = line.decode('utf-8', errors='replace').rstrip('\r\n')
+                if not line:
+                    if data:
+                        self.aggregator.node_event(
+                            self.status, event, json.loads('\n'.join(data))
+                        )
+                    event, data = 'message', []
+                elif line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    data.append(line[5:].strip())
+                # ':' comment lines are keepalives
+        finally:
+            writer.close()
+
+
+class FleetAggregator:
+    """Merged view of all nodes"""
+
+    def __init__(self, config):
+        """
+        Args:
+            config: Configuration dict (fleet section)
+        """
+        self.config = config['fleet']
+        self.store = FleetStore(self.config['store_dir'])
+        self.clients = [
+            NodeClient(*parse_node(entry), self)
+            for entry in self.config['nodes']
+        ]
+        self.connecting = asyncio.Semaphore(self.config['max_connecting'])
+        self._subscribers = set()
+
+    def view(self):
+        """
+        Fleet view
+
+        Returns:
+            dict: Counts and per-node status
+        """
+        nodes = [client.status.to_dict() for client in self.clients]
+        return {
+            'time': datetime.now().strftime(TIME_FORMAT),
+            'nodes': len(nodes),
+            'connected': sum(1 for n in nodes if n['connected']),
+            'running': sum(1 for n in nodes
+                           if n['connected'] and n['state'] not in (None, 'idle')),
+            'status': nodes,
+        }
+
+    def table(self):
+        """Fleet view as a text table"""
+        lines = [f"{'NODE':24} {'LINK':5} {'STATE':14} {'TEMP':>7}  UPDATED"]
+        for client in self.clients:
+            s = client.status
+            temp = f"{s.temperature:.1f}C" if s.temperature is not None else 'N/A'
+            lines.append(
+                f"{s.name[:24]:24} {'up' if s.connected else 'DOWN':5} "
+                f"{(s.state or '-')[:14]:14} {temp:>7}  {s.time or '-'}"
+            )
+        return '\n'.join(lines) + '\n'
+
+    def _publish(self, event, data):
+        """Send an event to every merged-stream subscriber"""
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # Slow client: make room for the end marker and drop it
+                self._subscribers.discard(subscriber)
+                subscriber.get_nowait()
+                subscriber.put_nowait(None)
+
+    def node_changed(self, status):
+        """Publish a connection change"""
+        self._publish('node', status.to_dict())
+
+    def node_event(self, status, event, data):
+        """
+        Merge one event from a node
+
+        Args:
+            status: NodeStatus of the node
+            event: SSE event name
+            data: Decoded event data
+
+        Raises:
+            ValueError: Malformed event, the connection is dropped
+        """
+        check_event(event, data)
+        when = data.get('time') or datetime.now().strftime(TIME_FORMAT)
+        if event == 'snapshot':
+            if 'state' in data:
+                status.state = data['state']
+                status.temperature = data.get('temperature')
+                status.time = when
+            self.node_changed(status)
+        elif event == 'state':
+            status.state = data['state']
+            status.time = when
+            self.store.add(when, status.name, 'state', state=status.state)
+            self._publish('state', {'node': status.name, **data})
+        elif event == 'reading':
+            status.temperature = data.get('temperature')
+            status.time = when
+            self.store.add(when, status.name, 'reading',
+                           temperature=status.temperature)
+            self._publish('reading', {'node': status.name, **data})
+
+    async def _flush_loop(self):
+        """Write stored rows every flush_interval seconds"""
+        while True:
+            await asyncio.sleep(self.config['flush_interval'])
+            self.store.flush()
+
+    async def _handle_http(self, reader, writer):
+        """Minimal HTTP: / (table), /api/fleet (JSON), /events (merged SSE)"""
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request.decode('ascii', errors='replace').split()
+            path = parts[1].split('?', 1)[0] if len(parts) > 1 else '/'
+
+            if path == '/events':
+                await self._stream(writer)
+                return
+            if path == '/api/fleet':
+                body, content_type = json.dumps(self.view()).encode(), 'application/json'
+            elif path == '/':
+                body, content_type = self.table().encode(), 'text/plain; charset=utf-8'
+            else:
+                writer.write(b"HTTP/1.0 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                return
+            writer.write(
+                f"HTTP/1.0 200 OK\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer):
+        """Merged SSE stream of all nodes for one client"""
+        subscriber = asyncio.Queue(self.config['client_queue_size'])
+        self._subscribers.add(subscriber)
+        try:
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/event-stream\r\n"
+                         b"Cache-Control: no-cache\r\n\r\n")
+            writer.write(f"event: fleet\ndata: {json.dumps(self.view())}\n\n".encode())
+            await writer.drain()
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), 15)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                    await writer.drain()
+                    continue
+                if message is None:
+                    break
+                event, data = message
+                writer.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                await writer.drain()
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def run(self):
+        """Follow all nodes and serve the fleet view until cancelled"""
+        server = await asyncio.start_server(
+            self._handle_http, self.config['host'], self.config['port']
+        )
+        logging.info(
+            f"🛰️  Following {len(self.clients)} nodes, fleet view on "
+            f"http://{self.config['host']}:{self.config['port']}/"
+        )
+        tasks = [asyncio.create_task(client.run()) for client in self.clients]
+        tasks.append(asyncio.create_task(self._flush_loop()))
+        try:
+            async with server:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.store.flush()
+
+
+async def stand_in_node(host, port, name, interval=1.0):
+    """
+    Local stand-in for a controller's /events stream, for testing
+
+    Args:
+        host: Address to listen on
+        port: Port to listen on
+        name: Label used to vary the simulated readings
+        interval: Seconds between readings
+
+    Returns:
+        asyncio.Server: Running server
+    """
+    rng = random.Random(name)
+    temp = rng.uniform(18, 24)
+
+    async def handle(reader, writer):
+        nonlocal temp
+        try:
+            while (await reader.readline()).strip():
+                pass
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/event-stream\r\n\r\n")
+            state = 'idle'
+
+            def event(kind, data):
+                writer.write(f"event: {kind}\ndata: {json.dumps(data)}\n\n".encode())
+
+            now = datetime.now().strftime(TIME_FORMAT)
+            event('snapshot', {'state': state, 'temperature': round(temp, 2),
+                               'time': now})
+            while True:
+                await writer.drain()
+                await asyncio.sleep(interval)
+                now = datetime.now().strftime(TIME_FORMAT)
+                temp += rng.uniform(-0.1, 0.1)
+                if rng.random() < 0.05:
+                    state = 'monitoring' if state == 'idle' else 'idle'
+                    event('state', {'state': state, 'time': now})
+                event('reading', {'temperature': round(temp, 2), 'time': now})
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def simulate(config, count, base_port):
+    """Run `count` stand-in nodes and an aggregator following them"""
+    servers = [
+        await stand_in_node('127.0.0.1', base_port + i, f"sim-{i}")
+        for i in range(count)
+    ]
+    config['fleet']['nodes'] = [
+        {'name': f"sim-{i}", 'url': f"127.0.0.1:{base_port + i}"}
+        for i in range(count)
+    ]
+    try:
+        await FleetAggregator(config).run()
+    finally:
+        for server in servers:
+            server.close()
+
+
+def main():
+    """Run the fleet aggregator"""
+    parser = argparse.ArgumentParser(description='Aggregate several controllers')
+    parser.add_argument('--simulate', type=int, metavar='N',
+                        help='Follow N local stand-in nodes instead of the config')
+    parser.add_argument('--base-port', type=int, default=18080,
+                        help='First port for --simulate stand-ins')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    config = load_config(args.config)
+    try:
+        if args.simulate:
+            asyncio.run(simulate(config, args.simulate, args.base_port))
+        elif not config['fleet']['nodes']:
+            print("❌ No nodes configured in the fleet section")
+            return 1
+        else:
+            asyncio.run(FleetAggregator(config).run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
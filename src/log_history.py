@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log History Module
+Streaming parser that turns the controller log into history events
+"""
+
+import gzip
+import io
+import json
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Event kinds
+CYCLE_START = 'cycle_start'
+CYCLE_COMPLETE = 'cycle_complete'
+CYCLE_SKIPPED = 'cycle_skipped'
+CYCLE_ABORT = 'cycle_abort'
+TEMPERATURE = 'temperature'
+TEMPERATURE_ROLLUP = 'temperature_rollup'
+
+# Message fragments written by pump_control.py, checked in order
+_EVENT_MARKERS = (
+    ('Starting pump cycle', CYCLE_START),
+    ('Cycle completed successfully', CYCLE_COMPLETE),
+    ('Skipping cycle due to temperature', CYCLE_SKIPPED),
+    ('CRITICAL TEMPERATURE!', CYCLE_ABORT),
+    ('Cannot read temperature!', CYCLE_ABORT),
+    ('Interrupted by user', CYCLE_ABORT),
+    ('Watchdog forced pump OFF', CYCLE_ABORT),
+    ('Received signal', CYCLE_ABORT),
+)
+
+# "Temperature: 21.5C", "Initial temperature: 21.5C", "Final temperature: ..."
+_TEMPERATURE_RE = re.compile(r'emperature: (-?[\d.]+)C')
+# "Temperature rollup: min=20.10C max=21.00C mean=20.52C n=40" (log_retention.py)
+_ROLLUP_RE = re.compile(
+    r'rollup: min=(-?[\d.]+)C max=(-?[\d.]+)C mean=(-?[\d.]+)C n=(\d+)'
+)
+
+# Rotated segments written by TimedRotatingFileHandler: fermentation.log.2026-10-17
+_ROTATED_RE = re.compile(r'\.(\d{4}-\d{2}-\d{2})$')
+# Archives written by log_retention.py: fermentation-2026-10-17[.<mtime>].log.gz
+_ARCHIVE_RE = re.compile(r'-(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.log\.(gz|zst)$')
+
+
+def parse_timestamp(text):
+    """
+    Parse a 'YYYY-MM-DD HH:MM:SS' timestamp
+
+    Slicing is several times faster than strptime, which matters when
+    a whole season of logs is scanned on the Pi.
+
+    Args:
+        text: Timestamp string
+
+    Returns:
+        datetime: Parsed timestamp
+    """
+    return datetime(
+        int(text[0:4]), int(text[5:7]), int(text[8:10]),
+        int(text[11:13]), int(text[14:16]), int(text[17:19])
+    )
+
+
+def parse_line(line):
+    """
+    Split a log line into its parts
+
+    Args:
+        line: Line in the '%(asctime)s - %(levelname)s - %(message)s' format
+
+    Returns:
+        tuple: (timestamp string, level, message) or None
+    """
+    parts = line.rstrip('\n').split(' - ', 2)
+    if len(parts) != 3 or len(parts[0]) != 19:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def classify(message):
+    """
+    Classify a log message
+
+    Args:
+        message: Log message text
+
+    Returns:
+        tuple: (kind, value) or None if the message is not an event;
+            rollup values are (min, max, mean, count)
+    """
+    if 'Temperature rollup' in message:
+        match = _ROLLUP_RE.search(message)
+        if match:
+            return TEMPERATURE_ROLLUP, (
+                float(match.group(1)), float(match.group(2)),
+                float(match.group(3)), int(match.group(4))
+            )
+    if 'emperature: ' in message:
+        match = _TEMPERATURE_RE.search(message)
+        if match:
+            return TEMPERATURE, float(match.group(1))
+    for marker, kind in _EVENT_MARKERS:
+        if marker in message:
+            return kind, None
+    if message.startswith('❌ Error:'):
+        return CYCLE_ABORT, None
+    return None
+
+
+def segment_day(path):
+    """
+    Day a rotated segment or archive belongs to
+
+    Args:
+        path: Segment path
+
+    Returns:
+        date: Day or None if the name does not match
+    """
+    match = _ROTATED_RE.search(path.name) or _ARCHIVE_RE.search(path.name)
+    if not match:
+        return None
+    return date.fromisoformat(match.group(1))
+
+
+def rotated_segments(log_file):
+    """
+    Closed daily segments next to the live log
+
+    Args:
+        log_file: Path to the live log
+
+    Returns:
+        list: Paths, oldest first
+    """
+    log_file = Path(log_file)
+    found = [
+        p for p in log_file.parent.glob(log_file.name + '.*')
+        if _ROTATED_RE.search(p.name)
+    ]
+    return sorted(found, key=segment_day)
+
+
+def archived_segments(log_file, archive_dir):
+    """
+    Compressed archives of a log
+
+    Args:
+        log_file: Path to the live log
+        archive_dir: Directory with compressed archives
+
+    Returns:
+        list: Paths, oldest first
+    """
+    found = []
+    for p in Path(archive_dir).glob(Path(log_file).stem + '-*.log.*'):
+        match = _ARCHIVE_RE.search(p.name)
+        if match:
+            found.append((segment_day(p), int(match.group(2) or 0), p))
+    return [p for _, _, p in sorted(found)]
+
+
+def default_archive_dir(log_file):
+    """Archive directory used when none is configured"""
+    return Path(log_file).parent / 'archive'
+
+
+def segments(log_file, archive_dir=None):
+    """
+    All segments of a log in chronological order
+
+    Args:
+        log_file: Path to the live log
+        archive_dir: Directory with compressed archives
+
+    Returns:
+        list: Paths - archives, rotated segments, then the live log
+    """
+    if archive_dir is None:
+        archive_dir = default_archive_dir(log_file)
+    return (
+        archived_segments(log_file, archive_dir)
+        + rotated_segments(log_file)
+        + [Path(log_file)]
+    )
+
+
+def index_path(archive):
+    """Path of the block index next to an archive"""
+    return archive.with_name(archive.name + '.idx')
+
+
+def read_index(archive):
+    """
+    Load the block index of an archive
+
+    An index written for other data than the archive holds (a crash while
+    an archive was down-sampled) has no usable blocks; the archive is then
+    read from the start and down-sampled again.
+
+    Returns:
+        dict: {'rolled_up': bool, 'blocks': [[first timestamp, offset], ...],
+            'source': segment name, size and mtime or None, 'size': bytes}
+    """
+    try:
+        index = json.loads(index_path(archive).read_text())
+    except (FileNotFoundError, ValueError):
+        return {'rolled_up': False, 'blocks': []}
+    try:
+        size = archive.stat().st_size
+    except FileNotFoundError:
+        size = None
+    # Indexes written before the size was recorded are trusted
+    if index.get('size', size) != size:
+        return {'rolled_up': False, 'blocks': [], 'source': index.get('source')}
+    return index
+
+
+def open_archive(archive, offset=0):
+    """
+    Open an archive as text starting at a block offset
+
+    Args:
+        archive: Archive path
+        offset: Compressed byte offset of the first block to read
+
+    Returns:
+        file object: Text stream over the remaining blocks
+    """
+    raw = open(archive, 'rb')
+    raw.seek(offset)
+    if archive.name.endswith('.zst'):
+        if zstandard is None:
+            raw.close()
+            raise RuntimeError(f"zstandard module needed to read {archive}")
+        stream = zstandard.ZstdDecompressor().stream_reader(
+            raw, read_across_frames=True, closefd=True
+        )
+    else:
+        stream = gzip.GzipFile(fileobj=raw, mode='rb')
+        # GzipFile does not close a passed-in file object
+        stream.myfileobj = raw
+    return io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+
+
+def _seek_offset(archive, start_key):
+    """Offset of the last block starting at or before start_key"""
+    offset = 0
+    for first_stamp, block_offset in read_index(archive)['blocks']:
+        if first_stamp and first_stamp > start_key:
+            break
+        offset = block_offset
+    return offset
+
+
+def iter_lines(log_file, start=None, archive_dir=None):
+    """
+    Iterate over raw log lines across archived and live segments
+
+    Args:
+        log_file: Path to the live log
+        start: Skip segments and archive blocks that end before this datetime
+        archive_dir: Directory with compressed archives
+
+    Yields:
+        str: Log lines, oldest first
+    """
+    start_key = start.strftime('%Y-%m-%d %H:%M:%S') if start else None
+    for path in segments(log_file, archive_dir):
+        day = segment_day(path)
+        if start and day is not None and day < start.date():
+            continue
+        try:
+            if path.name.endswith(('.gz', '.zst')):
+                offset = _seek_offset(path, start_key) if start_key else 0
+                f = open_archive(path, offset)
+            else:
+                f = open(path, 'r', encoding='utf-8', errors='replace')
+        except FileNotFoundError:
+            # Compacted or rotated while we were reading
+            continue
+        with f:
+            yield from f
+
+
+def iter_events(log_file, start=None, end=None, archive_dir=None):
+    """
+    Stream history events in a single pass
+
+    Args:
+        log_file: Path to the live log
+        start: Only events at or after this datetime
+        end: Only events before this datetime
+        archive_dir: Directory with compressed archives
+
+    Yields:
+        tuple: (datetime, kind, value)
+    """
+    # String comparison on the fixed-width timestamp avoids parsing
+    # lines outside the requested range
+    start_key = start.strftime('%Y-%m-%d %H:%M:%S') if start else None
+    end_key = end.strftime('%Y-%m-%d %H:%M:%S') if end else None
+
+    for line in iter_lines(log_file, start, archive_dir):
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        stamp, level, message = parsed
+        if start_key and stamp < start_key:
+            continue
+        if end_key and stamp >= end_key:
+            # The log is chronological, nothing later can match
+            break
+        event = classify(message)
+        if event is None:
+            continue
+        try:
+            when = parse_timestamp(stamp)
+        except ValueError:
+            continue
+        yield when, event[0], event[1]
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log Index Module
+Memory-mapped access to log segments through a persistent sidecar index
+of line offsets, timestamps and levels
+"""
+
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import log_history
+from settings import load_config
+
+
+# Sidecar layout: header, then one fixed-size record per line
+_MAGIC = b'FLIX'
+_VERSION = 2
+# magic, version, indexed bytes, records, fingerprint of the first log bytes
+_HEADER = struct.Struct('<4sHQQ32s')
+# line offset, epoch seconds, level code
+_RECORD = struct.Struct('<QIB')
+_FINGERPRINT_SIZE = 32
+
+LEVELS = {'DEBUG': 1, 'INFO': 2, 'WARNING': 3, 'ERROR': 4, 'CRITICAL': 5}
+LEVEL_NAMES = {code: name for name, code in LEVELS.items()}
+_LEVEL_BYTES = {name.encode('ascii'): code for name, code in LEVELS.items()}
+
+
+class LogIndex:
+    """Line index of one plain-text log segment"""
+
+    def __init__(self, log_file, index_file=None):
+        """
+        Open a segment and bring its sidecar index up to date
+
+        Args:
+            log_file: Plain-text log segment
+            index_file: Sidecar path (default: <log_file>.idx)
+        """
+        self.log_file = Path(log_file)
+        self.index_file = Path(index_file or f"{log_file}.idx")
+        self._log = None
+        self._idx = None
+        self.count = 0
+        # Bytes of the log covered by the index (complete lines only)
+        self.size = 0
+        self.refresh()
+
+    def close(self):
+        """Release the memory maps"""
+        for mm in (self._log, self._idx):
+            if mm is not None:
+                mm.close()
+        self._log = self._idx = None
+
+    def _map(self, path, size):
+        """Read-only map of a file, or None if it is empty"""
+        if size == 0:
+            return None
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _fingerprint(self, f):
+        """First bytes of the log, to detect a rotated or replaced file"""
+        f.seek(0)
+        return f.read(_FINGERPRINT_SIZE).ljust(_FINGERPRINT_SIZE, b'\0')
+
+    def refresh(self):
+        """
+        Index lines appended since the last call
+
+        Only the new tail of the log is scanned; the sidecar is rebuilt
+        when the log was truncated or replaced.
+
+        Returns:
+            int: Number of newly indexed lines
+        """
+        self.close()
+        try:
+            log_size = self.log_file.stat().st_size
+        except FileNotFoundError:
+            self.count = self.size = 0
+            return 0
+
+        with open(self.log_file, 'rb') as log:
+            fingerprint = self._fingerprint(log)
+            indexed, records, last = self._load_header(fingerprint, log_size)
+            added = 0
+            if indexed < log_size:
+                added, indexed = self._extend(
+                    log, indexed, log_size, fingerprint, records, last
+                )
+
+        self._log = self._map(self.log_file, log_size)
+        idx_size = self.index_file.stat().st_size
+        self._idx = self._map(self.index_file, idx_size)
+        self.count = (idx_size - _HEADER.size) // _RECORD.size
+        self.size = indexed
+        return added
+
+    def _load_header(self, fingerprint, log_size):
+        """
+        Validate the sidecar against the log
+
+        Returns:
+            tuple: (bytes already indexed, records, last record or None)
+        """
+        try:
+            with open(self.index_file, 'rb') as f:
+                header = f.read(_HEADER.size)
+                magic, version, indexed, records, stored = _HEADER.unpack(header)
+                size = os.fstat(f.fileno()).st_size
+                valid = (
+                    magic == _MAGIC and version == _VERSION
+                    and indexed <= log_size
+                    and _HEADER.size + records * _RECORD.size <= size
+                )
+                # A log shorter than the fingerprint grows into it
+                if valid and indexed >= _FINGERPRINT_SIZE:
+                    valid = stored == fingerprint
+                elif valid:
+                    valid = fingerprint.startswith(stored[:indexed])
+                if valid:
+                    # Records of an update that crashed before its header
+                    # was written are indexed again
+                    os.truncate(self.index_file,
+                                _HEADER.size + records * _RECORD.size)
+                    last = None
+                    if records:
+                        f.seek(_HEADER.size + (records - 1) * _RECORD.size)
+                        last = _RECORD.unpack(f.read(_RECORD.size))
+                    return indexed, records, last
+        except (FileNotFoundError, struct.error):
+            pass
+
+        with open(self.index_file, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0, fingerprint))
+        return 0, 0, None
+
+    def _extend(self, log, start, end, fingerprint, records_before, last):
+        """
+        Append records for complete lines in log[start:end]
+
+        Records are written before the header that counts them, so a crash
+        in between leaves records that the next load truncates.
+
+        Returns:
+            tuple: (lines added, bytes now indexed)
+        """
+        epoch = last[1] if last else 0
+        level = last[2] if last else 0
+        records = bytearray()
+        added = 0
+
+        days = {}
+        last_stamp = None
+        mm = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pos = start
+            while pos < end:
+                newline = mm.find(b'\n', pos, end)
+                if newline == -1:
+                    # Partial last line, indexed once it is complete
+                    break
+                head = mm[pos:min(pos + 32, newline)]
+                if head[19:22] == b' - ':
+                    stamp = head[:19]
+                    if stamp != last_stamp:
+                        try:
+                            epoch = self._epoch(stamp, days)
+                            last_stamp = stamp
+                        except ValueError:
+                            pass
+                    level = _LEVEL_BYTES.get(head[22:].split(b' - ', 1)[0], 0)
+                # Continuation lines inherit time and level
+                records += _RECORD.pack(pos, epoch, level)
+                added += 1
+                pos = newline + 1
+        finally:
+            mm.close()
+
+        with open(self.index_file, 'r+b') as f:
+            f.seek(0, 2)
+            f.write(records)
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, _VERSION, pos,
+                                 records_before + added, fingerprint))
+        return added, pos
+
+    @staticmethod
+    def _epoch(stamp, days):
+        """Epoch seconds of a 'YYYY-MM-DD HH:MM:SS' stamp, caching midnights"""
+        day = stamp[:10]
+        midnight = days.get(day)
+        if midnight is None:
+            midnight = days[day] = log_history.parse_timestamp(
+                day.decode('ascii') + ' 00:00:00').timestamp()
+        hours, minutes, seconds = int(stamp[11:13]), int(stamp[14:16]), int(stamp[17:19])
+        return int(midnight) + hours * 3600 + minutes * 60 + seconds
+
+    def _record(self, i):
+        """(offset, epoch, level) of line i"""
+        return _RECORD.unpack_from(self._idx, _HEADER.size + i * _RECORD.size)
+
+    def line(self, i):
+        """
+        Text of line i
+
+        Args:
+            i: Line number (0-based)
+
+        Returns:
+            str: Line without the trailing newline
+        """
+        start = self._record(i)[0]
+        return self._log[start:self._line_end(i)].decode('utf-8', errors='replace')
+
+    def _line_end(self, i):
+        """Offset of the newline ending line i"""
+        if i + 1 < self.count:
+            return self._record(i + 1)[0] - 1
+        return self.size - 1
+
+    def epoch(self, i):
+        """Timestamp of line i (epoch seconds)"""
+        return self._record(i)[1]
+
+    def level(self, i):
+        """Level code of line i"""
+        return self._record(i)[2]
+
+    def find_time(self, epoch):
+        """
+        First line at or after a time (binary search)
+
+        Args:
+            epoch: Epoch seconds
+
+        Returns:
+            int: Line number (count if every line is earlier)
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[1] < epoch:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def line_at_offset(self, offset):
+        """
+        Line containing a byte offset (binary search)
+
+        Args:
+            offset: Byte offset in the log
+
+        Returns:
+            int: Line number, or None if no line is indexed
+        """
+        if not self.count:
+            return None
+        lo, hi = 0, self.count - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._record(mid)[0] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def filter_level(self, min_level, start=0):
+        """
+        Lines at or above a level
+
+        Args:
+            min_level: Level code
+            start: First line to check, for lines added by refresh()
+
+        Returns:
+            array: Matching line numbers
+        """
+        matches = array('I')
+        if not self._idx or not self.count:
+            return matches
+        idx = self._idx
+        level_pos = _HEADER.size + _RECORD.size - 1
+        for i in range(start, self.count):
+            # Single byte reads, no record unpacking
+            if idx[level_pos + i * _RECORD.size] >= min_level:
+                matches.append(i)
+        return matches
+
+    def filter_keyword(self, keyword, start=0):
+        """
+        Lines containing a keyword
+
+        Args:
+            keyword: Text to find
+            start: First line to check, for lines added by refresh()
+
+        Returns:
+            array: Matching line numbers
+        """
+        matches = array('I')
+        if not self._log or not keyword or start >= self.count:
+            return matches
+        needle = keyword.encode('utf-8')
+        pos = self._log.find(needle, self._record(start)[0], self.size)
+        while pos != -1:
+            line = self.line_at_offset(pos)
+            matches.append(line)
+            # Continue after this line
+            if line + 1 < self.count:
+                next_start = self._record(line + 1)[0]
+            else:
+                break
+            pos = self._log.find(needle, next_start, self.size)
+        return matches
+
+    def search(self, keyword, start, backward=False):
+        """
+        Next line containing a keyword
+
+        Args:
+            keyword: Text to find
+            start: Line to start from (exclusive)
+            backward: Search towards older lines
+
+        Returns:
+            int: Line number or None
+        """
+        if not self._log or not keyword or not self.count:
+            return None
+        needle = keyword.encode('utf-8')
+        if backward:
+            if start <= 0:
+                return None
+            end = self._line_end(min(start, self.count) - 1)
+            pos = self._log.rfind(needle, 0, end)
+        else:
+            if start + 1 >= self.count:
+                return None
+            pos = self._log.find(needle, self._record(start + 1)[0], self.size)
+        if pos == -1:
+            return None
+        return self.line_at_offset(pos)
+
+
+class SegmentBrowser:
+    """Indexes for all segments of a log, including compressed archives"""
+
+    def __init__(self, log_file, archive_dir=None, cache_dir=None):
+        """
+        Initialize the browser on the live segment
+
+        Args:
+            log_file: Path to the live log
+            archive_dir: Directory with compressed archives
+            cache_dir: Where archives are extracted for mapping
+        """
+        self.log_file = Path(log_file)
+        self.archive_dir = (
+            Path(archive_dir) if archive_dir
+            else log_history.default_archive_dir(log_file)
+        )
+        self.cache_dir = Path(cache_dir or self.archive_dir / '.cache')
+        self.segments = log_history.segments(self.log_file, self.archive_dir)
+        self.position = len(self.segments) - 1
+        self.index = None
+        self._open()
+
+    @property
+    def name(self):
+        """Name of the current segment"""
+        return self.segments[self.position].name
+
+    def _open(self):
+        """Index the current segment, extracting it if compressed"""
+        if self.index:
+            self.index.close()
+        path = self.segments[self.position]
+        if path.name.endswith(('.gz', '.zst')):
+            # Only the archive being viewed is kept extracted
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            extracted = self.cache_dir / path.name.rsplit('.', 1)[0]
+            with log_history.open_archive(path) as src:
+                with open(extracted, 'w', encoding='utf-8') as dst:
+                    shutil.copyfileobj(src, dst)
+            path = extracted
+        self.index = LogIndex(path)
+
+    def move(self, step):
+        """
+        Switch to an older (-1) or newer (+1) segment
+
+        Returns:
+            bool: True if the segment changed
+        """
+        target = self.position + step
+        if not 0 <= target < len(self.segments):
+            return False
+        self.position = target
+        self._open()
+        return True
+
+    def refresh(self):
+        """Pick up new lines in the live segment"""
+        if self.position == len(self.segments) - 1:
+            return self.index.refresh()
+        return 0
+
+    def seek_time(self, when):
+        """
+        Open the segment covering a time and find its first line there
+
+        Args:
+            when: datetime
+
+        Returns:
+            int: Line number in the (possibly new) current segment
+        """
+        target = len(self.segments) - 1
+        for i, path in enumerate(self.segments):
+            day = log_history.segment_day(path)
+            if day is not None and day >= when.date():
+                target = i
+                break
+        if target != self.position:
+            self.position = target
+            self._open()
+        line = self.index.find_time(int(when.timestamp()))
+        if line >= self.index.count and self.move(1):
+            # Gap after the end of a segment, continue in the next one
+            return 0
+        return line
+
+    def search(self, keyword, start, backward=False):
+        """
+        Next line containing a keyword, continuing into adjacent segments
+
+        Args:
+            keyword: Text to find
+            start: Line in the current segment to start from (exclusive)
+            backward: Search towards older lines
+
+        Returns:
+            int: Line number in the current segment, or None (the
+                original segment stays open)
+        """
+        origin = self.position
+        line = self.index.search(keyword, start, backward)
+        while line is None:
+            if not self.move(-1 if backward else 1):
+                if self.position != origin:
+                    self.position = origin
+                    self._open()
+                return None
+            start = self.index.count if backward else -1
+            line = self.index.search(keyword, start, backward)
+        return line
+
+    def close(self):
+        """Release the current index and extracted archive"""
+        if self.index:
+            self.index.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def main():
+    """Update the index of the live log and print matching lines"""
+    parser = argparse.ArgumentParser(description='Search the controller log')
+    parser.add_argument('--at', help="Start at 'YYYY-MM-DD HH:MM[:SS]'")
+    parser.add_argument('--level', choices=list(LEVELS), help='Minimum level')
+    parser.add_argument('--grep', help='Only lines containing this text')
+    parser.add_argument('--lines', type=int, default=20, help='Lines to print')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    browser = SegmentBrowser(
+        config['logging']['pump_log'], config['retention']['archive_dir']
+    )
+    try:
+        first = browser.seek_time(datetime.fromisoformat(args.at)) if args.at else 0
+        index = browser.index
+        view = range(first, index.count)
+        if args.level:
+            view = index.filter_level(LEVELS[args.level])
+        if args.grep:
+            keep = set(view)
+            view = [i for i in index.filter_keyword(args.grep) if i in keep]
+        print(f"📄 {browser.name}: {index.count} lines indexed")
+        shown = 0
+        for i in view:
+            if i >= first and shown < args.lines:
+                print(index.line(i))
+                shown += 1
+    finally:
+        browser.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
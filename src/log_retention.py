@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log Retention Module
+Compacts rotated daily log segments into compressed, seekable archives,
+down-samples old temperature readings and prunes expired archives
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import log_history
+from log_history import (
+    index_path, open_archive, read_index, segment_day,
+    archived_segments, rotated_segments
+)
+from settings import load_config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+EXTENSIONS = {'gzip': 'gz', 'zstd': 'zst'}
+
+# Lines dropped when a segment is down-sampled
+_PROGRESS_MARKER = 'Progress: '
+_MONITOR_MARKER = ' | Time: '
+
+
+def _compress(data, zstd):
+    """Compress one block as an independent gzip member / zstd frame"""
+    if zstd:
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+class RollupBuffer:
+    """Collects dropped temperature readings into one rollup line"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start a new rollup"""
+        self.stamp = None
+        self.hour = None
+        self.t_min = None
+        self.t_max = None
+        self.t_sum = 0.0
+        self.count = 0
+
+    def add(self, stamp, temp):
+        """Add one reading"""
+        self.stamp = stamp
+        self.hour = stamp[:13]
+        self.t_min = temp if self.t_min is None else min(self.t_min, temp)
+        self.t_max = temp if self.t_max is None else max(self.t_max, temp)
+        self.t_sum += temp
+        self.count += 1
+
+    def flush(self):
+        """
+        Rollup line for the collected readings
+
+        Returns:
+            str: Log line stamped with the last reading, or None if empty
+        """
+        if not self.count:
+            return None
+        line = (
+            f"{self.stamp} - INFO - 📈 Temperature rollup: "
+            f"min={self.t_min:.2f}C max={self.t_max:.2f}C "
+            f"mean={self.t_sum / self.count:.2f}C n={self.count}\n"
+        )
+        self.reset()
+        return line
+
+
+def downsample(lines):
+    """
+    Replace monitoring readings and progress lines with rollups
+
+    Readings are rolled up per hour; a rollup is also closed by any
+    line that is kept, so the output stays in chronological order.
+
+    Args:
+        lines: Iterable of log lines
+
+    Yields:
+        str: Down-sampled log lines
+    """
+    rollup = RollupBuffer()
+    for line in lines:
+        parsed = log_history.parse_line(line)
+        if parsed:
+            stamp, _, message = parsed
+            if _PROGRESS_MARKER in message:
+                continue
+            if _MONITOR_MARKER in message:
+                event = log_history.classify(message)
+                if event and event[0] == log_history.TEMPERATURE:
+                    if rollup.hour and rollup.hour != stamp[:13]:
+                        yield rollup.flush()
+                    rollup.add(stamp, event[1])
+                    continue
+        pending = rollup.flush()
+        if pending:
+            yield pending
+        yield line
+    pending = rollup.flush()
+    if pending:
+        yield pending
+
+
+class LogRetention:
+    """Compaction and retention of the controller log"""
+
+    def __init__(self, config):
+        """
+        Initialize retention
+
+        Args:
+            config: Configuration dict
+        """
+        retention = config['retention']
+        self.log_file = Path(config['logging']['pump_log'])
+        self.archive_dir = Path(retention['archive_dir'])
+        self.block_size = retention['block_size']
+        self.rollup_after_days = retention['rollup_after_days']
+        self.keep_days = retention['keep_days']
+
+        self.compression = retention['compression']
+        if self.compression == 'zstd' and zstandard is None:
+            logging.warning("⚠️ zstandard not installed, using gzip")
+            self.compression = 'gzip'
+
+    def _archive_path(self, day):
+        """Archive path for a day"""
+        ext = EXTENSIONS[self.compression]
+        return self.archive_dir / f"{self.log_file.stem}-{day.isoformat()}.log.{ext}"
+
+    def write_archive(self, archive, lines, rolled_up, source=None):
+        """
+        Write lines as independently compressed blocks plus an index
+
+        Args:
+            archive: Archive path (must not exist yet)
+            lines: Iterable of log lines
+            rolled_up: Whether the lines are already down-sampled
+            source: Name, size and mtime of the segment the lines came from
+        """
+        tmp = archive.with_name(archive.name + '.tmp')
+        zstd = '.log.zst' in archive.name
+        blocks = []
+        offset = 0
+        buffer = []
+        size = 0
+        first_stamp = None
+
+        with open(tmp, 'wb') as out:
+            def write_block():
+                nonlocal offset
+                data = _compress(''.join(buffer).encode('utf-8'), zstd)
+                out.write(data)
+                blocks.append([first_stamp, offset])
+                offset += len(data)
+
+            for line in lines:
+                if not buffer:
+                    parsed = log_history.parse_line(line)
+                    first_stamp = parsed[0] if parsed else None
+                    if first_stamp is None and blocks:
+                        first_stamp = blocks[-1][0]
+                buffer.append(line)
+                size += len(line)
+                if size >= self.block_size:
+                    write_block()
+                    buffer, size = [], 0
+            if buffer:
+                write_block()
+            out.flush()
+            os.fsync(out.fileno())
+
+        # Size ties the block offsets to this data, see read_index()
+        index = {'rolled_up': rolled_up, 'blocks': blocks, 'source': source,
+                 'size': offset}
+        index_tmp = index_path(archive).with_name(index_path(archive).name + '.tmp')
+        index_tmp.write_text(json.dumps(index))
+        # Index first: an archive never exists without its source recorded
+        os.replace(index_tmp, index_path(archive))
+        os.replace(tmp, archive)
+
+    def _needs_rollup(self, day, today):
+        """Whether a day is old enough to be down-sampled"""
+        if self.rollup_after_days is None:
+            return False
+        return (today - day).days >= self.rollup_after_days
+
+    def _archive_of(self, day, source):
+        """
+        Archive already holding a segment
+
+        A crash between writing the archive and deleting the segment
+        leaves both behind; the segment must not be archived twice.
+
+        Returns:
+            Path: Archive of that day recorded with the same source, or None
+        """
+        for archive in archived_segments(self.log_file, self.archive_dir):
+            if segment_day(archive) == day and read_index(archive).get('source') == source:
+                return archive
+        return None
+
+    def compact(self, today=None):
+        """
+        Archive rotated segments, down-sample and prune old archives
+
+        Args:
+            today: Reference day (default: today)
+
+        Returns:
+            dict: Counts of archived, rolled up and removed segments
+        """
+        today = today or date.today()
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        stats = {'archived': 0, 'rolled_up': 0, 'removed': 0}
+
+        for segment in rotated_segments(self.log_file):
+            day = segment_day(segment)
+            stat = segment.stat()
+            source = {'name': segment.name, 'size': stat.st_size,
+                      'mtime_ns': stat.st_mtime_ns}
+            done = self._archive_of(day, source)
+            if done:
+                segment.unlink()
+                segment.with_name(segment.name + '.idx').unlink(missing_ok=True)
+                logging.info(f"🗜️  {segment.name} already in {done.name}, removed")
+                continue
+
+            archive = self._archive_path(day)
+            if archive.exists():
+                # Same day rotated twice, keep both in order
+                archive = archive.with_name(
+                    f"{self.log_file.stem}-{day.isoformat()}"
+                    f".{int(stat.st_mtime)}.log.{EXTENSIONS[self.compression]}"
+                )
+            rollup = self._needs_rollup(day, today)
+            with open(segment, 'r', encoding='utf-8', errors='replace') as f:
+                lines = downsample(f) if rollup else f
+                self.write_archive(archive, lines, rollup, source)
+            segment.unlink()
+            # Line index left by the TUI log viewer
+            segment.with_name(segment.name + '.idx').unlink(missing_ok=True)
+            stats['archived'] += 1
+            logging.info(f"🗜️  Archived {segment.name} → {archive.name}")
+
+        for archive in archived_segments(self.log_file, self.archive_dir):
+            day = segment_day(archive)
+            if self.keep_days and (today - day).days > self.keep_days:
+                archive.unlink()
+                index_path(archive).unlink(missing_ok=True)
+                stats['removed'] += 1
+                logging.info(f"🗑️  Removed expired archive {archive.name}")
+                continue
+
+            if self._needs_rollup(day, today) and not read_index(archive)['rolled_up']:
+                rolled = archive.with_name(archive.name + '.rollup')
+                with open_archive(archive) as f:
+                    self.write_archive(rolled, downsample(f), True,
+                                       read_index(archive).get('source'))
+                # Index first, like a new archive; until the data follows,
+                # read_index() sees the size mismatch and ignores the offsets
+                os.replace(index_path(rolled), index_path(archive))
+                os.replace(rolled, archive)
+                stats['rolled_up'] += 1
+                logging.info(f"📈 Down-sampled {archive.name}")
+
+        return stats
+
+
+def main():
+    """Run compaction once"""
+    parser = argparse.ArgumentParser(description='Compact and prune logs')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    config = load_config(args.config)
+    stats = LogRetention(config).compact()
+    print(
+        f"✓ Archived {stats['archived']}, down-sampled {stats['rolled_up']}, "
+        f"removed {stats['removed']} segment(s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probe Fusion Module
+Per-probe calibration and a robust vessel temperature from several probes
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from settings import load_config
+
+
+FUSION_METHODS = ('median', 'mean', 'weighted')
+
+
+def linear_correction(entry):
+    """
+    Gain and offset of one calibration table entry
+
+    Args:
+        entry: {'offset': x} or {'points': [[raw, reference], [raw, reference]]}
+
+    Returns:
+        tuple: (gain, offset), corrected = raw * gain + offset
+
+    Raises:
+        ValueError: Malformed entry
+    """
+    if not isinstance(entry, dict):
+        raise ValueError(f"Expected 'offset' or 'points', got {entry!r}")
+    if 'points' in entry:
+        if 'offset' in entry:
+            raise ValueError("Use either 'offset' or 'points', not both")
+        try:
+            (raw_low, ref_low), (raw_high, ref_high) = (
+                (float(raw), float(ref)) for raw, ref in entry['points']
+            )
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"'points' must be two [raw, reference] pairs, got {entry['points']!r}"
+            ) from None
+        if raw_low == raw_high:
+            raise ValueError("Calibration points need two different raw values")
+        gain = (ref_high - ref_low) / (raw_high - raw_low)
+        return gain, ref_low - gain * raw_low
+    try:
+        return 1.0, float(entry.get('offset', 0.0))
+    except (TypeError, ValueError):
+        raise ValueError(f"'offset' must be a number, got {entry['offset']!r}") from None
+
+
+class ProbeFusion:
+    """Calibrates one batch of probe readings and combines it into one value"""
+
+    def __init__(self, calibration=None, method='median', weights=None,
+                 outlier_threshold=1.0, min_probes=1):
+        """
+        Initialize the fusion
+
+        Args:
+            calibration: Probe id -> calibration table entry
+            method: 'median', 'mean' or 'weighted'
+            weights: Probe id -> weight for 'weighted' (default 1.0)
+            outlier_threshold: Degrees from the median beyond which a probe
+                is ignored (needs 3+ probes; 0 disables)
+            min_probes: Valid probes needed for a reading
+        """
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method: {method}")
+        self.corrections = {}
+        for probe, entry in (calibration or {}).items():
+            try:
+                self.corrections[probe] = linear_correction(entry)
+            except ValueError as e:
+                raise ValueError(f"Calibration of {probe}: {e}") from None
+        self.method = method
+        try:
+            self.weights = {
+                probe: float(weight) for probe, weight in (weights or {}).items()
+            }
+            self.outlier_threshold = float(outlier_threshold or 0)
+            self.min_probes = int(min_probes)
+        except (AttributeError, TypeError, ValueError) as e:
+            raise ValueError(f"Bad weights, outlier_threshold or min_probes: {e}") from None
+        if any(weight < 0 for weight in self.weights.values()):
+            raise ValueError("Probe weights cannot be negative")
+        if self.min_probes < 1:
+            raise ValueError("min_probes must be at least 1")
+
+    @classmethod
+    def from_config(cls, sensors):
+        """
+        Build from the sensors config section
+
+        Args:
+            sensors: Sensors section dict
+
+        Returns:
+            ProbeFusion
+
+        Raises:
+            ValueError: Invalid section
+        """
+        return cls(
+            calibration=sensors['calibration'],
+            method=sensors['fusion'],
+            weights=sensors['weights'],
+            outlier_threshold=sensors['outlier_threshold'],
+            min_probes=sensors['min_probes'],
+        )
+
+    def calibrate(self, readings):
+        """
+        Apply the calibration table to one batch
+
+        Args:
+            readings: Probe id -> raw °C (None for a failed read)
+
+        Returns:
+            dict: Probe id -> corrected °C, failed probes left out
+        """
+        identity = (1.0, 0.0)
+        corrected = {}
+        for probe, raw in readings.items():
+            if raw is None:
+                continue
+            gain, offset = self.corrections.get(probe, identity)
+            corrected[probe] = raw * gain + offset
+        return corrected
+
+    def reject_outliers(self, values):
+        """
+        Drop probes too far from the median of the batch
+
+        Args:
+            values: Probe id -> corrected °C
+
+        Returns:
+            dict: The probes kept
+        """
+        if not self.outlier_threshold or len(values) < 3:
+            # With two probes the median sits between them, so there is
+            # no way to tell which one is wrong
+            if len(values) == 2:
+                low, high = sorted(values.values())
+                if self.outlier_threshold and high - low > 2 * self.outlier_threshold:
+                    logging.warning(
+                        f"⚠️ Probes disagree by {high - low:.2f}C: "
+                        f"{self._describe(values)}"
+                    )
+            return values
+        median = statistics.median(values.values())
+        # With two clusters the median falls between them and could reject
+        # every probe; the ones nearest to it are always kept
+        nearest = min(abs(value - median) for value in values.values())
+        if nearest > self.outlier_threshold:
+            logging.warning(
+                f"⚠️ No probe within {self.outlier_threshold}C of the median "
+                f"{median:.2f}C: {self._describe(values)}"
+            )
+        tolerance = max(self.outlier_threshold, nearest)
+        kept = {
+            probe: value for probe, value in values.items()
+            if abs(value - median) <= tolerance
+        }
+        if len(kept) < len(values):
+            dropped = {p: v for p, v in values.items() if p not in kept}
+            logging.warning(
+                f"⚠️ Ignoring outlier probe(s) {self._describe(dropped)} "
+                f"(median {median:.2f}C)"
+            )
+        return kept
+
+    def combine(self, readings):
+        """
+        One vessel temperature from a batch of raw readings
+
+        Args:
+            readings: Probe id -> raw °C (None for a failed read)
+
+        Returns:
+            float: Temperature rounded to 2 decimals, or None when fewer than
+                min_probes probes gave a usable reading
+        """
+        failed = [probe for probe, raw in readings.items() if raw is None]
+        if failed and len(readings) > 1:
+            logging.warning(f"⚠️ No reading from probe(s) {', '.join(failed)}")
+
+        values = self.reject_outliers(self.calibrate(readings))
+        if len(values) < self.min_probes:
+            logging.error(
+                f"Only {len(values)} of {len(readings)} probe(s) usable, "
+                f"{self.min_probes} required"
+            )
+            return None
+
+        if self.method == 'median':
+            temp = statistics.median(values.values())
+        elif self.method == 'weighted':
+            weights = [self.weights.get(probe, 1.0) for probe in values]
+            total = sum(weights)
+            if total <= 0:
+                return None
+            temp = sum(w * v for w, v in zip(weights, values.values())) / total
+        else:
+            temp = sum(values.values()) / len(values)
+        return round(temp, 2)
+
+    @staticmethod
+    def _describe(values):
+        """Probe readings as text for log messages"""
+        return ', '.join(f"{probe}={value:.2f}C" for probe, value in values.items())
+
+
+def main():
+    """Show raw, calibrated and fused readings of all probes"""
+    from temp_sensor import DS18B20Sensor
+
+    parser = argparse.ArgumentParser(description='Probe calibration and fusion')
+    parser.add_argument('--json', action='store_true', help='Print JSON')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    fusion = ProbeFusion.from_config(load_config(args.config)['sensors'])
+    try:
+        sensor = DS18B20Sensor()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+    readings = sensor.read_all()
+    calibrated = fusion.calibrate(readings)
+    fused = fusion.combine(readings)
+    if args.json:
+        print(json.dumps({
+            'raw': readings,
+            'calibrated': {p: round(v, 3) for p, v in calibrated.items()},
+            'fused': fused,
+            'method': fusion.method,
+        }, indent=2))
+        return 0 if fused is not None else 1
+
+    for probe, raw in readings.items():
+        if raw is None:
+            print(f"   {probe}  no reading")
+        else:
+            print(f"   {probe}  raw {raw:7.3f}C  calibrated {calibrated[probe]:7.3f}C")
+    if fused is None:
+        print("❌ No usable reading")
+        return 1
+    print(f"🌡️  Temperature ({fusion.method}): {fused}°C")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -7,18 +7,27 @@ Main module for pump control with temperature monitoring
 
 import RPi.GPIO as GPIO
 import time
-import yaml
 import logging
+import logging.handlers
 import sys
 import os
 import signal
 import atexit
+import argparse
+import concurrent.futures
 from datetime import datetime
 from pathlib import Path
 
 # Add src directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 from temp_sensor import DS18B20Sensor
+from probe_fusion import ProbeFusion
+from settings import load_config
+from watchdog import RelayWatchdog
+from state_journal import CycleJournal
+from energy import RelayAccounting
+import alerts
+import tracing
 
 
 class PumpController:
@@ -27,13 +36,20 @@ class PumpController:
     LOCK_FILE = Path('/tmp/fermentation_pump.lock')
     STATE_FILE = Path('/tmp/fermentation_pump.state')
     
-    def __init__(self, config_file='config.yaml'):
+    # Sensor reused by get_temperature() between calls
+    _status_sensor = None
+    
+    def __init__(self, config_file='config.yaml', clock=time):
         """
         Initialize the controller
         
         Args:
             config_file: Path to configuration file
+            clock: Object providing sleep() and monotonic() (the time
+                module, or a virtual clock when replaying)
         """
+        self.clock = clock
+        
         # Check if another instance is running
         if self._is_already_running():
             raise RuntimeError("Pump controller is already running")
@@ -47,18 +63,86 @@ class PumpController:
         signal.signal(signal.SIGTERM, self._signal_handler)
         signal.signal(signal.SIGINT, self._signal_handler)
         
-        self.config = self._load_config(config_file)
-        self._setup_logging()
-        self._setup_gpio()
+        self.startup_times = {}
+        started = time.perf_counter()
+        self.config = self._timed('config', self._load_config, config_file)
+        # A typo in the calibration table must stop the controller, not
+        # leave it running without temperature checks
+        self.fusion = ProbeFusion.from_config(self.config['sensors'])
+        self._timed('logging', self._setup_logging)
+        self._timed('gpio', self._setup_gpio)
+        # Forks, so it must run before any helper thread exists (the
+        # sampling profiler, sensor discovery, the alert dispatcher)
+        self._timed('watchdog', self._setup_watchdog)
+        self._timed('tracing', self._setup_tracing)
+        
+        # Sensor discovery waits on sysfs, overlap it with the state files
+        discovery = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        sensor_future = discovery.submit(
+            self._timed, 'sensor', self._create_sensor
+        )
+        self._timed('state', self._load_state_files)
         
         try:
-            self.temp_sensor = DS18B20Sensor()
+            self.temp_sensor = sensor_future.result()
         except Exception as e:
             logging.error(f"Cannot initialize temperature sensor: {e}")
+            self.alerts.raise_alert(
+                alerts.SENSOR_FAILURE, 'error',
+                f"Cannot initialize temperature sensor: {e}"
+            )
             self.temp_sensor = None
+        finally:
+            discovery.shutdown()
         
+        self._check_startup_budget(time.perf_counter() - started)
         self._write_state('ready')
     
+    def _timed(self, name, func, *args):
+        """Run one startup step and record its duration"""
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.startup_times[name] = time.perf_counter() - started
+    
+    def _load_state_files(self):
+        """Open the cycle journal, energy counters and alert state"""
+        journal_config = self.config['journal']
+        self.journal = CycleJournal(
+            journal_config['path'], journal_config['flush_interval'],
+            clock=self.clock
+        )
+        
+        energy_config = self.config['energy']
+        self.energy = RelayAccounting(
+            energy_config['path'], energy_config['flush_interval'],
+            energy_config['hourly_buckets'], energy_config['daily_buckets'],
+            clock=self.clock
+        )
+        self.alerts = alerts.AlertManager(self.config, clock=self.clock)
+    
+    def _check_startup_budget(self, total):
+        """Log the startup time and warn when it exceeds the budget"""
+        steps = ', '.join(
+            f"{name} {seconds * 1000:.0f}ms"
+            for name, seconds in self.startup_times.items()
+        )
+        budget = self.config['startup']['budget']
+        if total > budget:
+            logging.warning(
+                f"⚠️ Startup took {total:.2f}s, over the {budget}s budget ({steps})"
+            )
+        else:
+            logging.info(f"⚡ Startup in {total * 1000:.0f}ms ({steps})")
+    
+    def _create_sensor(self):
+        """Create the temperature sensor"""
+        return DS18B20Sensor(
+            clock=self.clock, manifest=self.config['startup']['sensor_manifest'],
+            fusion=self.fusion
+        )
+    
     def _is_already_running(self):
         """Check if another pump controller instance is running"""
         if self.LOCK_FILE.exists():
@@ -85,10 +169,14 @@ class PumpController:
                 self.LOCK_FILE.unlink(missing_ok=True)
         return False
     
+    @tracing.traced('write_state')
     def _write_state(self, state):
-        """Write current state to state file"""
+        """Write current state to state file (skipped if unchanged)"""
+        if state == getattr(self, '_last_state', None):
+            return
         try:
             self.STATE_FILE.write_text(state)
+            self._last_state = state
         except:
             pass
     
@@ -141,10 +229,22 @@ class PumpController:
             GPIO.output(self.relay_pin, GPIO.LOW)
         except:
             pass
+        self._stop_watchdog()
         try:
             GPIO.cleanup()
         except:
             pass
+        journal = getattr(self, 'journal', None)
+        if journal:
+            journal.finish(CycleJournal.ABORTED)
+        energy = getattr(self, 'energy', None)
+        if energy:
+            energy.relay_off()
+        alert_manager = getattr(self, 'alerts', None)
+        if alert_manager:
+            # Relay is already LOW, waiting for delivery is harmless
+            alert_manager.close()
+        self._export_trace()
         self._cleanup_files()
     
     def _cleanup_files(self):
@@ -153,23 +253,8 @@ class PumpController:
         self.STATE_FILE.unlink(missing_ok=True)
     
     def _load_config(self, config_file):
-        """Load configuration"""
-        try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
-        except FileNotFoundError:
-            # Default configuration
-            return {
-                'pump': {'run_time': 600, 'gpio_pin': 17},
-                'temperature': {
-                    'min': 15.0, 'max': 30.0, 'warning': 25.0,
-                    'check_interval': 30, 'gpio_pin': 4
-                },
-                'logging': {
-                    'pump_log': 'logs/fermentation.log',
-                    'level': 'INFO'
-                }
-            }
+        """Load configuration (missing values fall back to defaults)"""
+        return load_config(config_file)
     
     def _setup_logging(self):
         """Setup logging"""
@@ -179,8 +264,13 @@ class PumpController:
         # Create directory if it doesn't exist
         Path(log_file).parent.mkdir(parents=True, exist_ok=True)
         
+        # New segment every day; log_retention.py compresses closed ones
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when='midnight', encoding='utf-8'
+        )
+        
         logging.basicConfig(
-            filename=log_file,
+            handlers=[file_handler],
             level=log_level,
             format='%(asctime)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
@@ -191,6 +281,31 @@ class PumpController:
         console.setLevel(log_level)
         logging.getLogger('').addHandler(console)
     
+    def _setup_tracing(self):
+        """Enable timing spans and the sampling profiler if configured"""
+        trace_config = self.config['tracing']
+        if not trace_config['enabled']:
+            return
+        tracing.tracer.enable(trace_config['buffer_size'])
+        tracing.tracer.instrument_logging()
+        if trace_config['sample_interval']:
+            tracing.tracer.start_profiler(trace_config['sample_interval'])
+        logging.info("⏱️  Tracing enabled")
+    
+    def _export_trace(self):
+        """Write the recorded trace (and profile) to the trace directory"""
+        if not tracing.tracer.enabled:
+            return
+        try:
+            output_dir = Path(self.config['tracing']['output_dir'])
+            stem = f"trace_{datetime.now():%Y%m%d_%H%M%S}"
+            tracing.tracer.stop_profiler(output_dir / f"{stem}.folded")
+            path = tracing.tracer.export_chrome(output_dir / f"{stem}.json")
+            tracing.tracer.disable()
+            logging.info(f"⏱️  Trace saved: {path}")
+        except Exception as e:
+            logging.error(f"❌ Cannot save trace: {e}")
+    
     def _setup_gpio(self):
         """Setup GPIO pins"""
         self.relay_pin = self.config['pump']['gpio_pin']
@@ -200,15 +315,71 @@ class PumpController:
         GPIO.output(self.relay_pin, GPIO.LOW)
         logging.info(f"GPIO {self.relay_pin} initialized")
     
+    def _setup_watchdog(self):
+        """Start the fail-safe relay supervisor"""
+        self.watchdog = None
+        watchdog_config = self.config['watchdog']
+        if not watchdog_config['enabled']:
+            logging.warning("⚠️ Relay watchdog disabled")
+            return
+        
+        if watchdog_config['max_on_time'] <= self.config['pump']['run_time']:
+            logging.warning(
+                f"⚠️ Watchdog max_on_time ({watchdog_config['max_on_time']}s) "
+                f"will cut cycles of {self.config['pump']['run_time']}s short"
+            )
+        
+        self.watchdog = RelayWatchdog(
+            self.relay_pin,
+            heartbeat_timeout=watchdog_config['heartbeat_timeout'],
+            max_on_time=watchdog_config['max_on_time']
+        )
+        self.watchdog.start()
+    
+    def _stop_watchdog(self):
+        """Stop the relay supervisor after the relay is LOW"""
+        watchdog = getattr(self, 'watchdog', None)
+        if watchdog:
+            watchdog.stop()
+            self.watchdog = None
+    
+    def _heartbeat(self):
+        """Report liveness to the relay supervisor"""
+        if self.watchdog:
+            self.watchdog.heartbeat()
+    
+    def _forced_off(self):
+        """Whether the relay supervisor cut the current pump run"""
+        return bool(self.watchdog and self.watchdog.forced_off())
+    
+    def _sleep(self, seconds):
+        """Sleep while keeping the watchdog fed"""
+        interval = self.config['watchdog']['heartbeat_interval']
+        end = self.clock.monotonic() + seconds
+        while True:
+            self._heartbeat()
+            remaining = end - self.clock.monotonic()
+            if remaining <= 0:
+                break
+            self.clock.sleep(min(interval, remaining))
+    
+    @tracing.traced('pump_on')
     def pump_on(self):
         """Turn pump ON"""
         GPIO.output(self.relay_pin, GPIO.HIGH)
+        if self.watchdog:
+            self.watchdog.notify_on()
+        self.energy.relay_on()
         self._write_state('pump_on')
         logging.info("✓ Pump ON")
     
+    @tracing.traced('pump_off')
     def pump_off(self):
         """Turn pump OFF"""
         GPIO.output(self.relay_pin, GPIO.LOW)
+        if self.watchdog:
+            self.watchdog.notify_off()
+        self.energy.relay_off()
         self._write_state('pump_off')
         logging.info("✓ Pump OFF")
     
@@ -246,36 +417,71 @@ class PumpController:
         return True
     
     @staticmethod
-    def get_temperature():
+    def get_temperature(config_file='config.yaml'):
         """Get current temperature (static method for external access)"""
         try:
-            sensor = DS18B20Sensor()
-            return sensor.read_temperature()
+            # Dashboards poll every few seconds, discover the probe only once
+            if PumpController._status_sensor is None:
+                # Same calibration and fusion as the controller
+                config = load_config(config_file)
+                PumpController._status_sensor = DS18B20Sensor(
+                    manifest=config['startup']['sensor_manifest'],
+                    fusion=ProbeFusion.from_config(config['sensors'])
+                )
+            return PumpController._status_sensor.read_temperature()
         except:
             return None
     
-    def run_cycle(self):
+    def interrupted_cycle(self):
+        """
+        Cycle interrupted by a crash or power loss that can still be resumed
+        
+        Returns:
+            dict: Journal record with 'remaining' seconds, or None
+        """
+        journal_config = self.config['journal']
+        return self.journal.interrupted_cycle(
+            journal_config['resume_window'], journal_config['min_remaining']
+        )
+    
+    @tracing.traced('run_cycle')
+    def run_cycle(self, run_time=None, resumed_from=None):
         """
         Run one pump cycle with temperature monitoring
         
+        Args:
+            run_time: Pump run time in seconds (default from config)
+            resumed_from: Start time of an interrupted cycle being completed
+        
         Returns:
             bool: True on success
         """
+        if run_time is None:
+            run_time = self.config['pump']['run_time']
         self._write_state('cycle_starting')
         logging.info("="*50)
-        logging.info("🚀 Starting pump cycle")
+        if resumed_from:
+            logging.info(
+                f"🚀 Starting pump cycle (resuming cycle from {resumed_from}, "
+                f"{run_time}s remaining)"
+            )
+        else:
+            logging.info("🚀 Starting pump cycle")
         
         # Check initial temperature
         if self.temp_sensor:
             temp = self.temp_sensor.read_temperature()
+            self.alerts.check_temperature(temp)
             if temp is None:
                 logging.error("❌ Cannot read temperature!")
+                self.journal.finish(CycleJournal.ABORTED)
                 return False
             
             logging.info(f"🌡️  Initial temperature: {temp}C")
             
             if not self.check_temperature_safe(temp):
                 logging.warning("⚠️ Skipping cycle due to temperature")
+                self.journal.finish(CycleJournal.ABORTED)
                 return False
             
             initial_temp = temp
@@ -283,24 +489,29 @@ class PumpController:
             logging.warning("⚠️ No temperature sensor - continuing without check")
             initial_temp = None
         
-        # Start pump
-        self.pump_on()
-        
-        # Run for specified time with monitoring
-        run_time = self.config['pump']['run_time']
         check_interval = self.config['temperature']['check_interval']
         elapsed = 0
         
         try:
+            # Journal first, so a power loss after this point can be resumed
+            self.journal.start_cycle(run_time, initial_temp, resumed_from)
+            
+            # Start pump
+            self.pump_on()
+            
+            # Run for specified time with monitoring
             while elapsed < run_time:
                 sleep_time = min(check_interval, run_time - elapsed)
-                time.sleep(sleep_time)
+                self._sleep(sleep_time)
                 elapsed += sleep_time
                 
                 # Check temperature
+                temp = None
                 if self.temp_sensor:
                     self._write_state('monitoring')
                     temp = self.temp_sensor.read_temperature()
+                    self._heartbeat()
+                    self.alerts.check_temperature(temp)
                     if temp is not None:
                         logging.info(
                             f"🌡️  Temperature: {temp}C | "
@@ -313,11 +524,23 @@ class PumpController:
                             self.pump_off()
                             return False
                 
+                if self._forced_off():
+                    logging.error("❌ Watchdog forced the pump OFF, cycle aborted")
+                    self.pump_off()
+                    self.alerts.raise_alert(
+                        alerts.CYCLE_ERROR, 'error',
+                        "Pump cycle aborted: the watchdog forced the relay OFF"
+                    )
+                    return False
+                
+                self.journal.update(elapsed, temp)
+                self.energy.checkpoint()
                 progress = (elapsed / run_time) * 100
                 logging.info(f"⏱️  Progress: {progress:.1f}%")
             
             # Normal completion
             self.pump_off()
+            self.journal.finish(CycleJournal.COMPLETED, elapsed)
             
             # Final temperature
             if self.temp_sensor:
@@ -328,6 +551,7 @@ class PumpController:
                     logging.info(f"📊 Change: {temp_change:+.2f}C")
             
             logging.info("✅ Cycle completed successfully")
+            self.alerts.clear(alerts.CYCLE_ERROR, "Pump cycle completed again")
             self._write_state('completed')
             return True
             
@@ -338,8 +562,13 @@ class PumpController:
         except Exception as e:
             logging.error(f"❌ Error: {e}")
             self.pump_off()
+            self.alerts.raise_alert(
+                alerts.CYCLE_ERROR, 'error', f"Pump cycle failed: {e}"
+            )
             return False
         finally:
+            # No-op after completion; covers aborts, errors and signals
+            self.journal.finish(CycleJournal.ABORTED, elapsed)
             logging.info("="*50)
     
     def cleanup(self):
@@ -348,20 +577,39 @@ class PumpController:
             self.pump_off()
         except:
             pass
+        self._stop_watchdog()
         try:
             GPIO.cleanup()
         except:
             pass
         self._cleanup_files()
         logging.info("GPIO cleanup complete")
+        self.alerts.close()
+        self._export_trace()
 
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Run one pump cycle')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='Only complete a cycle interrupted by a crash or power loss'
+    )
+    args = parser.parse_args()
+    
     controller = None
     try:
         controller = PumpController()
-        success = controller.run_cycle()
+        interrupted = controller.interrupted_cycle()
+        if interrupted:
+            success = controller.run_cycle(
+                interrupted['remaining'], resumed_from=interrupted['started']
+            )
+        elif args.resume:
+            logging.info("No interrupted cycle to resume")
+            return 0
+        else:
+            success = controller.run_cycle()
         return 0 if success else 1
     except Exception as e:
         logging.error(f"Critical error: {e}")
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Replay Module
+Re-drives PumpController from a recorded temperature trace on a virtual
+clock and diffs the relay decisions against a golden file
+"""
+
+import argparse
+import bisect
+import copy
+import csv
+import difflib
+import logging
+import sys
+import tempfile
+import types
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import log_history
+from energy import RelayAccounting
+from settings import DEFAULT_CONFIG, load_config
+from state_journal import CycleJournal
+from temp_sensor import DS18B20Sensor
+
+
+class VirtualClock:
+    """Clock where sleeping only advances a counter"""
+
+    def __init__(self, start):
+        """
+        Initialize the clock
+
+        Args:
+            start: Wall-clock datetime at virtual time 0
+        """
+        self.start = start
+        self.now = 0.0
+
+    def sleep(self, seconds):
+        """Advance time instantly"""
+        self.now += seconds
+
+    def monotonic(self):
+        """Seconds since the start of the replay"""
+        return self.now
+
+    def time(self):
+        """Virtual epoch seconds"""
+        return self.start.timestamp() + self.now
+
+    def datetime(self):
+        """Virtual wall-clock time"""
+        return self.start + timedelta(seconds=self.now)
+
+    def advance_to(self, when):
+        """Jump forward to a wall-clock datetime"""
+        self.now = max(self.now, (when - self.start).total_seconds())
+
+
+class RecordingGPIO(types.ModuleType):
+    """Stand-in for RPi.GPIO that records relay decisions"""
+
+    BCM = 'BCM'
+    OUT = 'OUT'
+    IN = 'IN'
+    HIGH = 1
+    LOW = 0
+
+    def __init__(self):
+        super().__init__('RPi.GPIO')
+        self.clock = None
+        self.levels = {}
+        self.events = []
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode, **kwargs):
+        pass
+
+    def output(self, pin, value):
+        """Record a change of an output pin"""
+        if self.levels.get(pin) != value:
+            self.levels[pin] = value
+            self.events.append(
+                (self.clock.datetime(), pin, 'HIGH' if value else 'LOW')
+            )
+
+    def cleanup(self):
+        pass
+
+
+# The controller must never reach real hardware during a replay
+GPIO = RecordingGPIO()
+if 'RPi.GPIO' not in sys.modules:
+    sys.modules['RPi'] = types.ModuleType('RPi')
+    sys.modules['RPi'].GPIO = GPIO
+    sys.modules['RPi.GPIO'] = GPIO
+
+import pump_control
+pump_control.GPIO = GPIO
+
+
+class Trace:
+    """Recorded temperature readings on a timeline"""
+
+    def __init__(self, samples):
+        """
+        Initialize the trace
+
+        Args:
+            samples: (datetime, temperature or None) tuples; None is a
+                failed read
+        """
+        samples = sorted(samples, key=lambda s: s[0])
+        self.times = [s[0] for s in samples]
+        self.temps = [s[1] for s in samples]
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Load 'time,temperature' CSV ('YYYY-MM-DD HH:MM:SS', empty = failed read)
+        """
+        samples = []
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                temp = row['temperature'].strip()
+                samples.append((
+                    log_history.parse_timestamp(row['time']),
+                    float(temp) if temp else None
+                ))
+        return cls(samples)
+
+    @classmethod
+    def from_log(cls, log_file, start=None, end=None, archive_dir=None):
+        """Load raw readings recorded in the controller log"""
+        return cls(
+            (when, value)
+            for when, kind, value in log_history.iter_events(
+                log_file, start, end, archive_dir)
+            if kind == log_history.TEMPERATURE
+        )
+
+    def at(self, when):
+        """
+        Reading in effect at a time (last sample at or before it)
+
+        Returns:
+            float: Temperature or None (failed read / before the trace)
+        """
+        i = bisect.bisect_right(self.times, when) - 1
+        if i < 0:
+            return None
+        return self.temps[i]
+
+
+class TraceSensor(DS18B20Sensor):
+    """DS18B20 whose w1_slave contents come from a trace"""
+
+    def __init__(self, trace, clock):
+        self.trace = trace
+        super().__init__(base_dir='replay', clock=clock)
+
+    def _find_device(self):
+        self.device_file = 'replay/w1_slave'
+        self.devices = [{'id': 'replay', 'path': self.device_file,
+                         'resolution': None}]
+
+    def _read_temp_raw(self, device_file=None):
+        temp = self.trace.at(self.clock.datetime())
+        if temp is None:
+            # CRC failure, exercises the retry path
+            return ['72 01 4b 46 7f ff 0e 10 57 : crc=57 NO\n',
+                    '72 01 4b 46 7f ff 0e 10 57 t=0\n']
+        return ['72 01 4b 46 7f ff 0e 10 57 : crc=57 YES\n',
+                f'72 01 4b 46 7f ff 0e 10 57 t={int(round(temp * 1000))}\n']
+
+
+class MemoryJournal(CycleJournal):
+    """Cycle journal kept in memory, so fsyncs do not pace the virtual clock"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stored = None
+
+    def load(self):
+        """Last record 'written'"""
+        return dict(self._stored) if self._stored else None
+
+    def _flush(self):
+        self.record['updated'] = self._now().isoformat(timespec='seconds')
+        self._last_flush = self.clock.monotonic()
+        self._stored = dict(self.record)
+
+
+class MemoryAccounting(RelayAccounting):
+    """Energy counters kept in memory, starting from zero"""
+
+    def load(self):
+        pass
+
+    def flush(self):
+        self._prune(self.hours, self.hourly_buckets)
+        self._prune(self.days, self.daily_buckets)
+        self._last_flush = self.clock.monotonic()
+
+
+class ReplayController(pump_control.PumpController):
+    """PumpController wired to a trace, a virtual clock and a scratch dir"""
+
+    def __init__(self, config, trace, clock, workdir, log=True):
+        """
+        Initialize the controller
+
+        Args:
+            config: Configuration dict
+            trace: Trace to read temperatures from
+            clock: VirtualClock
+            workdir: Directory for the lock and log files
+            log: Write the controller log to workdir/replay.log
+        """
+        workdir = Path(workdir)
+        self.trace = trace
+        self.workdir = workdir
+        self.log = log
+        self.LOCK_FILE = workdir / 'replay.lock'
+        self.STATE_FILE = workdir / 'replay.state'
+
+        config = copy.deepcopy(config)
+        config['watchdog']['enabled'] = False
+        config['tracing']['enabled'] = False
+        config['journal']['path'] = str(workdir / 'cycle_journal.json')
+        config['energy']['path'] = str(workdir / 'energy.dat')
+        config['alerts']['enabled'] = False
+        config['logging']['pump_log'] = str(workdir / 'replay.log')
+        super().__init__(config, clock=clock)
+
+    def _load_config(self, config):
+        return config
+
+    def _setup_logging(self):
+        """Log to the scratch dir with virtual timestamps, no console"""
+        root = logging.getLogger()
+        if not self.log:
+            # Nobody reads it; INFO records are half the replay time
+            root.handlers = [logging.NullHandler()]
+            root.setLevel(logging.WARNING)
+            return
+        handler = logging.FileHandler(self.config['logging']['pump_log'])
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+        clock = self.clock
+
+        def virtual_time(record):
+            record.created = clock.time()
+            return True
+
+        handler.addFilter(virtual_time)
+        root.handlers = [handler]
+        root.setLevel(logging.INFO)
+
+    def _create_sensor(self):
+        return TraceSensor(self.trace, self.clock)
+
+    def _load_state_files(self):
+        """Journal and energy counters in memory, a replay never resumes"""
+        journal_config = self.config['journal']
+        self.journal = MemoryJournal(
+            journal_config['path'], journal_config['flush_interval'],
+            clock=self.clock
+        )
+        energy_config = self.config['energy']
+        self.energy = MemoryAccounting(
+            energy_config['path'], energy_config['flush_interval'],
+            energy_config['hourly_buckets'], energy_config['daily_buckets'],
+            clock=self.clock
+        )
+        self.alerts = pump_control.alerts.AlertManager(self.config, clock=self.clock)
+
+    def _write_state(self, state):
+        """Keep the state in memory, nothing polls it during a replay"""
+        self._last_state = state
+
+
+def scheduled_starts(config, first_day, last_day):
+    """
+    Cycle start times from the schedule section
+
+    Args:
+        config: Configuration dict
+        first_day: First date
+        last_day: Last date (inclusive)
+
+    Yields:
+        datetime: Start times in order
+    """
+    times = sorted(
+        datetime.strptime(str(value), '%H:%M').time()
+        for value in config['schedule'].values()
+    )
+    day = first_day
+    while day <= last_day:
+        for t in times:
+            yield datetime.combine(day, t)
+        day += timedelta(days=1)
+
+
+def replay(config, trace, starts, workdir, log=True):
+    """
+    Run cycles at the given times against a trace
+
+    Args:
+        config: Configuration dict
+        trace: Trace
+        starts: Iterable of cycle start datetimes
+        workdir: Scratch directory
+        log: Keep the controller log in workdir/replay.log
+
+    Returns:
+        list: Output lines describing relay decisions and cycle results
+    """
+    starts = list(starts)
+    if not starts:
+        return []
+    clock = VirtualClock(starts[0])
+    GPIO.clock = clock
+    GPIO.levels.clear()
+    GPIO.events.clear()
+
+    controller = ReplayController(config, trace, clock, workdir, log)
+    relay_pin = config['pump']['gpio_pin']
+    output = []
+
+    try:
+        for start in starts:
+            clock.advance_to(start)
+            output.append(f"{clock.datetime():%Y-%m-%d %H:%M:%S} cycle start")
+            GPIO.events.clear()
+            success = controller.run_cycle()
+            for when, pin, level in GPIO.events:
+                if pin == relay_pin:
+                    output.append(f"{when:%Y-%m-%d %H:%M:%S} relay {level}")
+            result = 'completed' if success else 'failed'
+            output.append(f"{clock.datetime():%Y-%m-%d %H:%M:%S} cycle {result}")
+    finally:
+        controller.cleanup()
+    return output
+
+
+def diff_golden(output, golden_file):
+    """
+    Compare replay output with a golden file
+
+    Returns:
+        list: Unified diff lines (empty if identical)
+    """
+    expected = Path(golden_file).read_text().splitlines()
+    return list(difflib.unified_diff(
+        expected, output, 'golden', 'replay', lineterm=''
+    ))
+
+
+def main():
+    """Replay a trace"""
+    parser = argparse.ArgumentParser(description='Replay a temperature trace')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--trace', help="CSV with 'time,temperature' columns")
+    source.add_argument('--from-log', action='store_true',
+                        help='Use readings recorded in the controller log')
+    parser.add_argument('--from', dest='start', help='First day (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end', help='Last day (YYYY-MM-DD)')
+    parser.add_argument('--golden', help='Golden output to compare against')
+    parser.add_argument('--update-golden', action='store_true',
+                        help='Write the output to the golden file')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = (
+        datetime.fromisoformat(args.end) + timedelta(days=1)
+        if args.end else None
+    )
+
+    if args.trace:
+        trace = Trace.from_csv(args.trace)
+    else:
+        trace = Trace.from_log(
+            config['logging']['pump_log'], start, end,
+            config['retention']['archive_dir']
+        )
+    if not trace.times:
+        print("❌ Trace is empty")
+        return 1
+
+    first_day = (start or trace.times[0]).date()
+    last_day = (end - timedelta(days=1) if end else trace.times[-1]).date()
+    starts = scheduled_starts(config, first_day, last_day)
+
+    with tempfile.TemporaryDirectory(prefix='replay_') as workdir:
+        # The scratch dir is thrown away, so is a log written there
+        output = replay(config, trace, starts, workdir, log=False)
+
+    if args.update_golden:
+        Path(args.golden).write_text('\n'.join(output) + '\n')
+        print(f"✓ Golden output written: {args.golden}")
+        return 0
+    if args.golden:
+        diff = diff_golden(output, args.golden)
+        if diff:
+            print('\n'.join(diff))
+            print("❌ Replay differs from golden output")
+            return 1
+        print(f"✓ Replay matches golden output ({len(output)} lines)")
+        return 0
+
+    print('\n'.join(output))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Report Module
+Offline per-day and per-batch summaries from the stored log history
+"""
+
+import argparse
+import base64
+import html
+import io
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import log_history
+from settings import load_config
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+
+
+class Summary:
+    """Running statistics for one day or batch"""
+
+    __slots__ = (
+        'cycles', 'completed', 'skipped', 'aborts',
+        'temp_min', 'temp_max', 'temp_sum', 'temp_count', 'above_warning'
+    )
+
+    def __init__(self):
+        self.cycles = 0
+        self.completed = 0
+        self.skipped = 0
+        self.aborts = 0
+        self.temp_min = None
+        self.temp_max = None
+        self.temp_sum = 0.0
+        self.temp_count = 0
+        self.above_warning = 0.0
+
+    def add_temperature(self, temp):
+        """Add one temperature reading"""
+        self.add_rollup(temp, temp, temp, 1)
+
+    def add_rollup(self, t_min, t_max, t_mean, count):
+        """Add down-sampled readings from an archived segment"""
+        if self.temp_min is None or t_min < self.temp_min:
+            self.temp_min = t_min
+        if self.temp_max is None or t_max > self.temp_max:
+            self.temp_max = t_max
+        self.temp_sum += t_mean * count
+        self.temp_count += count
+
+    @property
+    def temp_mean(self):
+        """Mean temperature or None without readings"""
+        if not self.temp_count:
+            return None
+        return self.temp_sum / self.temp_count
+
+
+class BatchReport:
+    """Single-pass report over a date range"""
+
+    HEADERS = [
+        'Period', 'Cycles', 'Completed', 'Skipped (temp)', 'Aborts',
+        'Min °C', 'Max °C', 'Mean °C', 'Above warning (min)'
+    ]
+
+    def __init__(self, config, start, end):
+        """
+        Initialize the report
+
+        Args:
+            config: Configuration dict
+            start: First day (datetime, inclusive)
+            end: Last day (datetime, exclusive)
+        """
+        self.config = config
+        self.start = start
+        self.end = end
+        self.warning = config['temperature']['warning']
+        # Gaps longer than this are between cycles, not time at temperature
+        self.max_gap = 2 * config['temperature']['check_interval']
+        self.days = {}
+        self.batches = self._load_batches(config.get('batches') or [])
+        self.total = Summary()
+
+    def _load_batches(self, batches):
+        """Batches overlapping the range; the whole range if none are set"""
+        result = []
+        for batch in batches:
+            b_start = datetime.fromisoformat(str(batch['start']))
+            # The end day is part of the batch
+            b_end = (
+                datetime.fromisoformat(str(batch['end'])) + timedelta(days=1)
+                if batch.get('end') else self.end
+            )
+            if b_start < self.end and b_end > self.start:
+                result.append((batch['name'], b_start, b_end, Summary()))
+        if not result:
+            result.append(('All data', self.start, self.end, Summary()))
+        return result
+
+    def _targets(self, when):
+        """Summaries an event at this time belongs to"""
+        day = when.date()
+        summary = self.days.get(day)
+        if summary is None:
+            summary = self.days[day] = Summary()
+        targets = [self.total, summary]
+        for _, b_start, b_end, batch_summary in self.batches:
+            if b_start <= when < b_end:
+                targets.append(batch_summary)
+        return targets
+
+    def build(self, log_file, archive_dir=None):
+        """
+        Stream the log once and fill the summaries
+
+        Time above warning is not known for down-sampled readings, only
+        raw readings count towards it.
+
+        Args:
+            log_file: Path to the live log
+            archive_dir: Directory with compressed archives
+        """
+        last_when = None
+        last_temp = None
+        last_targets = None
+
+        for when, kind, value in log_history.iter_events(
+                log_file, self.start, self.end, archive_dir):
+            targets = self._targets(when)
+
+            if kind == log_history.TEMPERATURE_ROLLUP:
+                for summary in targets:
+                    summary.add_rollup(*value)
+                last_temp = None
+                continue
+
+            if kind == log_history.TEMPERATURE:
+                if last_temp is not None and last_temp > self.warning:
+                    gap = (when - last_when).total_seconds()
+                    if gap <= self.max_gap:
+                        for summary in last_targets:
+                            summary.above_warning += gap
+                for summary in targets:
+                    summary.add_temperature(value)
+                last_when, last_temp, last_targets = when, value, targets
+                continue
+
+            for summary in targets:
+                if kind == log_history.CYCLE_START:
+                    summary.cycles += 1
+                elif kind == log_history.CYCLE_COMPLETE:
+                    summary.completed += 1
+                elif kind == log_history.CYCLE_SKIPPED:
+                    summary.skipped += 1
+                elif kind == log_history.CYCLE_ABORT:
+                    summary.aborts += 1
+
+    def _rows(self):
+        """Table rows: per batch, then per day"""
+        batches = [(name, s) for name, _, _, s in self.batches]
+        days = [(day.isoformat(), self.days[day]) for day in sorted(self.days)]
+        return batches, days
+
+    def plot(self):
+        """
+        Plot daily min/mean/max temperatures
+
+        Returns:
+            bytes: PNG image or None if matplotlib is unavailable
+        """
+        days = [day for day in sorted(self.days) if self.days[day].temp_count]
+        if plt is None or not days:
+            return None
+
+        fig = plt.figure(figsize=(12, 5))
+        plt.fill_between(
+            days,
+            [self.days[d].temp_min for d in days],
+            [self.days[d].temp_max for d in days],
+            color='#667eea', alpha=0.25, label='Min/Max'
+        )
+        plt.plot(days, [self.days[d].temp_mean for d in days],
+                 marker='o', linewidth=2, color='#667eea', label='Mean')
+        plt.axhline(y=self.warning, color='orange', linestyle='--', alpha=0.7,
+                    label=f'Warning ({self.warning}°C)')
+        plt.axhline(y=self.config['temperature']['max'], color='r',
+                    linestyle='--', alpha=0.7, label='Maximum')
+        plt.ylabel('Temperature (°C)')
+        plt.title('Fermentation Temperature by Day')
+        plt.legend()
+        plt.grid(True, alpha=0.3)
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=100)
+        plt.close(fig)
+        return buf.getvalue()
+
+    @staticmethod
+    def _cells(label, s):
+        """Format one summary as table cells"""
+        def fmt(value):
+            return '-' if value is None else f"{value:.2f}"
+        return [
+            label, str(s.cycles), str(s.completed), str(s.skipped),
+            str(s.aborts), fmt(s.temp_min), fmt(s.temp_max),
+            fmt(s.temp_mean), f"{s.above_warning / 60:.1f}"
+        ]
+
+    def to_markdown(self, image_name=None):
+        """Render the report as Markdown"""
+        batches, days = self._rows()
+        lines = [
+            '# 🥬 Fermentation Report',
+            '',
+            f"{self.start:%Y-%m-%d} – {self.end - timedelta(days=1):%Y-%m-%d}",
+            ''
+        ]
+
+        def table(title, rows):
+            lines.extend([f'## {title}', ''])
+            lines.append('| ' + ' | '.join(self.HEADERS) + ' |')
+            lines.append('|' + '---|' * len(self.HEADERS))
+            for label, s in rows:
+                lines.append('| ' + ' | '.join(self._cells(label, s)) + ' |')
+            lines.append('')
+
+        table('Batches', batches)
+        if image_name:
+            lines.extend([f'![Temperature by day]({image_name})', ''])
+        table('Days', days)
+        return '\n'.join(lines)
+
+    def to_html(self, image=None):
+        """Render the report as a self-contained HTML page"""
+        batches, days = self._rows()
+
+        def table(title, rows):
+            out = [f'<h2>{title}</h2>', '<table>', '<tr>']
+            out += [f'<th>{h}</th>' for h in self.HEADERS]
+            out.append('</tr>')
+            for label, s in rows:
+                cells = ''.join(
+                    f'<td>{html.escape(c)}</td>' for c in self._cells(label, s)
+                )
+                out.append(f'<tr>{cells}</tr>')
+            out.append('</table>')
+            return '\n'.join(out)
+
+        img = ''
+        if image:
+            data = base64.b64encode(image).decode('ascii')
+            img = f'<img alt="Temperature by day" src="data:image/png;base64,{data}">'
+
+        return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Fermentation Report</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+th:first-child, td:first-child {{ text-align: left; }}
+img {{ max-width: 100%; }}
+</style>
+</head>
+<body>
+<h1>🥬 Fermentation Report</h1>
+<p>{self.start:%Y-%m-%d} – {self.end - timedelta(days=1):%Y-%m-%d}</p>
+{table('Batches', batches)}
+{img}
+{table('Days', days)}
+</body>
+</html>
+"""
+
+
+def main():
+    """Generate a report"""
+    parser = argparse.ArgumentParser(description='Fermentation batch report')
+    parser.add_argument('--from', dest='start', required=True,
+                        help='First day (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end',
+                        help='Last day, inclusive (YYYY-MM-DD, default: today)')
+    parser.add_argument('--format', choices=['html', 'md'], default='html')
+    parser.add_argument('--output', default='reports',
+                        help='Output directory')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    start = datetime.fromisoformat(args.start)
+    last = datetime.fromisoformat(args.end) if args.end else datetime.now()
+    end = datetime(last.year, last.month, last.day) + timedelta(days=1)
+
+    report = BatchReport(config, start, end)
+    report.build(config['logging']['pump_log'],
+                 config['retention']['archive_dir'])
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    name = f"report_{start:%Y%m%d}_{last:%Y%m%d}"
+    image = report.plot()
+
+    if args.format == 'html':
+        path = output_dir / f"{name}.html"
+        path.write_text(report.to_html(image), encoding='utf-8')
+    else:
+        image_name = None
+        if image:
+            image_name = f"{name}.png"
+            (output_dir / image_name).write_bytes(image)
+        path = output_dir / f"{name}.md"
+        path.write_text(report.to_markdown(image_name), encoding='utf-8')
+
+    print(f"✓ Report saved: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
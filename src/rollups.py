@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rollups Module
+Temperature min/max/mean/count per minute, 15 minutes and hour, updated as
+readings arrive, so long-range views read buckets instead of raw samples
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import log_history
+from settings import load_config
+
+
+# Tier name, bucket seconds; finest first
+TIERS = (('1m', 60), ('15m', 900), ('1h', 3600))
+
+_MAGIC = b'FRUP'
+_VERSION = 1
+# magic, version, bucket seconds, slots
+_HEADER = struct.Struct('<4sHII')
+# bucket start (epoch, 0 = empty slot), min, max, mean, count
+_RECORD = struct.Struct('<IfffI')
+
+
+class RollupTier:
+    """
+    One resolution kept as a ring of fixed-size records
+
+    A bucket always lives in slot (start // seconds) % slots, so an update
+    is one in-memory change and one positioned write at flush, and the
+    file never grows past keep_seconds worth of buckets.
+    """
+
+    def __init__(self, path, seconds, keep_seconds):
+        """
+        Open (or create) the tier file
+
+        Args:
+            path: Tier file
+            seconds: Bucket length
+            keep_seconds: History kept before slots are reused
+        """
+        self.path = Path(path)
+        self.seconds = seconds
+        self.slots = max(1, keep_seconds // seconds)
+        self.keep_seconds = self.slots * seconds
+        # start -> [min, max, sum, count] not yet written
+        self.pending = {}
+        self._fd = self._open()
+
+    def _open(self):
+        """File descriptor of a tier file matching this layout"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        header = os.pread(fd, _HEADER.size, 0)
+        expected = _HEADER.pack(_MAGIC, _VERSION, self.seconds, self.slots)
+        size = _HEADER.size + self.slots * _RECORD.size
+        if header != expected or os.fstat(fd).st_size != size:
+            if header:
+                logging.warning(
+                    f"⚠️ Rollup file {self.path} has another layout, starting empty"
+                )
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, size)
+            os.pwrite(fd, expected, 0)
+        return fd
+
+    def _offset(self, start):
+        """File offset of a bucket's slot"""
+        return _HEADER.size + (start // self.seconds % self.slots) * _RECORD.size
+
+    def _stored(self, start):
+        """
+        Slot of a bucket as written to disk
+
+        Returns:
+            tuple: (start of the bucket in the slot, [min, max, sum, count]
+                if that is this bucket, else None)
+        """
+        record = _RECORD.unpack(os.pread(self._fd, _RECORD.size, self._offset(start)))
+        slot_start, t_min, t_max, t_mean, count = record
+        if slot_start != start or not count:
+            return slot_start, None
+        return slot_start, [t_min, t_max, t_mean * count, count]
+
+    def add(self, when, t_min, t_max, t_sum, count):
+        """
+        Merge readings into the bucket containing an epoch timestamp
+
+        Args:
+            when: Epoch seconds
+            t_min: Lowest reading
+            t_max: Highest reading
+            t_sum: Sum of the readings
+            count: Number of readings
+        """
+        start = int(when) - int(when) % self.seconds
+        bucket = self.pending.get(start)
+        if bucket is None:
+            if self.pending and start - next(iter(self.pending)) >= self.keep_seconds:
+                # The ring wrapped since the oldest pending bucket (replaying
+                # old logs), write it before its slot is taken again
+                self.flush()
+            slot_start, bucket = self._stored(start)
+            if slot_start > start:
+                # Too old, the slot already holds a newer bucket
+                return
+            # Continues a bucket written before a restart
+            bucket = bucket or [t_min, t_max, 0.0, 0]
+            self.pending[start] = bucket
+        if t_min < bucket[0]:
+            bucket[0] = t_min
+        if t_max > bucket[1]:
+            bucket[1] = t_max
+        bucket[2] += t_sum
+        bucket[3] += count
+
+    def flush(self):
+        """Write the changed buckets to their slots"""
+        for start, (t_min, t_max, t_sum, count) in self.pending.items():
+            os.pwrite(
+                self._fd,
+                _RECORD.pack(start, t_min, t_max, t_sum / count, count),
+                self._offset(start)
+            )
+        self.pending.clear()
+
+    def read(self, start, end):
+        """
+        Buckets overlapping a time range
+
+        Args:
+            start: Epoch seconds
+            end: Epoch seconds (exclusive)
+
+        Returns:
+            list: (start, min, max, mean, count) tuples of non-empty buckets
+        """
+        first = int(start) - int(start) % self.seconds
+        count = max(0, -(-(int(end) - first) // self.seconds))
+        if count > self.slots:
+            # Older buckets are gone, the ring holds the last `slots`
+            first += (count - self.slots) * self.seconds
+            count = self.slots
+        if not count:
+            return []
+        # The range is one or two contiguous runs of slots
+        slot = first // self.seconds % self.slots
+        data = os.pread(self._fd, min(count, self.slots - slot) * _RECORD.size,
+                        _HEADER.size + slot * _RECORD.size)
+        if slot + count > self.slots:
+            data += os.pread(self._fd, (slot + count - self.slots) * _RECORD.size,
+                             _HEADER.size)
+
+        buckets = {}
+        last = first + count * self.seconds
+        for record in _RECORD.iter_unpack(data):
+            # Slots still holding an older lap of the ring are skipped
+            if first <= record[0] < last and record[4]:
+                buckets[record[0]] = record
+        for bucket_start, (t_min, t_max, t_sum, n) in self.pending.items():
+            if first <= bucket_start < last:
+                buckets[bucket_start] = (bucket_start, t_min, t_max, t_sum / n, n)
+        return [buckets[key] for key in sorted(buckets)]
+
+    def close(self):
+        """Write pending buckets and close the file (no-op if closed)"""
+        if self._fd is None:
+            return
+        self.flush()
+        os.close(self._fd)
+        self._fd = None
+
+
+class RollupStore:
+    """All tiers of the temperature rollups"""
+
+    def __init__(self, directory, keep_days=None, flush_interval=60, clock=time):
+        """
+        Open the tiers
+
+        Args:
+            directory: Directory holding one file per tier
+            keep_days: Tier name -> days of history (default 30 each)
+            flush_interval: Minimum seconds between writes
+            clock: Object providing time() and monotonic()
+        """
+        keep_days = keep_days or {}
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.tiers = [
+            (name, RollupTier(
+                self.directory / f"temperature-{name}.dat", seconds,
+                int(keep_days.get(name, 30) * 86400)
+            ))
+            for name, seconds in TIERS
+        ]
+        self._lock = threading.Lock()
+        self._last_flush = clock.monotonic()
+
+    @classmethod
+    def from_config(cls, config, clock=time):
+        """
+        Open the store described by the rollups config section
+
+        Args:
+            config: Configuration dict
+
+        Returns:
+            RollupStore
+        """
+        rollup_config = config['rollups']
+        return cls(
+            rollup_config['dir'], rollup_config['keep_days'],
+            rollup_config['flush_interval'], clock=clock
+        )
+
+    def add(self, temp, when=None):
+        """
+        Add one reading to every tier
+
+        Args:
+            temp: Temperature in °C
+            when: Epoch seconds (default: now)
+        """
+        when = self.clock.time() if when is None else when
+        with self._lock:
+            for _, tier in self.tiers:
+                tier.add(when, temp, temp, temp, 1)
+        if self.clock.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def add_rollup(self, when, t_min, t_max, t_mean, count, seconds=3600):
+        """
+        Add readings that were already aggregated
+
+        Only tiers at least as coarse as the aggregate get it, a finer
+        bucket cannot tell where in the period the readings fell.
+
+        Args:
+            when: Epoch seconds within the aggregated period
+            t_min: Lowest reading
+            t_max: Highest reading
+            t_mean: Mean reading
+            count: Number of readings
+            seconds: Length of the aggregated period
+        """
+        with self._lock:
+            for _, tier in self.tiers:
+                if tier.seconds >= seconds:
+                    tier.add(when, t_min, t_max, t_mean * count, count)
+
+    def flush(self):
+        """Write the changed buckets of all tiers"""
+        with self._lock:
+            for _, tier in self.tiers:
+                tier.flush()
+            self._last_flush = self.clock.monotonic()
+
+    def close(self):
+        """Flush and close the tier files"""
+        with self._lock:
+            for _, tier in self.tiers:
+                tier.close()
+
+    def tier_for(self, resolution, start):
+        """
+        Finest tier at least as coarse as a resolution that still covers start
+
+        Args:
+            resolution: Seconds per point wanted
+            start: Epoch seconds of the first point
+
+        Returns:
+            tuple: (name, RollupTier)
+        """
+        age = self.clock.time() - start
+        finer = sum(1 for _, tier in self.tiers if tier.seconds < resolution)
+        for name, tier in self.tiers[min(finer, len(self.tiers) - 1):]:
+            # A finer tier may already have reused the slots of that period
+            if tier.keep_seconds >= age:
+                return name, tier
+        return self.tiers[-1]
+
+    def query(self, start, end, resolution=None, max_points=None):
+        """
+        Temperature buckets for a time range
+
+        Args:
+            start: Epoch seconds
+            end: Epoch seconds (exclusive)
+            resolution: Seconds per point wanted (default from max_points)
+            max_points: Most points returned; when the tier is still too
+                fine, neighbouring buckets are merged (default 1000 if no
+                resolution is given, else no limit)
+
+        Returns:
+            dict: 'tier', 'seconds' (per point) and 'points' as
+                [start, min, max, mean, count] lists
+        """
+        if resolution is None:
+            max_points = max_points or 1000
+            resolution = (end - start) / max_points
+        name, tier = self.tier_for(resolution, start)
+        with self._lock:
+            buckets = tier.read(start, end)
+        seconds = tier.seconds
+        if max_points and len(buckets) > max_points:
+            seconds, buckets = merge_buckets(buckets, tier.seconds, max_points)
+        return {
+            'tier': name,
+            'seconds': seconds,
+            'points': [
+                [b_start, round(t_min, 2), round(t_max, 2), round(t_mean, 2), count]
+                for b_start, t_min, t_max, t_mean, count in buckets
+            ],
+        }
+
+
+def merge_buckets(buckets, seconds, max_points):
+    """
+    Merge buckets into wider aligned ones until at most max_points remain
+
+    Args:
+        buckets: (start, min, max, mean, count) tuples in time order
+        seconds: Bucket length
+        max_points: Most buckets to return
+
+    Returns:
+        tuple: (seconds per merged bucket, merged buckets)
+    """
+    span = (buckets[-1][0] - buckets[0][0]) // seconds + 1
+    factor = max(2, -(-span // max_points))
+    while True:
+        width = seconds * factor
+        merged = {}
+        for b_start, t_min, t_max, t_mean, count in buckets:
+            key = b_start - b_start % width
+            bucket = merged.get(key)
+            if bucket is None:
+                merged[key] = [t_min, t_max, t_mean * count, count]
+            else:
+                bucket[0] = min(bucket[0], t_min)
+                bucket[1] = max(bucket[1], t_max)
+                bucket[2] += t_mean * count
+                bucket[3] += count
+        if len(merged) <= max_points:
+            return width, [
+                (key, t_min, t_max, t_sum / count, count)
+                for key, (t_min, t_max, t_sum, count) in merged.items()
+            ]
+        factor += 1
+
+
+def rebuild(config, store):
+    """
+    Fill the store from the readings in the logs and their archives
+
+    Args:
+        config: Configuration dict
+        store: RollupStore (empty, or readings are counted twice)
+
+    Returns:
+        int: Readings added
+    """
+    readings = 0
+    events = log_history.iter_events(
+        config['logging']['pump_log'],
+        archive_dir=config['retention']['archive_dir']
+    )
+    for when, kind, value in events:
+        if kind == log_history.TEMPERATURE:
+            store.add(value, when.timestamp())
+            readings += 1
+        elif kind == log_history.TEMPERATURE_ROLLUP:
+            # Hourly rollups written by log_retention.py
+            store.add_rollup(when.timestamp(), *value)
+            readings += value[3]
+    store.flush()
+    return readings
+
+
+def main():
+    """Query the rollups or rebuild them from the logs"""
+    parser = argparse.ArgumentParser(description='Temperature rollups')
+    parser.add_argument('--hours', type=float, default=24, help='Range to show')
+    parser.add_argument('--points', type=int, default=48, help='Points wanted')
+    parser.add_argument('--json', action='store_true', help='Print JSON')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recreate the rollups from the logs')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not math.isfinite(args.hours) or args.hours <= 0 or args.points < 1:
+        print("❌ --hours and --points must be positive")
+        return 1
+
+    config = load_config(args.config)
+    if args.rebuild:
+        directory = Path(config['rollups']['dir'])
+        for name, _ in TIERS:
+            (directory / f"temperature-{name}.dat").unlink(missing_ok=True)
+        store = RollupStore.from_config(config)
+        started = time.perf_counter()
+        readings = rebuild(config, store)
+        store.close()
+        print(f"📈 Rebuilt rollups from {readings} readings "
+              f"in {time.perf_counter() - started:.1f}s")
+        return 0
+
+    store = RollupStore.from_config(config)
+    end = time.time()
+    result = store.query(end - args.hours * 3600, end, max_points=args.points)
+    store.close()
+    if args.json:
+        print(json.dumps(result))
+        return 0
+
+    print(f"📈 {len(result['points'])} points from the {result['tier']} tier")
+    for b_start, t_min, t_max, t_mean, count in result['points']:
+        stamp = datetime.fromtimestamp(b_start)
+        print(f"   {stamp:%Y-%m-%d %H:%M}  min {t_min:6.2f}C  max {t_max:6.2f}C  "
+              f"mean {t_mean:6.2f}C  n={count}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Settings Module
+Configuration loading with defaults shared by all tools
+"""
+
+import copy
+import yaml
+
+# The C parser (when PyYAML was built with libyaml) is several times faster
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+DEFAULT_CONFIG = {
+    'pump': {'run_time': 600, 'gpio_pin': 17},
+    'temperature': {
+        'min': 15.0, 'max': 30.0, 'warning': 25.0,
+        'check_interval': 30, 'gpio_pin': 4
+    },
+    'schedule': {
+        'morning': '09:00',
+        'evening': '21:00'
+    },
+    'logging': {
+        'pump_log': 'logs/fermentation.log',
+        'level': 'INFO'
+    },
+    'watchdog': {
+        'enabled': True,
+        'heartbeat_interval': 2,
+        'heartbeat_timeout': 10,
+        'max_on_time': 900
+    },
+    'retention': {
+        'archive_dir': 'logs/archive',
+        'compression': 'gzip',
+        'block_size': 65536,
+        'rollup_after_days': 30,
+        'keep_days': 365
+    },
+    'web': {
+        'host': '0.0.0.0',
+        'port': 8080,
+        'sample_interval': 5
+    },
+    'export': {
+        'cursor_file': 'state/export_cursor.json',
+        'chunk_hours': 24
+    },
+    'tracing': {
+        'enabled': False,
+        'buffer_size': 65536,
+        'sample_interval': 0,
+        'output_dir': 'logs/traces'
+    },
+    'journal': {
+        'path': 'state/cycle_journal.json',
+        'flush_interval': 60,
+        'resume_window': 21600,
+        'min_remaining': 30
+    },
+    'energy': {
+        'path': 'state/energy.dat',
+        'pump_watts': 35,
+        'relay_rated_cycles': 100000,
+        'flush_interval': 60,
+        'hourly_buckets': 168,
+        'daily_buckets': 400
+    },
+    'alerts': {
+        'enabled': True,
+        'state_file': 'state/alerts.json',
+        'hysteresis': 1.0,
+        'rate_limit': 900,
+        'repeat_interval': 21600,
+        'notify_resolved': True,
+        'queue_size': 100,
+        'timeout': 10,
+        'drain_timeout': 15,
+        'sinks': []
+    },
+    'fleet': {
+        'nodes': [],
+        'host': '0.0.0.0',
+        'port': 8090,
+        'store_dir': 'fleet',
+        'flush_interval': 10,
+        'connect_timeout': 5,
+        'read_timeout': 45,
+        'reconnect_min': 1,
+        'reconnect_max': 60,
+        'max_connecting': 16,
+        'client_queue_size': 1000
+    },
+    'startup': {
+        'budget': 1.0,
+        'sensor_manifest': 'state/sensors.json'
+    },
+    'sensors': {
+        'calibration': {},
+        'fusion': 'median',
+        'weights': {},
+        'outlier_threshold': 1.0,
+        'min_probes': 1
+    },
+    'rollups': {
+        'enabled': True,
+        'dir': 'state/rollups',
+        'sample_interval': 30,
+        'flush_interval': 60,
+        'keep_days': {'1m': 7, '15m': 90, '1h': 730}
+    }
+}
+
+
+def load_config(config_file='config.yaml'):
+    """
+    Load configuration, filling missing sections and keys with defaults
+
+    Args:
+        config_file: Path to configuration file
+
+    Returns:
+        dict: Configuration
+    """
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            loaded = yaml.load(f, Loader=_Loader) or {}
+    except FileNotFoundError:
+        return config
+
+    for section, values in loaded.items():
+        if isinstance(values, dict) and isinstance(config.get(section), dict):
+            config[section].update(values)
+        else:
+            config[section] = values
+    return config
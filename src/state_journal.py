@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+State Journal Module
+Crash-consistent record of the current pump cycle so an interrupted
+cycle can be resumed after a reboot
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+class CycleJournal:
+    """Write-ahead journal of the running cycle"""
+
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    ABORTED = 'aborted'
+    ABANDONED = 'abandoned'
+
+    def __init__(self, path, flush_interval=60, clock=time):
+        """
+        Initialize the journal
+
+        Args:
+            path: Journal file (must be on persistent storage)
+            flush_interval: Minimum seconds between progress writes, so a
+                cycle costs the SD card a handful of writes
+            clock: Object providing monotonic() and time()
+        """
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.record = None
+        self._last_flush = 0.0
+
+    def load(self):
+        """
+        Read the last journal record
+
+        Returns:
+            dict: Record or None if there is no (readable) journal
+        """
+        try:
+            return json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Cannot happen with atomic renames, unless the card is damaged
+            logging.error(f"❌ Corrupt state journal {self.path}, ignoring it")
+            return None
+        except OSError as e:
+            logging.error(f"❌ Could not read state journal {self.path}: {e}")
+            return None
+
+    def _now(self):
+        """Wall-clock time of the injected clock"""
+        return datetime.fromtimestamp(self.clock.time())
+
+    def _flush(self):
+        """
+        Atomically replace the journal: write, fsync, rename, fsync dir
+
+        Best effort like the other state files: a failing card is logged and
+        the cycle goes on, it only loses the ability to resume.
+        """
+        self.record['updated'] = self._now().isoformat(timespec='seconds')
+        # Also after a failure, so a dead card is not retried on every update
+        self._last_flush = self.clock.monotonic()
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump(self.record, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError as e:
+            logging.error(f"❌ Could not write state journal {self.path}: {e}")
+
+    def start_cycle(self, run_time, temp=None, resumed_from=None):
+        """
+        Record a cycle start before the pump is switched on
+
+        Args:
+            run_time: Planned pump run time in seconds
+            temp: Initial temperature
+            resumed_from: Start time of the interrupted cycle being resumed
+        """
+        self.record = {
+            'status': self.RUNNING,
+            'started': self._now().isoformat(timespec='seconds'),
+            'run_time': run_time,
+            'elapsed': 0,
+            'last_temp': temp,
+            'resumed_from': resumed_from,
+        }
+        self._flush()
+
+    def update(self, elapsed, temp=None):
+        """
+        Record progress; written at most every flush_interval seconds
+
+        Args:
+            elapsed: Seconds the pump has run in this cycle
+            temp: Last temperature reading
+        """
+        if self.record is None:
+            return
+        self.record['elapsed'] = elapsed
+        if temp is not None:
+            self.record['last_temp'] = temp
+        if self.clock.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def finish(self, status, elapsed=None):
+        """
+        Record the end of the cycle
+
+        Args:
+            status: COMPLETED, ABORTED or ABANDONED
+            elapsed: Final run time in seconds
+        """
+        if self.record is None:
+            return
+        if elapsed is not None:
+            self.record['elapsed'] = elapsed
+        self.record['status'] = status
+        self._flush()
+        self.record = None
+
+    def interrupted_cycle(self, resume_window, min_remaining):
+        """
+        Cycle that was still running when the controller died
+
+        Cycles interrupted too long ago or with almost nothing left are
+        marked abandoned instead.
+
+        Args:
+            resume_window: Seconds after the start during which a cycle
+                may still be resumed
+            min_remaining: Seconds below which resuming is not worth it
+
+        Returns:
+            dict: Interrupted record with 'remaining' seconds, or None
+        """
+        record = self.load()
+        if not isinstance(record, dict) or record.get('status') != self.RUNNING:
+            return None
+
+        try:
+            remaining = record.get('run_time') - record.get('elapsed')
+            started = datetime.fromisoformat(record.get('started'))
+        except (TypeError, ValueError):
+            # Truncated or older format, nothing safe to resume
+            logging.error(f"❌ Unusable record in state journal {self.path}, ignoring it")
+            return None
+        too_old = self._now() - started > timedelta(seconds=resume_window)
+
+        if too_old or remaining < min_remaining:
+            logging.warning(
+                f"⚠️ Interrupted cycle from {record['started']} not resumed "
+                f"({record['elapsed']}/{record['run_time']}s done)"
+            )
+            self.record = record
+            self.finish(self.ABANDONED)
+            return None
+
+        record['remaining'] = remaining
+        self.record = record
+        return record
@@ -6,73 +6,268 @@ Reading temperature from DS18B20 sensor
 """
 
 import glob
+import json
+import os
 import time
 import logging
+from pathlib import Path
+
+import tracing
+
+
+def discover(base_dir):
+    """
+    Scan the 1-Wire bus directory for DS18B20 probes
+
+    Args:
+        base_dir: Base directory for 1-Wire devices
+
+    Returns:
+        list: Dicts with 'id', 'path' (w1_slave) and 'resolution' (bits,
+            None if the kernel does not expose it), sorted by id
+    """
+    devices = []
+    for folder in sorted(glob.glob(os.path.join(base_dir, '28*'))):
+        try:
+            with open(os.path.join(folder, 'resolution')) as f:
+                resolution = int(f.read().strip())
+        except (OSError, ValueError):
+            resolution = None
+        devices.append({
+            'id': os.path.basename(folder),
+            'path': os.path.join(folder, 'w1_slave'),
+            'resolution': resolution,
+        })
+    return devices
+
+
+def parse_w1_slave(lines):
+    """
+    Temperature from the two lines of a w1_slave file
+
+    Args:
+        lines: Lines read from w1_slave
+
+    Returns:
+        float: Temperature in °C, or None on a CRC failure or garbled data
+    """
+    if len(lines) < 2 or lines[0].strip()[-3:] != 'YES':
+        return None
+    equals_pos = lines[1].find('t=')
+    if equals_pos == -1:
+        return None
+    try:
+        return float(lines[1][equals_pos+2:]) / 1000.0
+    except ValueError:
+        return None
+
+
+class SensorManifest:
+    """On-disk cache of the last discovery, so startup skips the bus scan"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Manifest JSON file
+        """
+        self.path = Path(path)
+
+    def load(self, base_dir):
+        """
+        Cached devices, validated with one listing of the bus directory
+
+        A probe added or removed since the cache was written makes it stale,
+        so a new probe is not left out of the fusion.
+
+        Returns:
+            list: Devices, or None if the cache is missing or stale
+        """
+        try:
+            manifest = json.loads(self.path.read_text())
+            present = sorted(
+                name for name in os.listdir(base_dir) if name.startswith('28')
+            )
+        except (OSError, ValueError):
+            return None
+        devices = manifest.get('devices')
+        if manifest.get('base_dir') != base_dir or not devices:
+            return None
+        if [device.get('id') for device in devices] != present:
+            return None
+        return devices
+
+    def save(self, base_dir, devices):
+        """Store a discovery result (best effort)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            tmp.write_text(json.dumps({'base_dir': base_dir, 'devices': devices}))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.warning(f"⚠️ Cannot write sensor manifest: {e}")
+
+    def clear(self):
+        """Forget the cached devices"""
+        self.path.unlink(missing_ok=True)
+
 
 class DS18B20Sensor:
     """Class for working with DS18B20 temperature sensor"""
     
-    def __init__(self, base_dir='/sys/bus/w1/devices/'):
+    def __init__(self, base_dir='/sys/bus/w1/devices/', clock=time, manifest=None,
+                 fusion=None):
         """
         Initialize the sensor
         
         Args:
             base_dir: Base directory for 1-Wire devices
+            clock: Object providing sleep() (the time module, or a
+                virtual clock when replaying)
+            manifest: Discovery cache file (None scans the bus every time)
+            fusion: ProbeFusion applied to all probes by read_temperature()
+                (None reads the first probe uncalibrated)
         """
         self.base_dir = base_dir
+        self.clock = clock
+        self.manifest = SensorManifest(manifest) if manifest else None
+        self.fusion = fusion
         self.device_file = None
+        self.devices = []
+        self._bulk_files = None
         self._find_device()
     
     def _find_device(self):
-        """Find DS18B20 device"""
-        try:
-            device_folder = glob.glob(self.base_dir + '28*')[0]
-            self.device_file = device_folder + '/w1_slave'
-            logging.info(f"DS18B20 found: {device_folder}")
-        except IndexError:
-            logging.error("DS18B20 sensor not found!")
-            raise Exception("DS18B20 not found. Check wiring.")
+        """Find DS18B20 device, from the manifest when it is still valid"""
+        devices = self.manifest.load(self.base_dir) if self.manifest else None
+        if not devices:
+            devices = discover(self.base_dir)
+            if not devices:
+                logging.error("DS18B20 sensor not found!")
+                raise Exception("DS18B20 not found. Check wiring.")
+            logging.info(
+                f"DS18B20 found: {', '.join(d['id'] for d in devices)}"
+            )
+            if self.manifest:
+                self.manifest.save(self.base_dir, devices)
+        self.devices = devices
+        self.device_file = devices[0]['path']
     
-    def _read_temp_raw(self):
-        """Read raw data from sensor"""
+    def rescan(self):
+        """Drop cached discovery results and scan the bus again"""
+        if self.manifest:
+            self.manifest.clear()
+        self._find_device()
+    
+    @tracing.traced('sensor_read_raw')
+    def _read_temp_raw(self, device_file=None):
+        """Read raw data from sensor (default: the first probe)"""
         try:
-            with open(self.device_file, 'r') as f:
+            with open(device_file or self.device_file, 'r') as f:
                 return f.readlines()
         except Exception as e:
             logging.error(f"Read error: {e}")
             return None
     
-    def read_temperature(self, retries=3):
+    def _read_device(self, device_file, retries):
         """
-        Read temperature from sensor
-        
-        Args:
-            retries: Number of retry attempts on error
-            
+        One probe's temperature, retrying failed reads
+
         Returns:
-            float: Temperature in °C or None on error
+            float: Unrounded °C, or None
         """
         for attempt in range(retries):
-            lines = self._read_temp_raw()
+            lines = self._read_temp_raw(device_file)
             
             if lines is None:
-                time.sleep(0.5)
+                # A cached device that disappeared (probe replaced or
+                # re-enumerated) triggers a rescan
+                if self.manifest and not os.path.exists(device_file):
+                    try:
+                        self.rescan()
+                    except Exception:
+                        pass
+                    return None
+                self.clock.sleep(0.5)
                 continue
             
-            # Check for valid reading (YES)
-            if lines[0].strip()[-3:] != 'YES':
-                time.sleep(0.2)
+            temp_c = parse_w1_slave(lines)
+            if temp_c is None:
+                # CRC failure, the next read converts again
+                self.clock.sleep(0.2)
                 continue
+            return temp_c
+        return None
+    
+    def _trigger_bulk_conversion(self):
+        """
+        Start one simultaneous conversion on every probe of each bus
+
+        The following w1_slave reads return the converted values instead of
+        each starting its own ~750 ms conversion. Buses without
+        therm_bulk_read (older kernels) convert per probe as before.
+        """
+        if self._bulk_files is None:
+            self._bulk_files = glob.glob(
+                os.path.join(self.base_dir, 'w1_bus_master*', 'therm_bulk_read')
+            )
+        for path in list(self._bulk_files):
+            try:
+                with open(path, 'w') as f:
+                    f.write('trigger\n')
+            except OSError as e:
+                logging.info(f"Bulk conversion unavailable on {path}: {e}")
+                self._bulk_files.remove(path)
+    
+    @tracing.traced('read_all')
+    def read_all(self, retries=3):
+        """
+        Read every probe from one bus conversion
+
+        Args:
+            retries: Number of retry attempts per probe
+
+        Returns:
+            dict: Probe id -> temperature in °C (None for a failed probe)
+        """
+        for attempt in range(2):
+            devices = self.devices
+            if len(devices) > 1:
+                self._trigger_bulk_conversion()
+            readings = {
+                device['id']: self._read_device(device['path'], retries)
+                for device in devices
+            }
+            if self.devices is devices:
+                break
+            # Rescanned after a probe vanished, read the probes found now
+        return readings
+    
+    @tracing.traced('read_temperature')
+    def read_temperature(self, retries=3):
+        """
+        Read temperature from sensor
+        
+        With a fusion layer this is the calibrated, combined value of all
+        probes; otherwise the raw value of the first probe.
+        
+        Args:
+            retries: Number of retry attempts on error
             
-            # Extract temperature
-            equals_pos = lines[1].find('t=')
-            if equals_pos != -1:
-                temp_string = lines[1][equals_pos+2:]
-                temp_c = float(temp_string) / 1000.0
-                return round(temp_c, 2)
+        Returns:
+            float: Temperature in °C or None on error
+        """
+        if self.fusion is not None:
+            return self.fusion.combine(self.read_all(retries))
         
-        logging.error(f"Cannot read temperature after {retries} attempts")
-        return None
+        device_file = self.device_file
+        temp_c = self._read_device(device_file, retries)
+        if temp_c is None and self.device_file != device_file:
+            # Rescanned after the probe vanished, read the one found now
+            temp_c = self._read_device(self.device_file, retries)
+        if temp_c is None:
+            logging.error(f"Cannot read temperature after {retries} attempts")
+            return None
+        return round(temp_c, 2)
     
     def read_temperature_f(self):
         """Return temperature in Fahrenheit"""
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tracing Module
+Opt-in timing spans recorded into a preallocated ring buffer, exported
+as Chrome trace-event JSON, plus a sampling profiler for long runs
+"""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+
+
+class _NoSpan:
+    """Context manager used while tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    """Context manager measuring one span"""
+
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer.record(self.name, self.start, end - self.start)
+        return False
+
+
+class Tracer:
+    """Span recorder backed by fixed-size arrays"""
+
+    def __init__(self, capacity=65536):
+        """
+        Initialize the tracer (disabled until enable() is called)
+
+        Args:
+            capacity: Spans kept; the oldest are overwritten when full
+        """
+        self.enabled = False
+        self._allocate(capacity)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._profiler = None
+
+    def _allocate(self, capacity):
+        """Preallocate the ring buffer so recording never allocates"""
+        self.capacity = capacity
+        self._names = [None] * capacity
+        self._starts = array('q', bytes(8 * capacity))
+        self._durations = array('q', bytes(8 * capacity))
+        self._threads = array('Q', bytes(8 * capacity))
+        self._count = 0
+
+    def enable(self, capacity=None):
+        """
+        Start recording
+
+        Args:
+            capacity: New buffer size (keeps the current one if None)
+        """
+        if capacity and capacity != self.capacity:
+            self._allocate(capacity)
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording"""
+        self.enabled = False
+
+    def span(self, name):
+        """
+        Context manager timing a block
+
+        Args:
+            name: Span name
+
+        Returns:
+            Context manager (a shared no-op one while disabled)
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name)
+
+    def record(self, name, start, duration):
+        """
+        Store a finished span
+
+        Args:
+            name: Span name
+            start: perf_counter_ns() at span start
+            duration: Duration in nanoseconds
+        """
+        with self._lock:
+            slot = self._count % self.capacity
+            self._names[slot] = name
+            self._starts[slot] = start
+            self._durations[slot] = duration
+            self._threads[slot] = threading.get_ident()
+            self._count += 1
+
+    @property
+    def dropped(self):
+        """Spans overwritten because the buffer was full"""
+        return max(0, self._count - self.capacity)
+
+    def events(self):
+        """
+        Recorded spans as Chrome trace events, oldest first
+
+        Returns:
+            list: Complete ('X') events with microsecond timestamps
+        """
+        pid = os.getpid()
+        with self._lock:
+            count = min(self._count, self.capacity)
+            first = self._count - count
+            result = []
+            for i in range(first, self._count):
+                slot = i % self.capacity
+                result.append({
+                    'name': self._names[slot],
+                    'ph': 'X',
+                    'ts': (self._starts[slot] - self._origin) / 1000,
+                    'dur': self._durations[slot] / 1000,
+                    'pid': pid,
+                    'tid': self._threads[slot],
+                })
+        return result
+
+    def export_chrome(self, path):
+        """
+        Write a trace for chrome://tracing or ui.perfetto.dev
+
+        Args:
+            path: Output JSON path
+
+        Returns:
+            Path: Written file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        trace = {
+            'traceEvents': self.events(),
+            'displayTimeUnit': 'ms',
+            'otherData': {'dropped_spans': self.dropped},
+        }
+        path.write_text(json.dumps(trace))
+        return path
+
+    def start_profiler(self, interval, thread_id=None):
+        """
+        Sample the stack of a thread periodically
+
+        Args:
+            interval: Seconds between samples
+            thread_id: Thread to sample (default: calling thread)
+        """
+        if self._profiler is None:
+            self._profiler = SamplingProfiler(
+                interval, thread_id or threading.get_ident()
+            )
+            self._profiler.start()
+
+    def stop_profiler(self, path=None):
+        """
+        Stop the sampling profiler
+
+        Args:
+            path: Where to write the collapsed stacks (skipped if None)
+
+        Returns:
+            Path: Written file or None
+        """
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return None
+        profiler.stop()
+        if path:
+            return profiler.export_folded(path)
+        return None
+
+    def instrument_logging(self):
+        """Time every log record handled by the root logger's handlers"""
+        for handler in logging.getLogger().handlers:
+            if getattr(handler, '_traced', False):
+                continue
+            handler.handle = self.traced('logging')(handler.handle)
+            handler._traced = True
+
+    def traced(self, name):
+        """
+        Decorator recording a span for every call while enabled
+
+        Args:
+            name: Span name
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, start, time.perf_counter_ns() - start)
+            return wrapper
+        return decorator
+
+
+class SamplingProfiler(threading.Thread):
+    """Background thread collecting stack samples of one thread"""
+
+    def __init__(self, interval, thread_id):
+        """
+        Initialize the profiler
+
+        Args:
+            interval: Seconds between samples
+            thread_id: Thread to sample
+        """
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.thread_id = thread_id
+        # Collapsed stack -> sample count, bounded by distinct code paths
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Sample until stopped"""
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f"{Path(code.co_filename).stem}.{code.co_name}"
+                )
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        """Stop sampling and wait for the thread"""
+        self._stop_event.set()
+        self.join()
+
+    def export_folded(self, path):
+        """
+        Write collapsed stacks (flamegraph.pl / speedscope format)
+
+        Args:
+            path: Output path
+
+        Returns:
+            Path: Written file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+# Process-wide tracer used by the controller modules
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
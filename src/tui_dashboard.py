@@ -2,16 +2,22 @@
 # -*- coding: utf-8 -*-
 """TUI Dashboard - Terminal User Interface"""
 
+import bisect
 import curses
 import sys
 import subprocess
 import threading
 import time
+from array import array
 from pathlib import Path
 from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent))
 from pump_control import PumpController
+import log_index
+
+LOG_FILE = 'logs/fermentation.log'
+ARCHIVE_DIR = 'logs/archive'
 
 last_log_lines = []
 
@@ -43,11 +49,20 @@ def stop_pump():
             pass
     return False
 
-def read_log_tail(lines=10):
-    """Read last N lines from log file"""
+def read_log_tail(lines=10, chunk_size=8192):
+    """Read last N lines from log file without reading the whole file"""
     try:
-        with open('logs/fermentation.log', 'r') as f:
-            return f.readlines()[-lines:]
+        with open(LOG_FILE, 'rb') as f:
+            f.seek(0, 2)
+            pos = f.tell()
+            data = b''
+            while pos > 0 and data.count(b'\n') <= lines:
+                step = min(chunk_size, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        tail = data.decode('utf-8', errors='replace').splitlines(keepends=True)
+        return tail[-lines:] if lines > 0 else []
     except:
         return ["No log file available"]
 
@@ -150,36 +165,187 @@ def draw_dashboard(stdscr):
         elif key == ord('l') or key == ord('L'):
             show_full_log(stdscr)
 
+LEVEL_FILTERS = [0, log_index.LEVELS['WARNING'], log_index.LEVELS['ERROR'],
+                 log_index.LEVELS['CRITICAL']]
+
+def prompt(stdscr, text):
+    """Read a line of input on the bottom row"""
+    height, width = stdscr.getmaxyx()
+    stdscr.move(height - 1, 0)
+    stdscr.clrtoeol()
+    stdscr.addstr(height - 1, 0, text, curses.A_BOLD)
+    curses.echo()
+    curses.curs_set(1)
+    stdscr.timeout(-1)
+    try:
+        value = stdscr.getstr(height - 1, len(text), width - len(text) - 1)
+    finally:
+        stdscr.timeout(1000)
+        curses.curs_set(0)
+        curses.noecho()
+    return value.decode('utf-8', errors='replace').strip()
+
+def parse_jump_time(text):
+    """Parse 'YYYY-MM-DD HH:MM[:SS]' or 'HH:MM[:SS]' (today)"""
+    if len(text) <= 8:
+        text = f"{datetime.now():%Y-%m-%d} {text}"
+    return datetime.fromisoformat(text)
+
 def show_full_log(stdscr):
     """Show full log in scrollable view"""
-    try:
-        with open('logs/fermentation.log', 'r') as f:
-            lines = f.readlines()
-    except:
-        lines = ["No log file available"]
+    # Lines are read through a memory-mapped index, never loaded as a whole
+    browser = log_index.SegmentBrowser(LOG_FILE, ARCHIVE_DIR)
+    min_level = 0
+    keyword = ''
+    search = ''
+    match = None
+    message = ''
+    view = None
+    follow = True
+    top = 0
     
-    offset = max(0, len(lines) - curses.LINES + 3)
+    def filtered(start=0):
+        """Line numbers from start on passing the filters, or None for all lines"""
+        index = browser.index
+        if keyword:
+            lines = index.filter_keyword(keyword, start)
+            if min_level:
+                lines = array('I', (i for i in lines if index.level(i) >= min_level))
+            return lines
+        if min_level:
+            return index.filter_level(min_level, start)
+        return None
     
-    while True:
-        stdscr.clear()
-        height, width = stdscr.getmaxyx()
-        
-        stdscr.addstr(0, 0, "LOG VIEW (↑/↓ to scroll, Q to return)", curses.A_BOLD)
-        stdscr.addstr(1, 0, "=" * width)
-        
-        for i in range(height - 3):
-            if offset + i < len(lines):
-                stdscr.addstr(i + 2, 0, lines[offset + i].strip()[:width-1])
-        
-        stdscr.refresh()
-        
-        key = stdscr.getch()
-        if key == ord('q') or key == ord('Q'):
-            break
-        elif key == curses.KEY_UP and offset > 0:
-            offset -= 1
-        elif key == curses.KEY_DOWN and offset < len(lines) - (height - 3):
-            offset += 1
+    def position_of(line):
+        """Row in the view showing a line (or the next one after it)"""
+        if view is None:
+            return line
+        return bisect.bisect_left(view, line)
+    
+    try:
+        while True:
+            index = browser.index
+            total = len(view) if view is not None else index.count
+            height, width = stdscr.getmaxyx()
+            page = max(1, height - 4)
+            if top >= total - page:
+                # Scrolling past the end resumes following new lines
+                follow = True
+            if follow:
+                top = total - page
+            top = max(0, top)
+            
+            stdscr.clear()
+            stdscr.addstr(0, 0, "LOG VIEW (↑/↓ PgUp/PgDn Home/End, / search, n/N older/newer, "
+                                "f level, k keyword, t time, [/] segment, Q return)"[:width-1],
+                          curses.A_BOLD)
+            stdscr.addstr(1, 0, "=" * width)
+            
+            if total == 0:
+                stdscr.addstr(2, 0, "No log lines to show"[:width-1])
+            for i in range(page):
+                if top + i >= total:
+                    break
+                line = view[top + i] if view is not None else top + i
+                attr = curses.A_REVERSE if line == match else 0
+                level = index.level(line)
+                if level >= log_index.LEVELS['ERROR']:
+                    attr |= curses.color_pair(4)
+                elif level == log_index.LEVELS['WARNING']:
+                    attr |= curses.color_pair(3)
+                stdscr.addstr(i + 2, 0, index.line(line)[:width-1], attr)
+            
+            status = f" {browser.name}  {min(top + page, total)}/{total}"
+            if min_level:
+                status += f"  level>={log_index.LEVEL_NAMES[min_level]}"
+            if keyword:
+                status += f"  keyword '{keyword}'"
+            if message:
+                status += f"  {message}"
+            stdscr.addstr(height - 1, 0, status[:width-1], curses.A_REVERSE)
+            stdscr.refresh()
+            
+            key = stdscr.getch()
+            message = ''
+            if key == -1:
+                # Timeout: pick up lines written since the last refresh
+                added = browser.refresh()
+                if added and view is not None:
+                    first = browser.index.count - added
+                    # Only the new lines, unless the log was re-indexed
+                    if first:
+                        view.extend(filtered(first))
+                    else:
+                        view = filtered()
+            elif key == ord('q') or key == ord('Q'):
+                break
+            elif key == curses.KEY_UP:
+                top -= 1
+                follow = False
+            elif key == curses.KEY_DOWN:
+                top += 1
+            elif key == curses.KEY_PPAGE:
+                top -= page
+                follow = False
+            elif key == curses.KEY_NPAGE:
+                top += page
+            elif key == curses.KEY_HOME:
+                top = 0
+                follow = False
+            elif key == curses.KEY_END:
+                follow = True
+            elif key == ord('f'):
+                min_level = LEVEL_FILTERS[(LEVEL_FILTERS.index(min_level) + 1) % len(LEVEL_FILTERS)]
+                view = filtered()
+                follow = True
+            elif key == ord('k'):
+                keyword = prompt(stdscr, "Keyword filter (empty clears): ")
+                view = filtered()
+                follow = True
+            elif key in (ord('['), ord(']')):
+                if browser.move(-1 if key == ord('[') else 1):
+                    view = filtered()
+                    match = None
+                    follow = key == ord('[')
+                    top = 0
+            elif key == ord('t'):
+                text = prompt(stdscr, "Jump to (YYYY-MM-DD HH:MM or HH:MM): ")
+                try:
+                    line = browser.seek_time(parse_jump_time(text))
+                except ValueError:
+                    message = f"Invalid time '{text}'"
+                    continue
+                view = filtered()
+                top = position_of(line)
+                follow = False
+            elif key in (ord('/'), ord('n'), ord('N')):
+                if key == ord('/'):
+                    search = prompt(stdscr, "Search: ")
+                    match = None
+                if not search:
+                    continue
+                backward = key != ord('N')
+                if match is not None:
+                    start = match
+                elif view is not None and top < total:
+                    start = view[min(top + page, total) - 1] + 1
+                else:
+                    start = min(top + page, total)
+                segment = browser.position
+                line = browser.search(search, start, backward)
+                if line is None:
+                    message = f"'{search}' not found"
+                    continue
+                if browser.position != segment:
+                    view = filtered()
+                match = line
+                row = position_of(line)
+                if view is not None and (row >= len(view) or view[row] != line):
+                    message = "match hidden by filter"
+                top = max(0, row - page // 2)
+                follow = False
+    finally:
+        browser.close()
 
 def main():
     """Main entry point"""
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relay Watchdog Module
+Fail-safe supervisor process that forces the relay LOW when the
+controller stops sending heartbeats or the pump runs too long
+"""
+
+import os
+import time
+import select
+import signal
+import logging
+
+import RPi.GPIO as GPIO
+
+
+class RelayWatchdog:
+    """Supervisor process guarding the pump relay"""
+
+    # Messages sent from the controller over the pipe (one byte each)
+    MSG_HEARTBEAT = b'h'
+    MSG_ON = b'1'
+    MSG_OFF = b'0'
+    MSG_QUIT = b'q'
+    # Sent back from the supervisor
+    MSG_FORCED = b'f'
+
+    def __init__(self, relay_pin, heartbeat_timeout=10, max_on_time=900):
+        """
+        Initialize the watchdog
+
+        Args:
+            relay_pin: BCM pin of the relay
+            heartbeat_timeout: Seconds without heartbeat before forcing OFF
+            max_on_time: Hard limit in seconds for a single ON period
+        """
+        self.relay_pin = relay_pin
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_on_time = max_on_time
+        self.pid = None
+        self._write_fd = None
+        self._report_fd = None
+        self._forced = False
+
+    def start(self):
+        """Fork the supervisor process"""
+        read_fd, write_fd = os.pipe()
+        report_read_fd, report_write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Supervisor: never return into the controller code
+            os.close(write_fd)
+            os.close(report_read_fd)
+            status = 0
+            try:
+                self._supervise(read_fd, report_write_fd)
+            except BaseException:
+                status = 1
+            finally:
+                self._force_off()
+                os._exit(status)
+
+        os.close(read_fd)
+        os.close(report_write_fd)
+        os.set_blocking(write_fd, False)
+        os.set_blocking(report_read_fd, False)
+        self.pid = pid
+        self._write_fd = write_fd
+        self._report_fd = report_read_fd
+        logging.info(f"🐕 Relay watchdog started (PID {pid})")
+
+    def _send(self, msg):
+        """Send a message to the supervisor without ever blocking"""
+        if self._write_fd is None:
+            return
+        try:
+            os.write(self._write_fd, msg)
+        except BlockingIOError:
+            # Pipe full - supervisor is lagging, drop the message
+            pass
+        except OSError:
+            logging.error("❌ Relay watchdog is not reachable")
+            self._close()
+
+    def heartbeat(self):
+        """Tell the supervisor the controller is alive"""
+        self._send(self.MSG_HEARTBEAT)
+
+    def notify_on(self):
+        """Tell the supervisor the relay was turned ON"""
+        # A forced OFF of an earlier ON period is not news any more
+        self.forced_off()
+        self._forced = False
+        self._send(self.MSG_ON)
+
+    def notify_off(self):
+        """Tell the supervisor the relay was turned OFF"""
+        self._send(self.MSG_OFF)
+
+    def forced_off(self):
+        """
+        Whether the supervisor forced the relay OFF since the last notify_on()
+
+        Returns:
+            bool: True after a forced OFF
+        """
+        while self._report_fd is not None and not self._forced:
+            try:
+                data = os.read(self._report_fd, 512)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b''
+            if not data:
+                # Supervisor gone, nothing more to report
+                self._close_report()
+                break
+            self._forced = self.MSG_FORCED in data
+        return self._forced
+
+    def stop(self):
+        """Stop the supervisor after a clean shutdown"""
+        if self._write_fd is None:
+            return
+        self._send(self.MSG_QUIT)
+        self._close()
+        try:
+            os.waitpid(self.pid, 0)
+        except ChildProcessError:
+            pass
+        self._close_report()
+
+    def _close(self):
+        """Close our end of the pipe"""
+        try:
+            os.close(self._write_fd)
+        except OSError:
+            pass
+        self._write_fd = None
+
+    def _close_report(self):
+        """Close our end of the report pipe"""
+        if self._report_fd is None:
+            return
+        try:
+            os.close(self._report_fd)
+        except OSError:
+            pass
+        self._report_fd = None
+
+    def _prepare_process(self):
+        """Detach the supervisor from the controller's handlers"""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, self._on_sigterm)
+        # Run ahead of the controller so its deadline holds even if the
+        # controller starves the CPU; both calls need privileges
+        # (LimitRTPRIO/LimitNICE in the systemd units)
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(1))
+        except (AttributeError, OSError) as e:
+            try:
+                os.nice(-10)
+            except OSError as nice_error:
+                logging.warning(
+                    f"⚠️ Watchdog runs at normal priority, its deadline may "
+                    f"slip under load (SCHED_FIFO: {e}; nice: {nice_error})"
+                )
+            else:
+                logging.warning(f"⚠️ Watchdog not real-time, using nice -10 ({e})")
+
+    def _on_sigterm(self, signum, frame):
+        """Stop request from systemd or the TUI"""
+        self._force_off("received SIGTERM")
+        os._exit(0)
+
+    def _report_forced(self, report_fd):
+        """Tell the controller the relay was forced OFF"""
+        if report_fd is None:
+            return
+        try:
+            os.write(report_fd, self.MSG_FORCED)
+        except OSError:
+            # Controller gone or not reading, the relay is LOW either way
+            pass
+
+    def _supervise(self, read_fd, report_fd=None):
+        """
+        Supervisor loop - runs in the child process
+
+        Args:
+            read_fd: Pipe with controller messages
+            report_fd: Pipe for forced OFF reports back to the controller
+        """
+        self._prepare_process()
+
+        relay_on = False
+        on_since = None
+        last_heartbeat = time.monotonic()
+
+        while True:
+            now = time.monotonic()
+            timeout = None
+            if relay_on:
+                heartbeat_left = last_heartbeat + self.heartbeat_timeout - now
+                on_left = on_since + self.max_on_time - now
+                if heartbeat_left <= 0:
+                    self._force_off(
+                        f"no heartbeat for {self.heartbeat_timeout}s"
+                    )
+                    self._report_forced(report_fd)
+                    relay_on = False
+                    continue
+                if on_left <= 0:
+                    self._force_off(
+                        f"pump ON longer than {self.max_on_time}s"
+                    )
+                    self._report_forced(report_fd)
+                    relay_on = False
+                    continue
+                timeout = min(heartbeat_left, on_left)
+
+            ready, _, _ = select.select([read_fd], [], [], timeout)
+            if not ready:
+                continue
+
+            data = os.read(read_fd, 512)
+            if not data:
+                # Controller died without saying goodbye
+                if relay_on:
+                    self._force_off("controller exited unexpectedly")
+                return
+
+            now = time.monotonic()
+            for msg in (data[i:i + 1] for i in range(len(data))):
+                if msg == self.MSG_QUIT:
+                    return
+                last_heartbeat = now
+                if msg == self.MSG_ON and not relay_on:
+                    relay_on = True
+                    on_since = now
+                elif msg == self.MSG_OFF:
+                    relay_on = False
+
+    def _force_off(self, reason=None):
+        """
+        Drive the relay LOW
+
+        Args:
+            reason: Why the pump is forced off (logged when given)
+        """
+        try:
+            GPIO.output(self.relay_pin, GPIO.LOW)
+        except Exception:
+            pass
+        if reason:
+            logging.critical(f"🐕 Watchdog forced pump OFF: {reason}")
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web Dashboard Module
+Single-page dashboard with live updates over Server-Sent Events
+"""
+
+import json
+import logging
+import math
+import queue
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from pump_control import PumpController
+from settings import load_config
+import energy
+import export
+import rollups
+
+
+class Broadcaster:
+    """In-memory fan-out of events to connected clients"""
+
+    def __init__(self, client_queue_size=100):
+        """
+        Initialize the broadcaster
+
+        Args:
+            client_queue_size: Events buffered per client before it is dropped
+        """
+        self.client_queue_size = client_queue_size
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._has_clients = threading.Event()
+
+    def subscribe(self):
+        """
+        Register a client
+
+        Returns:
+            queue.Queue: Queue receiving (event, data) tuples
+        """
+        client = queue.Queue(maxsize=self.client_queue_size)
+        with self._lock:
+            self._clients.add(client)
+            self._has_clients.set()
+        return client
+
+    def unsubscribe(self, client):
+        """Remove a client"""
+        with self._lock:
+            self._clients.discard(client)
+            if not self._clients:
+                self._has_clients.clear()
+
+    def publish(self, event, data):
+        """
+        Send an event to every client
+
+        Clients that fall too far behind are disconnected instead of
+        slowing down everyone else.
+
+        Args:
+            event: Event name
+            data: JSON-serializable payload
+        """
+        message = (event, data)
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Make room for the disconnect marker
+                self.unsubscribe(client)
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    pass
+                client.put_nowait(None)
+
+    @property
+    def client_count(self):
+        """Number of connected clients"""
+        with self._lock:
+            return len(self._clients)
+
+    def wait_for_clients(self, timeout=None):
+        """Block until at least one client is connected"""
+        return self._has_clients.wait(timeout)
+
+
+class Sampler(threading.Thread):
+    """Single reader of controller state shared by all clients"""
+
+    def __init__(self, broadcaster, log_file, interval=5, rollup_store=None,
+                 rollup_interval=30, max_log_lines=50):
+        """
+        Initialize the sampler
+
+        Args:
+            broadcaster: Broadcaster receiving changes
+            log_file: Path to the live log
+            interval: Seconds between samples
+            rollup_store: RollupStore fed with readings, also while no
+                client is connected
+            rollup_interval: Seconds between readings added to the rollups
+            max_log_lines: Most log lines published per sample (the newest),
+                well below the client queue size
+        """
+        super().__init__(daemon=True)
+        self.broadcaster = broadcaster
+        self.log_file = Path(log_file)
+        self.interval = interval
+        self.rollup_store = rollup_store
+        self.rollup_interval = rollup_interval
+        self.max_log_lines = max_log_lines
+        self.snapshot = {}
+        self._lock = threading.Lock()
+        self._log_pos = None
+        self._last_rollup = None
+
+    def get_snapshot(self):
+        """Latest known state"""
+        with self._lock:
+            return dict(self.snapshot)
+
+    def _new_log_lines(self):
+        """Lines appended to the live log since the last sample"""
+        try:
+            size = self.log_file.stat().st_size
+        except FileNotFoundError:
+            return []
+        if self._log_pos is None or size < self._log_pos:
+            # First sample or the log was rotated
+            self._log_pos = size if self._log_pos is None else 0
+        if size == self._log_pos:
+            return []
+        with open(self.log_file, 'rb') as f:
+            f.seek(self._log_pos)
+            data = f.read(size - self._log_pos)
+        # Keep a partial last line for the next sample
+        end = data.rfind(b'\n') + 1
+        self._log_pos += end
+        lines = data[:end].decode('utf-8', errors='replace').splitlines()
+        # A burst larger than a client queue would get every client dropped
+        return lines[-self.max_log_lines:]
+
+    def sample(self):
+        """Read state once and publish what changed"""
+        state = PumpController.get_state()
+        temp = PumpController.get_temperature()
+        self._record(temp)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        with self._lock:
+            previous = self.snapshot
+            self.snapshot = {'state': state, 'temperature': temp, 'time': now}
+
+        if state != previous.get('state'):
+            self.broadcaster.publish('state', {'state': state, 'time': now})
+        self.broadcaster.publish('reading', {'temperature': temp, 'time': now})
+        for line in self._new_log_lines():
+            self.broadcaster.publish('log', {'line': line})
+
+    def _record(self, temp):
+        """Add a reading to the rollups, at most every rollup_interval"""
+        if self.rollup_store is None or temp is None:
+            return
+        now = time.monotonic()
+        if self._last_rollup is not None and now - self._last_rollup < self.rollup_interval:
+            return
+        self._last_rollup = now
+        self.rollup_store.add(temp)
+
+    def run(self):
+        """Sample while clients are connected"""
+        while True:
+            if not self.broadcaster.client_count:
+                # The next client starts at the end of the log, not with
+                # everything written while nobody was watching
+                self._log_pos = None
+            # Nobody watching - only a reading for the rollups now and then
+            watched = self.broadcaster.wait_for_clients(
+                self.rollup_interval if self.rollup_store else None
+            )
+            started = time.monotonic()
+            try:
+                if watched:
+                    self.sample()
+                else:
+                    self._record(PumpController.get_temperature())
+            except Exception as e:
+                logging.error(f"❌ Sampling failed: {e}")
+            if watched:
+                time.sleep(max(0, self.interval - (time.monotonic() - started)))
+
+
+INDEX_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Fermentation Controller</title>
+<style>
+body { font-family: sans-serif; margin: 2em; background: #111; color: #eee; }
+h1 { color: #5fd7ff; }
+.value { font-size: 2em; font-weight: bold; }
+.ok { color: #5fd75f; } .warn { color: #ffd75f; } .bad { color: #ff5f5f; }
+#log { font-family: monospace; font-size: 0.85em; white-space: pre; overflow-x: auto;
+       background: #000; padding: 1em; max-height: 50vh; overflow-y: auto; }
+</style>
+</head>
+<body>
+<h1>🥬 Fermentation Controller</h1>
+<p>Temperature: <span id="temp" class="value">N/A</span></p>
+<p>Status: <span id="state" class="value">…</span></p>
+<p>Updated: <span id="time">-</span> <span id="conn"></span></p>
+<p>Today: <span id="duty">-</span> · Relay: <span id="relay">-</span></p>
+<h2>Recent log</h2>
+<div id="log"></div>
+<script>
+const WARNING = __WARNING__;
+const logBox = document.getElementById('log');
+function show(data) {
+  const temp = document.getElementById('temp');
+  if (data.temperature === null || data.temperature === undefined) {
+    temp.textContent = 'N/A'; temp.className = 'value bad';
+  } else {
+    temp.textContent = data.temperature.toFixed(1) + '°C';
+    temp.className = 'value ' + (data.temperature < WARNING ? 'ok' : 'warn');
+  }
+  document.getElementById('time').textContent = data.time;
+}
+function showState(state) {
+  const el = document.getElementById('state');
+  el.textContent = state === 'idle' ? '✓ Ready' : '🔄 PUMP: ' + state.toUpperCase();
+  el.className = 'value ' + (state === 'idle' ? 'ok' : 'warn');
+}
+const events = new EventSource('/events');
+events.addEventListener('snapshot', e => {
+  const data = JSON.parse(e.data);
+  if (data.state) { showState(data.state); show(data); }
+});
+events.addEventListener('state', e => showState(JSON.parse(e.data).state));
+events.addEventListener('reading', e => show(JSON.parse(e.data)));
+events.addEventListener('log', e => {
+  logBox.textContent += JSON.parse(e.data).line + '\\n';
+  const lines = logBox.textContent.split('\\n');
+  if (lines.length > 500) logBox.textContent = lines.slice(-500).join('\\n');
+  logBox.scrollTop = logBox.scrollHeight;
+});
+function showEnergy() {
+  fetch('/api/energy').then(r => r.json()).then(data => {
+    const today = data.daily[data.daily.length - 1];
+    document.getElementById('duty').textContent =
+      (today.duty_cycle * 100).toFixed(1) + '% duty, ' + today.kwh.toFixed(3) + ' kWh';
+    document.getElementById('relay').textContent = data.relay_cycles + ' cycles (' +
+      (data.relay_life_used * 100).toFixed(2) + '% of rated life)';
+  }).catch(() => {});
+}
+showEnergy();
+setInterval(showEnergy, 60000);
+events.onopen = () => document.getElementById('conn').textContent = '';
+events.onerror = () => document.getElementById('conn').textContent = '(reconnecting…)';
+</script>
+</body>
+</html>
+"""
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    """HTTP request handler"""
+
+    # Set by serve()
+    broadcaster = None
+    sampler = None
+    config = None
+    rollup_store = None
+    keepalive_interval = 15
+
+    def log_message(self, format, *args):
+        """Route access logs through logging at DEBUG level"""
+        logging.debug("web: " + format % args)
+
+    def _send(self, status, content_type, body):
+        """Send a complete response"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """Route GET requests"""
+        path = self.path.split('?', 1)[0]
+        if path == '/':
+            warning = self.config['temperature']['warning']
+            body = INDEX_HTML.replace('__WARNING__', json.dumps(warning))
+            self._send(200, 'text/html; charset=utf-8', body.encode('utf-8'))
+        elif path == '/api/status':
+            body = json.dumps(self.sampler.get_snapshot()).encode('utf-8')
+            self._send(200, 'application/json', body)
+        elif path == '/events':
+            self._stream_events()
+        elif path == '/api/export':
+            self._stream_export()
+        elif path == '/api/energy':
+            # Counters file is tiny, read it fresh for every request
+            summary = energy.EnergyReport(self.config).summary()
+            self._send(200, 'application/json', json.dumps(summary).encode('utf-8'))
+        elif path == '/api/history':
+            self._send_history()
+        elif path == '/metrics':
+            body = energy.EnergyReport(self.config).metrics().encode('utf-8')
+            self._send(200, 'text/plain; version=0.0.4', body)
+        else:
+            self._send(404, 'text/plain', b'Not found')
+
+    def _send_history(self):
+        """
+        Temperature rollups for a long-range chart
+
+        Query parameters: 'hours' (default 24), 'points' (default 500, the
+        most returned) and optionally 'resolution' in seconds per point.
+        """
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        if self.rollup_store is None:
+            self._send(404, 'text/plain', b'Rollups disabled')
+            return
+        try:
+            hours = float(query.get('hours', ['24'])[0])
+            points = int(query.get('points', ['500'])[0])
+            resolution = query.get('resolution', [None])[0]
+            resolution = float(resolution) if resolution else None
+            # float() accepts 'inf' and 'nan'
+            if not (0 < hours < math.inf and points > 0
+                    and (resolution is None or 0 < resolution < math.inf)):
+                raise ValueError
+        except ValueError:
+            self._send(400, 'text/plain', b'Bad hours/points/resolution')
+            return
+        end = time.time()
+        result = self.rollup_store.query(
+            end - hours * 3600, end, resolution=resolution, max_points=points
+        )
+        self._send(200, 'application/json', json.dumps(result).encode('utf-8'))
+
+    def _stream_export(self):
+        """
+        Stream history as gzip CSV
+
+        Query parameters 'since' and 'until' ('YYYY-MM-DD HH:MM:SS') select
+        the range; the X-Export-Until header is the cursor for the next pull.
+        """
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        try:
+            since = query.get('since', [None])[0]
+            since = datetime.strptime(since, export.TIME_FORMAT) if since else None
+            until = query.get('until', [None])[0]
+            until = (
+                datetime.strptime(until, export.TIME_FORMAT)
+                if until else export.safe_until()
+            )
+        except ValueError:
+            self._send(400, 'text/plain', b'Bad since/until')
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/gzip')
+        self.send_header('X-Export-Until', until.strftime(export.TIME_FORMAT))
+        self.end_headers()
+        rows = export.iter_rows(
+            self.config['logging']['pump_log'],
+            self.config['retention']['archive_dir'],
+            since, until
+        )
+        try:
+            export.write_csv(rows, self.wfile)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _write_event(self, event, data):
+        """Write one SSE event"""
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        self.wfile.write(payload.encode('utf-8'))
+        self.wfile.flush()
+
+    def _stream_events(self):
+        """Server-Sent Events stream for one client"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        client = self.broadcaster.subscribe()
+        try:
+            self._write_event('snapshot', self.sampler.get_snapshot())
+            while True:
+                try:
+                    message = client.get(timeout=self.keepalive_interval)
+                except queue.Empty:
+                    # Comment line keeps proxies and browsers from timing out
+                    self.wfile.write(b': keepalive\n\n')
+                    self.wfile.flush()
+                    continue
+                if message is None:
+                    break
+                self._write_event(*message)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.broadcaster.unsubscribe(client)
+
+
+def serve(config):
+    """
+    Run the dashboard server
+
+    Args:
+        config: Configuration dict
+    """
+    web_config = config['web']
+    rollup_config = config['rollups']
+    rollup_store = (
+        rollups.RollupStore.from_config(config) if rollup_config['enabled'] else None
+    )
+    broadcaster = Broadcaster()
+    sampler = Sampler(
+        broadcaster,
+        config['logging']['pump_log'],
+        interval=web_config['sample_interval'],
+        rollup_store=rollup_store,
+        rollup_interval=rollup_config['sample_interval']
+    )
+    sampler.start()
+
+    DashboardHandler.broadcaster = broadcaster
+    DashboardHandler.sampler = sampler
+    DashboardHandler.config = config
+    DashboardHandler.rollup_store = rollup_store
+
+    server = ThreadingHTTPServer(
+        (web_config['host'], web_config['port']), DashboardHandler
+    )
+    server.daemon_threads = True
+    logging.info(
+        f"🌐 Dashboard on http://{web_config['host']}:{web_config['port']}/"
+    )
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if rollup_store:
+            rollup_store.close()
+
+
+def main():
+    """Main entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    config = load_config()
+    try:
+        serve(config)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,368 @@
+"""
+Fixtures for the automated tests
+
+The controller runs against a fake 1-Wire sysfs tree, the recording GPIO
+stand-in and the virtual clock from replay.py, so thousands of cycles take
+seconds and never touch hardware.
+"""
+
+import logging
+import random
+import shutil
+import signal
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+import replay  # installs the GPIO stand-in before pump_control is imported
+import pump_control
+from settings import load_config
+from temp_sensor import DS18B20Sensor
+
+# Interactive scripts for the real hardware, run by hand on the Pi
+collect_ignore = [
+    'test_gpio_pins.py',
+    'test_relay.py',
+    'test_relay_interactive.py',
+    'test_sensor.py',
+    'test_temp_relay.py',
+]
+
+RELAY_PIN = 17
+PROBE = '28-000000000001'
+
+# What the sensor sees on one read
+FAULTS = (
+    'ok',          # plausible temperature
+    'hot',         # above temperature.max
+    'cold',        # below temperature.min
+    'crc',         # CRC check failed (NO)
+    'garbage',     # truncated or corrupt w1_slave
+    'unreadable',  # open() fails
+    'missing',     # probe unplugged
+    'error',       # read raises
+    'interrupt',   # Ctrl+C during the read
+)
+GARBAGE = (
+    '',
+    'junk\n',
+    '72 01 4b 46 7f ff 0e 10 57 : crc=57 YES\n',
+    '72 01 4b 46 7f ff 0e 10 57 : crc=57 YES\n72 01 t=abc\n',
+)
+
+
+class FakeW1:
+    """Writable stand-in for /sys/bus/w1/devices"""
+
+    def __init__(self, base_dir):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    def set(self, probe, temp, crc='YES'):
+        """Make a probe report a temperature (creates the probe)"""
+        folder = self.base_dir / probe
+        if not folder.is_dir():
+            # A w1_slave turned into a directory by the 'unreadable' fault
+            shutil.rmtree(folder, ignore_errors=True)
+            folder.mkdir()
+        slave = folder / 'w1_slave'
+        if slave.is_dir():
+            slave.rmdir()
+        slave.write_text(
+            f'72 01 4b 46 7f ff 0e 10 57 : crc=57 {crc}\n'
+            f'72 01 4b 46 7f ff 0e 10 57 t={int(round(temp * 1000))}\n'
+        )
+
+    def write_raw(self, probe, text):
+        """Replace a probe's w1_slave contents"""
+        self.set(probe, 0.0)
+        (self.base_dir / probe / 'w1_slave').write_text(text)
+
+    def unreadable(self, probe):
+        """w1_slave exists but cannot be read"""
+        self.set(probe, 0.0)
+        slave = self.base_dir / probe / 'w1_slave'
+        slave.unlink()
+        slave.mkdir()
+
+    def remove(self, probe):
+        """Unplug a probe"""
+        shutil.rmtree(self.base_dir / probe, ignore_errors=True)
+
+
+class FaultClock(replay.VirtualClock):
+    """Virtual clock that can deliver a signal on the n-th sleep"""
+
+    def __init__(self, start):
+        super().__init__(start)
+        self.sleeps = 0
+        self.signal_at = None
+        self.signum = signal.SIGTERM
+
+    def sleep(self, seconds):
+        super().sleep(seconds)
+        self.sleeps += 1
+        if self.sleeps == self.signal_at:
+            self.signal_at = None
+            signal.raise_signal(self.signum)
+
+
+class SoakController(pump_control.PumpController):
+    """PumpController on a fake sysfs tree, a virtual clock and a scratch dir"""
+
+    def __init__(self, config, clock, workdir, w1_dir):
+        workdir = Path(workdir)
+        self.w1_dir = str(w1_dir)
+        self.LOCK_FILE = workdir / 'pump.lock'
+        self.STATE_FILE = workdir / 'pump.state'
+        super().__init__(config, clock=clock)
+
+    def _load_config(self, config):
+        return config
+
+    def _setup_logging(self):
+        pass
+
+    def _create_sensor(self):
+        return DS18B20Sensor(
+            base_dir=self.w1_dir, clock=self.clock,
+            manifest=self.config['startup']['sensor_manifest'], fusion=self.fusion
+        )
+
+
+class Soak:
+    """
+    Runs cycles with a scripted fault per sensor read and checks the
+    invariants that must hold on every exit path
+    """
+
+    def __init__(self, make_controller, config, clock, gpio, w1, seed=0):
+        self.make_controller = make_controller
+        self.config = config
+        self.clock = clock
+        self.gpio = gpio
+        self.w1 = w1
+        self.rng = random.Random(seed)
+        self.faults = []
+        self.outcomes = Counter()
+        self.durations = []
+        self.controller = None
+        self._new_controller()
+
+    def _new_controller(self):
+        """Start a controller whose sensor reads go through the fault plan"""
+        self.controller = self.make_controller()
+        sensor = self.controller.temp_sensor
+        if sensor is None:
+            return
+        read = sensor.read_temperature
+
+        def read_with_fault(*args, **kwargs):
+            self.apply(self.faults.pop(0) if self.faults else 'ok')
+            return read(*args, **kwargs)
+
+        sensor.read_temperature = read_with_fault
+
+    def apply(self, fault):
+        """Put the sysfs tree in the state of one fault"""
+        limits = self.config['temperature']
+        if fault == 'ok':
+            self.w1.set(PROBE, self.rng.uniform(limits['min'] + 1, limits['warning']))
+        elif fault == 'hot':
+            self.w1.set(PROBE, self.rng.uniform(limits['max'] + 0.5, 90))
+        elif fault == 'cold':
+            self.w1.set(PROBE, self.rng.uniform(-10, limits['min'] - 0.5))
+        elif fault == 'crc':
+            self.w1.set(PROBE, 20.0, crc='NO')
+        elif fault == 'garbage':
+            self.w1.write_raw(PROBE, self.rng.choice(GARBAGE))
+        elif fault == 'unreadable':
+            self.w1.unreadable(PROBE)
+        elif fault == 'missing':
+            self.w1.remove(PROBE)
+        elif fault == 'error':
+            raise OSError('1-Wire bus error')
+        elif fault == 'interrupt':
+            raise KeyboardInterrupt
+
+    def random_faults(self, rate):
+        """Fault plan for one cycle, each read faulty with probability rate"""
+        reads = self.config['pump']['run_time'] // \
+            self.config['temperature']['check_interval'] + 2
+        return [
+            self.rng.choice(FAULTS[1:]) if self.rng.random() < rate else 'ok'
+            for _ in range(reads)
+        ]
+
+    def expected(self, faults):
+        """
+        Outcome of a cycle without signals
+
+        Returns:
+            str: 'completed', 'failed' (run_cycle returned False) or
+                'raised' (the initial read raised out of run_cycle)
+        """
+        if self.controller.temp_sensor is None:
+            # Runs without temperature checks
+            return 'completed'
+        faults = faults + ['ok'] * 10
+        checks = self.config['pump']['run_time'] // \
+            self.config['temperature']['check_interval']
+        if faults[0] in ('error', 'interrupt'):
+            return 'raised'
+        if faults[0] != 'ok':
+            return 'failed'
+        for fault in faults[1:checks + 1]:
+            if fault in ('hot', 'error', 'interrupt'):
+                return 'failed'
+        if faults[checks + 1] in ('error', 'interrupt'):
+            return 'failed'
+        return 'completed'
+
+    def cycle(self, faults=(), signal_after=None):
+        """
+        Run one cycle and check the exit invariants
+
+        Args:
+            faults: Fault per sensor read, in order (then 'ok')
+            signal_after: Deliver SIGTERM on this many-th clock sleep
+
+        Returns:
+            str: 'completed', 'failed', 'raised' or 'signal'
+        """
+        self.faults = list(faults)
+        self.gpio.events.clear()
+        if signal_after:
+            self.clock.signal_at = self.clock.sleeps + signal_after
+        started = time.perf_counter()
+        try:
+            outcome = 'completed' if self.controller.run_cycle() else 'failed'
+        except SystemExit:
+            outcome = 'signal'
+        except (Exception, KeyboardInterrupt):
+            outcome = 'raised'
+        self.durations.append(time.perf_counter() - started)
+        self.clock.signal_at = None
+
+        self.check_exit(outcome)
+        if outcome == 'signal':
+            assert signal_after, 'SIGTERM without one being sent'
+            assert not self.controller.LOCK_FILE.exists()
+            self._new_controller()
+        else:
+            assert outcome == self.expected(list(faults)), faults
+        self.outcomes[outcome] += 1
+        # Next cycle starts with a working probe
+        self.w1.set(PROBE, 20.0)
+        self.clock.sleep(3600)
+        return outcome
+
+    def check_exit(self, outcome):
+        """Invariants of every exit path"""
+        pin = self.config['pump']['gpio_pin']
+        assert self.gpio.levels.get(pin, self.gpio.LOW) == self.gpio.LOW, \
+            f'relay left HIGH after {outcome}'
+
+        # Failed reads retry for up to 1.5 s, not counted as run time
+        run_time = self.config['pump']['run_time']
+        checks = run_time // self.config['temperature']['check_interval']
+        max_on = run_time + checks * 1.5
+        on_since = None
+        for when, event_pin, level in self.gpio.events:
+            if event_pin != pin:
+                continue
+            if level == 'HIGH':
+                on_since = when
+            elif on_since is not None:
+                assert (when - on_since).total_seconds() <= max_on
+                on_since = None
+
+        assert self.controller.energy._on_since is None
+        record = self.controller.journal.load()
+        assert not record or record['status'] != 'running'
+
+    def high_count(self):
+        """Relay OFF -> ON transitions in the last cycle"""
+        pin = self.config['pump']['gpio_pin']
+        return sum(
+            1 for _, event_pin, level in self.gpio.events
+            if event_pin == pin and level == 'HIGH'
+        )
+
+
+@pytest.fixture
+def gpio():
+    """The GPIO stand-in, reset"""
+    replay.GPIO.levels.clear()
+    replay.GPIO.events.clear()
+    return replay.GPIO
+
+
+@pytest.fixture
+def clock(gpio):
+    """Virtual clock also driving the GPIO event timestamps"""
+    clock = FaultClock(datetime(2026, 1, 1, 9, 0))
+    gpio.clock = clock
+    return clock
+
+
+@pytest.fixture
+def w1(tmp_path):
+    """Fake 1-Wire tree with one probe at 20 C"""
+    fake = FakeW1(tmp_path / 'w1')
+    fake.set(PROBE, 20.0)
+    return fake
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Defaults with short cycles and every file in the scratch dir"""
+    config = load_config(tmp_path / 'missing.yaml')
+    config['pump'].update({'run_time': 120, 'gpio_pin': RELAY_PIN})
+    config['temperature']['check_interval'] = 30
+    config['watchdog']['enabled'] = False
+    config['tracing']['enabled'] = False
+    config['journal']['path'] = str(tmp_path / 'state' / 'journal.json')
+    config['energy']['path'] = str(tmp_path / 'state' / 'energy.dat')
+    config['alerts']['state_file'] = str(tmp_path / 'state' / 'alerts.json')
+    config['startup']['sensor_manifest'] = str(tmp_path / 'state' / 'sensors.json')
+    return config
+
+
+@pytest.fixture
+def make_controller(config, clock, w1, tmp_path):
+    """Factory for controllers, all cleaned up at the end of the test"""
+    handlers = {
+        signum: signal.getsignal(signum)
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+    controllers = []
+
+    def make():
+        controller = SoakController(config, clock, tmp_path, w1.base_dir)
+        controllers.append(controller)
+        return controller
+
+    # Thousands of INFO lines per test would only fill pytest's capture
+    logging.disable(logging.CRITICAL)
+    try:
+        yield make
+    finally:
+        logging.disable(logging.NOTSET)
+        for controller in controllers:
+            alert_manager = getattr(controller, 'alerts', None)
+            if alert_manager:
+                alert_manager.close(timeout=1)
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+
+@pytest.fixture
+def soak(make_controller, config, clock, gpio, w1):
+    """Soak runner on a fresh controller"""
+    return Soak(make_controller, config, clock, gpio, w1)
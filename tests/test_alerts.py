@@ -0,0 +1,138 @@
+"""
+Alert deduplication, rate limiting and temperature hysteresis
+"""
+
+import pytest
+
+import alerts
+from alerts import AlertManager
+from conftest import Soak
+
+START = 1767258000  # 2026-01-01 09:00 UTC
+
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def time(self):
+        return self.now
+
+
+class ListSink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, alert):
+        self.sent.append(alert)
+
+
+@pytest.fixture
+def manager(config):
+    # warning 25, max 30, min 15, hysteresis 1, rate limit 15 min,
+    # reminders every 6 hours
+    sink = ListSink()
+    manager = AlertManager(config, sinks=[sink], clock=Clock())
+    manager.sink = sink
+    yield manager
+    manager.close(timeout=1)
+
+
+def delivered(manager):
+    """Alerts the sink received once the queue is drained"""
+    manager.close(timeout=1)
+    return [
+        (alert['condition'], alert['resolved'], alert['suppressed'])
+        for alert in manager.sink.sent
+    ]
+
+
+def test_active_condition_sent_once(manager):
+    assert manager.raise_alert(alerts.SENSOR_FAILURE, 'error', 'no reading')
+    for _ in range(10):
+        manager.clock.now += 60
+        assert not manager.raise_alert(alerts.SENSOR_FAILURE, 'error', 'no reading')
+    assert delivered(manager) == [(alerts.SENSOR_FAILURE, False, 0)]
+
+
+def test_reminder_after_repeat_interval(manager):
+    manager.raise_alert(alerts.SENSOR_FAILURE, 'error', 'no reading')
+    manager.clock.now += 3600
+    manager.raise_alert(alerts.SENSOR_FAILURE, 'error', 'no reading')
+    manager.clock.now += manager.repeat_interval
+    assert manager.raise_alert(alerts.SENSOR_FAILURE, 'error', 'no reading')
+    assert delivered(manager) == [
+        (alerts.SENSOR_FAILURE, False, 0), (alerts.SENSOR_FAILURE, False, 1)
+    ]
+
+
+def test_flapping_condition_rate_limited(manager):
+    manager.raise_alert(alerts.CYCLE_ERROR, 'error', 'failed')
+    manager.clock.now += 60
+    manager.clear(alerts.CYCLE_ERROR)
+    manager.clock.now += 60
+    assert not manager.raise_alert(alerts.CYCLE_ERROR, 'error', 'failed')
+    manager.clock.now += manager.rate_limit
+    manager.clear(alerts.CYCLE_ERROR)
+    manager.clock.now += 60
+    assert manager.raise_alert(alerts.CYCLE_ERROR, 'error', 'failed')
+    assert delivered(manager) == [
+        (alerts.CYCLE_ERROR, False, 0),
+        (alerts.CYCLE_ERROR, True, 0),
+        (alerts.CYCLE_ERROR, False, 1),
+    ]
+
+
+def test_high_temperature_hysteresis(manager):
+    for temp in (24.0, 25.5, 24.5, 25.5, 24.1, 23.9, 24.0):
+        manager.clock.now += 30
+        manager.check_temperature(temp)
+    # Raised above 25, only cleared below 24
+    assert delivered(manager) == [
+        (alerts.TEMPERATURE_HIGH, False, 0), (alerts.TEMPERATURE_HIGH, True, 0)
+    ]
+
+
+def test_low_temperature_hysteresis(manager):
+    manager.check_temperature(14.5)
+    manager.check_temperature(15.5)
+    assert manager._active(alerts.TEMPERATURE_LOW)
+    manager.check_temperature(16.5)
+    assert not manager._active(alerts.TEMPERATURE_LOW)
+
+
+def test_critical_not_also_reported_high(manager):
+    manager.check_temperature(31.0)
+    assert manager._active(alerts.TEMPERATURE_CRITICAL)
+    assert not manager._active(alerts.TEMPERATURE_HIGH)
+    manager.check_temperature(29.5)
+    assert manager._active(alerts.TEMPERATURE_CRITICAL)
+    manager.check_temperature(28.9)
+    assert not manager._active(alerts.TEMPERATURE_CRITICAL)
+    assert manager._active(alerts.TEMPERATURE_HIGH)
+
+
+def test_sensor_failure_cleared_by_reading(manager):
+    manager.check_temperature(None)
+    manager.check_temperature(20.0)
+    assert delivered(manager) == [
+        (alerts.SENSOR_FAILURE, False, 0), (alerts.SENSOR_FAILURE, True, 0)
+    ]
+
+
+def test_state_survives_restart(manager, config):
+    manager.raise_alert(alerts.SENSOR_FAILURE, 'error', 'no reading')
+    manager.close(timeout=1)
+    restarted = AlertManager(config, sinks=[], clock=manager.clock)
+    try:
+        assert not restarted.raise_alert(alerts.SENSOR_FAILURE, 'error', 'no reading')
+    finally:
+        restarted.close(timeout=1)
+
+
+def test_successful_cycle_clears_cycle_error(soak):
+    soak.cycle()
+    manager = soak.controller.alerts
+    manager.raise_alert(alerts.CYCLE_ERROR, 'error', 'failed')
+    assert soak.cycle() == 'completed'
+    assert not manager._active(alerts.CYCLE_ERROR)
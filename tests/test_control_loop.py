@@ -0,0 +1,259 @@
+"""
+Exit paths of the control loop under injected faults
+
+Fault plans are generated from fixed seeds, so every failure can be
+reproduced from the seed in the test id.
+"""
+
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import FAULTS, PROBE, Soak
+
+
+def test_clean_cycle(soak):
+    assert soak.cycle() == 'completed'
+    assert soak.high_count() == 1
+    assert soak.controller.energy.cycles == 1
+
+
+@pytest.mark.parametrize('fault', FAULTS[1:])
+def test_initial_read_fault_never_starts_pump(soak, fault):
+    soak.cycle([fault])
+    assert soak.high_count() == 0
+
+
+@pytest.mark.parametrize('fault', FAULTS[1:])
+@pytest.mark.parametrize('read', [1, 2, 4, 5])
+def test_fault_during_cycle(soak, fault, read):
+    faults = ['ok'] * read + [fault]
+    soak.cycle(faults)
+    assert soak.high_count() == 1
+
+
+@pytest.mark.parametrize('signum', [signal.SIGTERM, signal.SIGINT])
+@pytest.mark.parametrize('after', [1, 7, 30, 59])
+def test_signal_mid_cycle(soak, clock, signum, after):
+    clock.signum = signum
+    assert soak.cycle(signal_after=after) == 'signal'
+    # The replacement controller works normally
+    assert soak.cycle() == 'completed'
+
+
+def test_signal_during_retries(soak):
+    # CRC failures sleep between retries, the signal lands inside the read
+    assert soak.cycle(['ok', 'crc'], signal_after=16) == 'signal'
+
+
+def test_missing_sensor_at_startup(make_controller, config, clock, gpio, w1):
+    w1.remove(PROBE)
+    soak = Soak(make_controller, config, clock, gpio, w1)
+    assert soak.controller.temp_sensor is None
+    assert soak.cycle() == 'completed'
+
+
+def test_probe_replaced(soak, w1):
+    sensor = soak.controller.temp_sensor
+    w1.remove(PROBE)
+    w1.set('28-000000000002', 21.0)
+    # Bypass the fault plan, which would plug the old probe back in
+    assert type(sensor).read_temperature(sensor) == 21.0
+    assert soak.cycle() == 'completed'
+
+
+def test_cleanup_leaves_relay_low(soak, gpio, config):
+    soak.controller.pump_on()
+    soak.controller.cleanup()
+    assert gpio.levels[config['pump']['gpio_pin']] == gpio.LOW
+    assert not soak.controller.LOCK_FILE.exists()
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_fault_plans(make_controller, config, clock, gpio, w1, seed):
+    soak = Soak(make_controller, config, clock, gpio, w1, seed=seed)
+    rng = random.Random(seed)
+    for _ in range(50):
+        faults = soak.random_faults(rate=0.3)
+        signal_after = rng.randrange(1, 80) if rng.random() < 0.1 else None
+        soak.cycle(faults, signal_after)
+    assert sum(soak.outcomes.values()) == 50
+
+
+def spawn(*args):
+    """Start a process and wait until its command line is visible"""
+    child = subprocess.Popen(args)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with open(f'/proc/{child.pid}/cmdline') as f:
+            if f.read():
+                break
+        time.sleep(0.01)
+    return child
+
+
+class TestStaleLock:
+    """The lock file left by a controller that is gone"""
+
+    @pytest.fixture
+    def lock(self, tmp_path):
+        return tmp_path / 'pump.lock'
+
+    def test_garbage(self, make_controller, lock):
+        lock.write_text('not a pid')
+        controller = make_controller()
+        assert lock.read_text() == str(os.getpid())
+        controller.cleanup()
+
+    def test_dead_process(self, make_controller, lock):
+        child = subprocess.Popen([sys.executable, '-c', 'pass'])
+        child.wait()
+        lock.write_text(str(child.pid))
+        make_controller().cleanup()
+        assert not lock.exists()
+
+    def test_pid_reused_by_another_program(self, make_controller, lock):
+        child = spawn('sleep', '30')
+        try:
+            lock.write_text(str(child.pid))
+            controller = make_controller()
+            assert lock.read_text() == str(os.getpid())
+            controller.cleanup()
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_live_controller_keeps_relay_untouched(self, make_controller, lock,
+                                                   gpio):
+        child = spawn(
+            sys.executable, '-c', 'import time; time.sleep(30)', 'pump_control.py'
+        )
+        try:
+            lock.write_text(str(child.pid))
+            with pytest.raises(RuntimeError):
+                make_controller()
+            assert lock.read_text() == str(child.pid)
+            assert gpio.events == []
+        finally:
+            child.kill()
+            child.wait()
+
+
+def test_bad_calibration_stops_startup(make_controller, config, gpio):
+    config['sensors'] = dict(config['sensors'], calibration={PROBE: {'points': [[0, 0]]}})
+    with pytest.raises(ValueError, match=PROBE):
+        make_controller()
+    assert not [event for event in gpio.events if event[2] == 'HIGH']
+
+
+def test_cycle_completes_when_journal_cannot_be_written(make_controller, config,
+                                                       clock, gpio, w1, tmp_path):
+    # A file where the journal directory should be
+    (tmp_path / 'blocked').write_text('')
+    config['journal']['path'] = str(tmp_path / 'blocked' / 'journal.json')
+    soak = Soak(make_controller, config, clock, gpio, w1)
+    assert soak.cycle() == 'completed'
+
+
+def test_cycle_completes_when_energy_counters_cannot_be_written(soak, monkeypatch):
+    import energy
+
+    def card_full(*args, **kwargs):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(energy, 'open', card_full, raising=False)
+    assert soak.cycle() == 'completed'
+    pin = soak.config['pump']['gpio_pin']
+    levels = [level for _, event_pin, level in soak.gpio.events if event_pin == pin]
+    assert levels[-2:] == ['HIGH', 'LOW'] and soak.high_count() == 1
+    # Counted in memory, written once the card works again
+    assert soak.controller.energy.cycles == 1
+
+
+class ForcingWatchdog:
+    """Watchdog stand-in that forces the relay OFF during the cycle"""
+
+    def __init__(self, after):
+        self.checks = 0
+        self.after = after
+
+    def heartbeat(self):
+        pass
+
+    def notify_on(self):
+        pass
+
+    def notify_off(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def forced_off(self):
+        self.checks += 1
+        return self.checks > self.after
+
+
+def test_watchdog_forced_off_aborts_cycle(soak):
+    import alerts
+
+    controller = soak.controller
+    controller.watchdog = ForcingWatchdog(after=1)
+    assert not controller.run_cycle()
+    assert controller.watchdog.checks == 2
+    assert controller.STATE_FILE.read_text() == 'pump_off'
+    assert controller.journal.load()['status'] == 'aborted'
+    assert controller.alerts._active(alerts.CYCLE_ERROR)
+    soak.check_exit('failed')
+
+
+def pump_on_seconds(gpio):
+    """Seconds the relay was HIGH, from the GPIO events"""
+    on_since, total = None, 0.0
+    for when, _, level in gpio.events:
+        if level == 'HIGH':
+            on_since = when
+        elif on_since is not None:
+            total += (when - on_since).total_seconds()
+            on_since = None
+    return total
+
+
+def test_resume_runs_only_the_remainder(make_controller, config, gpio, monkeypatch):
+    import pump_control
+
+    config['journal']['flush_interval'] = 0
+    crashed = make_controller()
+    crashed.journal.start_cycle(120, 20.0)
+    crashed.journal.update(90, 20.0)
+    # Power lost: the cycle is never finished
+    crashed.journal.record = None
+    gpio.events.clear()
+
+    resumed = []
+
+    def controller():
+        resumed.append(make_controller())
+        return resumed[-1]
+
+    monkeypatch.setattr(pump_control, 'PumpController', controller)
+    monkeypatch.setattr(sys, 'argv', ['pump_control.py', '--resume'])
+    assert pump_control.main() == 0
+    assert pump_on_seconds(gpio) == 30
+    record = resumed[0].journal.load()
+    assert (record['status'], record['run_time']) == ('completed', 30)
+    assert record['resumed_from'] is not None
+    # Nothing left to resume
+    gpio.events.clear()
+    assert pump_control.main() == 0
+    assert gpio.events == []
+
+
+def test_zero_run_time_is_not_a_full_cycle(soak):
+    assert soak.controller.run_cycle(0)
+    assert pump_on_seconds(soak.gpio) == 0
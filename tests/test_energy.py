@@ -0,0 +1,128 @@
+"""
+Relay on-time accounting and the energy report
+"""
+
+from datetime import datetime
+
+import pytest
+
+from energy import EnergyReport, RelayAccounting
+
+# Local time, buckets follow local midnights
+START = datetime(2026, 1, 1, 9, 0).timestamp()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return START + self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'state' / 'energy.dat'
+
+
+def run(accounting, clock, seconds, checkpoints=4):
+    accounting.relay_on()
+    for _ in range(checkpoints):
+        clock.now += seconds / checkpoints
+        accounting.checkpoint()
+    accounting.relay_off()
+
+
+def test_on_time_and_cycles(path, clock):
+    accounting = RelayAccounting(path, clock=clock)
+    run(accounting, clock, 600)
+    clock.now += 3600
+    run(accounting, clock, 300)
+    assert accounting.cycles == 2
+    assert accounting.on_seconds == pytest.approx(900)
+    # Persisted
+    reloaded = RelayAccounting(path, clock=clock)
+    assert (reloaded.cycles, reloaded.on_seconds) == (2, pytest.approx(900))
+
+
+def test_on_time_split_across_hours(path, clock):
+    clock.now = 3600 - 120  # 09:58
+    accounting = RelayAccounting(path, clock=clock)
+    run(accounting, clock, 600)
+    hours = sorted(accounting.hours.items())
+    assert [round(seconds) for _, (seconds, _) in hours] == [120, 480]
+    assert [cycles for _, (_, cycles) in hours] == [1, 0]
+
+
+def test_crash_keeps_checkpointed_time(path, clock):
+    accounting = RelayAccounting(path, flush_interval=60, clock=clock)
+    accounting.relay_on()
+    for _ in range(5):
+        clock.now += 30
+        accounting.checkpoint()
+    # Power loss: no relay_off, only flushed checkpoints survive
+    reloaded = RelayAccounting(path, clock=clock)
+    assert reloaded.cycles == 1
+    assert reloaded.on_seconds == pytest.approx(120)
+
+
+def test_bucket_history_is_bounded(path, clock):
+    accounting = RelayAccounting(path, hourly_buckets=3, daily_buckets=2,
+                                 clock=clock)
+    for _ in range(6):
+        run(accounting, clock, 60)
+        clock.now += 86400 / 4
+    assert len(accounting.hours) == 3
+    assert len(accounting.days) == 2
+
+
+def test_corrupt_file_starts_from_zero(path, clock):
+    path.parent.mkdir()
+    path.write_bytes(b'FEAC\x01')
+    accounting = RelayAccounting(path, clock=clock)
+    assert (accounting.cycles, accounting.on_seconds) == (0, 0.0)
+
+
+def test_report(config, path, clock):
+    config['energy'].update({'pump_watts': 36, 'relay_rated_cycles': 1000})
+    config['batches'] = [{'name': 'IPA', 'start': '2026-01-01'}]
+    accounting = RelayAccounting(path, clock=clock)
+    run(accounting, clock, 1800)
+    report = EnergyReport(config, accounting)
+    # 10:00, the 09:00 hour is over
+    summary = report.summary(hours=2, days=1, now=clock.time() + 1800)
+    assert summary['kwh'] == pytest.approx(0.018)
+    assert summary['relay_life_used'] == 0.001
+    nine, ten = summary['hourly']
+    assert (nine['on_seconds'], nine['duty_cycle']) == (1800, 0.5)
+    assert ten['on_seconds'] == 0
+    assert summary['batches'][0]['cycles'] == 1
+    assert 'fermentation_relay_cycles_total 1' in report.metrics()
+
+
+def test_unreadable_counter_file_starts_from_zero(path, clock, caplog):
+    path.mkdir(parents=True)  # reading a directory fails with an OSError
+    accounting = RelayAccounting(path, clock=clock)
+    assert (accounting.cycles, accounting.on_seconds) == (0, 0.0)
+    assert 'Could not read energy counters' in caplog.text
+
+
+def test_batch_includes_its_end_day(config, path, clock):
+    config['batches'] = [
+        {'name': 'IPA', 'start': '2025-12-01', 'end': '2026-01-01'},
+        {'name': 'Stout', 'start': '2025-12-01', 'end': '2025-12-31'},
+    ]
+    accounting = RelayAccounting(path, clock=clock)
+    run(accounting, clock, 600)
+    summary = EnergyReport(config, accounting).summary(now=clock.time())
+    ipa, stout = summary['batches']
+    assert (ipa['cycles'], ipa['on_seconds']) == (1, 600)
+    assert stout['cycles'] == 0
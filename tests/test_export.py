@@ -0,0 +1,87 @@
+"""
+History export chunks and incremental cursors
+"""
+
+import csv
+import gzip
+from datetime import datetime
+
+import pytest
+
+from export import ExportCursor, HistoryExporter
+
+START = datetime(2026, 1, 1, 9, 0)
+
+
+@pytest.fixture
+def config(config, tmp_path):
+    log = tmp_path / 'logs' / 'fermentation.log'
+    log.parent.mkdir()
+    config['logging']['pump_log'] = str(log)
+    config['retention']['archive_dir'] = str(tmp_path / 'logs' / 'archive')
+    return config
+
+
+def log_readings(config, day, temps):
+    """Append one reading per minute from 09:00 of a day"""
+    with open(config['logging']['pump_log'], 'a') as f:
+        for minute, temp in enumerate(temps):
+            f.write(f"2026-01-{day:02d} 09:{minute:02d}:00 - INFO - 🌡️  "
+                    f"Temperature: {temp}C | Time: {minute * 60}/600s\n")
+
+
+def read_rows(paths):
+    rows = []
+    for path in paths:
+        with gzip.open(path, 'rt', newline='') as f:
+            rows += list(csv.DictReader(f))
+    return rows
+
+
+def test_one_file_per_chunk(config, tmp_path):
+    log_readings(config, 1, [20.0, 20.5])
+    log_readings(config, 2, [21.0])
+    exporter = HistoryExporter(config, tmp_path / 'out', fmt='csv')
+    files = exporter.export(until=datetime(2026, 1, 3))
+    assert [f.name for f in files] == [
+        'history_20260101_0000.csv.gz', 'history_20260102_0000.csv.gz'
+    ]
+    rows = read_rows(files)
+    assert [(r['time'], r['temperature']) for r in rows] == [
+        ('2026-01-01 09:00:00', '20.0'),
+        ('2026-01-01 09:01:00', '20.5'),
+        ('2026-01-02 09:00:00', '21.0'),
+    ]
+
+
+def test_cursor_exports_each_row_once(config, tmp_path):
+    cursor = ExportCursor(tmp_path / 'cursor.json')
+    exporter = HistoryExporter(config, tmp_path / 'out', fmt='csv')
+    log_readings(config, 1, [20.0, 20.1, 20.2])
+
+    first = exporter.export(cursor.load(), datetime(2026, 1, 1, 9, 1, 30))
+    cursor.save(datetime(2026, 1, 1, 9, 1, 30))
+    second = exporter.export(cursor.load(), datetime(2026, 1, 2))
+    cursor.save(datetime(2026, 1, 2))
+    assert exporter.export(cursor.load(), datetime(2026, 1, 2)) == []
+
+    assert [r['time'] for r in read_rows(first)] == [
+        '2026-01-01 09:00:00', '2026-01-01 09:01:00'
+    ]
+    # Partial chunk continuing the first export gets its own name
+    assert second[0].name == 'history_20260101_0000_from_090130.csv.gz'
+    assert [r['temperature'] for r in read_rows(second)] == ['20.2']
+
+
+def test_cursor_round_trip(tmp_path):
+    cursor = ExportCursor(tmp_path / 'state' / 'cursor.json')
+    assert cursor.load() is None
+    cursor.save(START)
+    assert cursor.load() == START
+
+
+@pytest.mark.parametrize('content', ['', '{}', '{"until": "yesterday"}'])
+def test_unreadable_cursor_starts_over(tmp_path, content):
+    path = tmp_path / 'cursor.json'
+    path.write_text(content)
+    assert ExportCursor(path).load() is None
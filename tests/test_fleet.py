@@ -0,0 +1,184 @@
+"""
+Fleet aggregator against local stand-in nodes
+"""
+
+import asyncio
+import json
+import socket
+
+import pytest
+
+from fleet import FleetAggregator, FleetStore, check_event, stand_in_node
+from settings import load_config
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = load_config(tmp_path / 'missing.yaml')
+    config['fleet'].update({
+        'store_dir': str(tmp_path / 'fleet'),
+        'connect_timeout': 1, 'read_timeout': 2,
+        'reconnect_min': 0.02, 'reconnect_max': 0.1,
+    })
+    return config
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def until(condition, timeout=5):
+    """Wait for a condition to become true"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, 'timed out'
+        await asyncio.sleep(0.01)
+
+
+def follow(config, port, scenario):
+    """Run scenario(status, task) with one client following a port"""
+    config['fleet']['nodes'] = [{'name': 'node', 'url': f"127.0.0.1:{port}"}]
+
+    async def main():
+        aggregator = FleetAggregator(config)
+        client = aggregator.clients[0]
+        task = asyncio.create_task(client.run())
+        try:
+            await scenario(aggregator, client.status)
+            assert not task.done()
+        finally:
+            task.cancel()
+        return aggregator
+
+    return asyncio.run(main())
+
+
+def test_follows_node(config):
+    port = free_port()
+
+    async def scenario(aggregator, status):
+        server = await stand_in_node('127.0.0.1', port, 'a', interval=0.01)
+        try:
+            await until(lambda: len(aggregator.store._rows) >= 3)
+        finally:
+            server.close()
+        view = aggregator.view()
+        assert view['connected'] == 1
+        assert view['status'][0]['state'] == 'idle'
+        assert isinstance(view['status'][0]['temperature'], float)
+
+    follow(config, port, scenario)
+
+
+def test_node_down_then_back(config):
+    port = free_port()
+
+    async def scenario(aggregator, status):
+        await until(lambda: status.reconnects >= 3)
+        assert not status.connected
+        assert status.error
+        server = await stand_in_node('127.0.0.1', port, 'a', interval=0.01)
+        try:
+            await until(lambda: status.connected and status.temperature is not None)
+        finally:
+            server.close()
+
+    follow(config, port, scenario)
+
+
+async def scripted_node(port, streams):
+    """Node sending one list of (event, data) per connection, then closing"""
+    streams = list(streams)
+
+    async def handle(reader, writer):
+        while (await reader.readline()).strip():
+            pass
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/event-stream\r\n\r\n")
+        for event, data in (streams.pop(0) if streams else []):
+            writer.write(f"event: {event}\ndata: {data}\n\n".encode())
+        await writer.drain()
+        if streams:
+            writer.close()
+        else:
+            # Last stream stays open
+            await asyncio.sleep(10)
+
+    return await asyncio.start_server(handle, '127.0.0.1', port)
+
+
+SNAPSHOT = ('snapshot', json.dumps({'state': 'idle', 'temperature': 20.5}))
+
+
+@pytest.mark.parametrize('event', [
+    ('state', json.dumps({'time': '2026-01-01 09:00:00'})),
+    ('reading', json.dumps([20.5])),
+    ('reading', json.dumps({'temperature': 'hot'})),
+    ('snapshot', json.dumps({'state': 3})),
+    ('reading', '{"temperature": 2'),
+    ('reading', json.dumps({'temperature': 20.5, 'time': '2026/01/01 09:00:00'})),
+    ('state', json.dumps({'state': 'idle', 'time': '../../etc/x 09:00:00'})),
+])
+def test_malformed_event_reconnects(config, event):
+    port = free_port()
+
+    async def scenario(aggregator, status):
+        server = await scripted_node(port, [[event], [SNAPSHOT]])
+        try:
+            await until(lambda: status.state == 'idle')
+        finally:
+            server.close()
+        assert status.reconnects >= 1
+        assert status.temperature == 20.5
+
+    follow(config, port, scenario)
+
+
+def test_unexpected_error_does_not_end_client(config):
+    port = free_port()
+    failures = []
+
+    async def scenario(aggregator, status):
+        merge = aggregator.node_event
+
+        def node_event(status, event, data):
+            if not failures:
+                failures.append(event)
+                raise KeyError('bug')
+            merge(status, event, data)
+
+        aggregator.node_event = node_event
+        server = await scripted_node(port, [[SNAPSHOT], [SNAPSHOT]])
+        try:
+            await until(lambda: status.state == 'idle')
+        finally:
+            server.close()
+
+    follow(config, port, scenario)
+    assert failures == ['snapshot']
+
+
+def test_check_event():
+    check_event('reading', {'temperature': 20, 'time': '2026-01-01 09:00:00'})
+    check_event('snapshot', {})
+    with pytest.raises(ValueError):
+        check_event('reading', {'temperature': True})
+    for when in ('2026/01/01 09:00:00', '..-01-01 09:00:00', '2026-01-01', 1767254400):
+        with pytest.raises(ValueError, match='bad time'):
+            check_event('reading', {'temperature': 20, 'time': when})
+
+
+def test_store_day_that_cannot_be_written_keeps_others(tmp_path):
+    store = FleetStore(tmp_path / 'fleet')
+    store.add('2026-01-01 09:00:00', 'a', 'reading', temperature=20.0)
+    store.add('2026-01-02 09:00:00', 'b', 'reading', temperature=21.0)
+    store.add('2026-01-02 10:00:00', 'a', 'state', state='idle')
+    # A directory where the first day's file should be
+    (tmp_path / 'fleet' / 'fleet-2026-01-01.csv').mkdir(parents=True)
+    assert store.flush() == 2
+    lines = (tmp_path / 'fleet' / 'fleet-2026-01-02.csv').read_text().splitlines()
+    assert lines == ['time,node,kind,state,temperature',
+                     '2026-01-02 09:00:00,b,reading,,21.0',
+                     '2026-01-02 10:00:00,a,state,idle,']
@@ -0,0 +1,144 @@
+"""
+Line index of log segments
+"""
+
+from datetime import datetime
+
+import pytest
+
+from log_index import LEVELS, LogIndex
+
+LINES = [
+    "2026-01-01 09:00:00 - INFO - 🚀 Starting pump cycle",
+    "2026-01-01 09:00:30 - INFO - 🌡️  Temperature: 20.5C | Time: 30/600s",
+    "2026-01-01 09:01:00 - WARNING - ⚠️ WARNING: High temperature (26.0C)",
+    "Traceback (most recent call last):",
+    "2026-01-01 09:02:00 - ERROR - ❌ Error: sensor gone",
+    "2026-01-01 09:03:00 - INFO - ✅ Cycle completed successfully",
+]
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / 'fermentation.log'
+    path.write_text(''.join(line + '\n' for line in LINES))
+    return path
+
+
+@pytest.fixture
+def open_index():
+    indexes = []
+
+    def open_index(path):
+        index = LogIndex(path)
+        indexes.append(index)
+        return index
+
+    yield open_index
+    for index in indexes:
+        index.close()
+
+
+def epoch(stamp):
+    return int(datetime.fromisoformat(stamp).timestamp())
+
+
+def test_lines_times_and_levels(log, open_index):
+    index = open_index(log)
+    assert index.count == len(LINES)
+    assert [index.line(i) for i in range(index.count)] == LINES
+    assert index.epoch(1) == epoch('2026-01-01 09:00:30')
+    # Continuation lines inherit the previous line's time and level
+    assert index.epoch(3) == index.epoch(2)
+    assert index.level(3) == LEVELS['WARNING']
+
+
+def test_find_time_and_filters(log, open_index):
+    index = open_index(log)
+    assert index.find_time(epoch('2026-01-01 09:00:45')) == 2
+    assert index.find_time(epoch('2026-01-02 00:00:00')) == index.count
+    assert list(index.filter_level(LEVELS['WARNING'])) == [2, 3, 4]
+    # Case sensitive
+    assert list(index.filter_keyword('temperature')) == [2]
+    assert list(index.filter_keyword('emperature')) == [1, 2]
+    assert index.search('Error', 0) == 4
+    assert index.search('Starting', 4, backward=True) == 0
+    assert index.line_at_offset(len(LINES[0]) + 5) == 1
+
+
+def test_appended_lines_indexed_incrementally(log, open_index):
+    index = open_index(log)
+    with open(log, 'a') as f:
+        f.write("2026-01-01 21:00:00 - INFO - 🚀 Starting pump cycle\n")
+        f.write("2026-01-01 21:00:30 - INFO - partial")
+    assert index.refresh() == 1
+    assert index.count == len(LINES) + 1
+    assert list(index.filter_keyword('partial')) == []
+    # A second index reuses the sidecar
+    assert open_index(log).count == index.count
+
+
+def test_replaced_log_reindexed(log, open_index):
+    open_index(log).close()
+    log.write_text("2026-01-02 09:00:00 - INFO - new day\n")
+    index = open_index(log)
+    assert index.count == 1
+    assert index.line(0).endswith('new day')
+
+
+@pytest.mark.parametrize('content', ['', '2026-01-01 09:00:00 - INFO - no newline'])
+def test_empty_segment(tmp_path, open_index, content):
+    path = tmp_path / 'fermentation.log'
+    path.write_text(content)
+    index = open_index(path)
+    assert index.count == 0
+    assert index.line_at_offset(0) is None
+    assert list(index.filter_keyword('INFO')) == []
+    assert list(index.filter_level(LEVELS['DEBUG'])) == []
+    assert index.find_time(0) == 0
+    assert index.search('INFO', -1) is None
+
+
+def test_missing_segment(tmp_path, open_index):
+    index = open_index(tmp_path / 'missing.log')
+    assert index.count == 0
+    assert index.line_at_offset(0) is None
+
+
+def test_crash_before_header_update_not_indexed_twice(log, open_index, monkeypatch):
+    import log_index
+
+    open_index(log).close()
+    appended = "2026-01-01 21:00:00 - INFO - 🚀 Starting pump cycle"
+    with open(log, 'a') as f:
+        f.write(appended + '\n')
+
+    class HeaderLost(Exception):
+        pass
+
+    class CrashingHeader:
+        """Header struct whose write never happens"""
+        size = log_index._HEADER.size
+        unpack = staticmethod(log_index._HEADER.unpack)
+
+        @staticmethod
+        def pack(*args):
+            raise HeaderLost
+
+    # The appended line's record is written, the header is not
+    monkeypatch.setattr(log_index, '_HEADER', CrashingHeader)
+    with pytest.raises(HeaderLost):
+        LogIndex(log)
+    monkeypatch.undo()
+
+    index = open_index(log)
+    assert index.count == len(LINES) + 1
+    assert [index.line(i) for i in range(index.count)] == LINES + [appended]
+
+
+def test_filters_from_a_start_line(log, open_index):
+    index = open_index(log)
+    assert list(index.filter_level(LEVELS['WARNING'], start=3)) == [3, 4]
+    assert list(index.filter_keyword('Cycle', start=1)) == [5]
+    assert list(index.filter_keyword('Starting', start=1)) == []
+    assert list(index.filter_keyword('Starting', start=index.count)) == []
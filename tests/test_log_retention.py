@@ -0,0 +1,148 @@
+"""
+Log compaction into archives, down-sampling and pruning
+"""
+
+import json
+import os
+import shutil
+from datetime import date, datetime
+
+import pytest
+
+from log_history import (
+    archived_segments, index_path, iter_lines, open_archive, read_index
+)
+from log_retention import LogRetention
+from settings import load_config
+
+DAY = date(2026, 1, 1)
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = load_config(tmp_path / 'missing.yaml')
+    config['logging']['pump_log'] = str(tmp_path / 'logs' / 'fermentation.log')
+    config['retention'].update({
+        'archive_dir': str(tmp_path / 'logs' / 'archive'), 'block_size': 200,
+    })
+    (tmp_path / 'logs').mkdir()
+    return config
+
+
+def write_segment(config, day=DAY, hours=(9,)):
+    """Rotated segment with one cycle per hour; returns its lines"""
+    lines = []
+    for hour in hours:
+        stamp = f"{day.isoformat()} {hour:02d}"
+        lines.append(f"{stamp}:00:00 - INFO - 🚀 Starting pump cycle\n")
+        for minute in range(1, 11):
+            lines.append(f"{stamp}:{minute:02d}:00 - INFO - 🌡️  Temperature: "
+                         f"{20 + minute / 10:.1f}C | Time: {minute * 60}/600s\n")
+            lines.append(f"{stamp}:{minute:02d}:00 - INFO - ⏱️  Progress: "
+                         f"{minute * 10:.1f}%\n")
+        lines.append(f"{stamp}:10:00 - INFO - ✅ Cycle completed successfully\n")
+    segment = f"{config['logging']['pump_log']}.{day.isoformat()}"
+    with open(segment, 'a') as f:
+        f.writelines(lines)
+    return lines
+
+
+def archives(config):
+    return archived_segments(config['logging']['pump_log'],
+                             config['retention']['archive_dir'])
+
+
+def read_archive(archive):
+    with open_archive(archive) as f:
+        return f.readlines()
+
+
+def test_segment_archived_in_blocks(config):
+    lines = write_segment(config)
+    stats = LogRetention(config).compact(today=DAY)
+    assert stats == {'archived': 1, 'rolled_up': 0, 'removed': 0}
+    [archive] = archives(config)
+    assert read_archive(archive) == lines
+    assert len(read_index(archive)['blocks']) > 1
+
+
+def test_crash_before_segment_removed_is_not_archived_twice(config, tmp_path):
+    lines = write_segment(config)
+    segment = tmp_path / 'logs' / f"fermentation.log.{DAY.isoformat()}"
+    shutil.copy2(segment, tmp_path / 'kept')
+    LogRetention(config).compact(today=DAY)
+    # Power loss after the archive was written, before the unlink
+    shutil.copy2(tmp_path / 'kept', segment)
+    stats = LogRetention(config).compact(today=DAY)
+    assert stats['archived'] == 0
+    assert not segment.exists()
+    [archive] = archives(config)
+    assert read_archive(archive) == lines
+
+
+def test_same_day_rotated_twice(config):
+    first = write_segment(config, hours=(9,))
+    LogRetention(config).compact(today=DAY)
+    second = write_segment(config, hours=(21,))
+    # Rotated again twelve hours later, same name and size
+    segment = f"{config['logging']['pump_log']}.{DAY.isoformat()}"
+    os.utime(segment, (os.stat(segment).st_atime, os.stat(segment).st_mtime + 43200))
+    LogRetention(config).compact(today=DAY)
+    assert [read_archive(a) for a in archives(config)] == [first, second]
+
+
+def test_old_archive_rolled_up_then_pruned(config):
+    lines = write_segment(config)
+    retention = LogRetention(config)
+    retention.compact(today=DAY)
+    [archive] = archives(config)
+    source = read_index(archive)['source']
+
+    stats = retention.compact(today=date(2026, 2, 15))
+    assert stats['rolled_up'] == 1
+    index = read_index(archive)
+    assert index['rolled_up'] and index['source'] == source
+    rolled = read_archive(archive)
+    assert not [line for line in rolled if 'Progress' in line or '| Time:' in line]
+    assert 'min=20.10C max=21.00C mean=20.55C n=10' in ''.join(rolled)
+    assert rolled[0] == lines[0] and rolled[-1] == lines[-1]
+
+    stats = retention.compact(today=date(2027, 1, 2))
+    assert stats['removed'] == 1
+    assert archives(config) == []
+
+
+def test_crash_between_rollup_replaces(config, monkeypatch):
+    import log_retention
+
+    lines = write_segment(config, hours=range(9, 21))
+    retention = LogRetention(config)
+    retention.compact(today=DAY)
+    [archive] = archives(config)
+    replace = os.replace
+
+    def power_loss(src, dst):
+        # Down-sampled data never replaces the archive
+        if dst == archive:
+            raise KeyboardInterrupt
+        replace(src, dst)
+
+    monkeypatch.setattr(log_retention.os, 'replace', power_loss)
+    with pytest.raises(KeyboardInterrupt):
+        retention.compact(today=date(2026, 2, 15))
+    monkeypatch.setattr(log_retention.os, 'replace', replace)
+
+    # Rollup index next to the raw archive: offsets ignored, nothing garbled
+    assert json.loads(index_path(archive).read_text())['rolled_up']
+    index = read_index(archive)
+    assert index['blocks'] == [] and not index['rolled_up']
+    assert read_archive(archive) == lines
+    start = datetime(2026, 1, 1, 15, 0)
+    assert list(iter_lines(config['logging']['pump_log'], start,
+                           config['retention']['archive_dir'])) == lines
+
+    # The next run finishes the rollup
+    assert retention.compact(today=date(2026, 2, 15))['rolled_up'] == 1
+    index = read_index(archive)
+    assert index['rolled_up'] and len(index['blocks']) > 1
+    assert 'n=10' in ''.join(read_archive(archive))
@@ -0,0 +1,95 @@
+"""
+Probe calibration and fusion
+"""
+
+import pytest
+
+from probe_fusion import ProbeFusion, linear_correction
+
+
+def test_offset_correction():
+    assert linear_correction({'offset': -0.25}) == (1.0, -0.25)
+    assert linear_correction({}) == (1.0, 0.0)
+
+
+def test_two_point_correction():
+    # Ice bath reads 0.5, boiling water 99.0
+    gain, offset = linear_correction({'points': [[0.5, 0.0], [99.0, 100.0]]})
+    assert 0.5 * gain + offset == pytest.approx(0.0)
+    assert 99.0 * gain + offset == pytest.approx(100.0)
+
+
+@pytest.mark.parametrize('entry', [
+    {'offset': 0.1, 'points': [[0, 0], [100, 100]]},
+    {'points': [[20, 20], [20, 21]]},
+    {'points': [[0, 0]]},
+    {'points': 'ice'},
+    {'offset': 'warm'},
+    0.5,
+])
+def test_malformed_entry(entry):
+    with pytest.raises(ValueError):
+        linear_correction(entry)
+
+
+@pytest.mark.parametrize('sensors', [
+    {'fusion': 'mode'},
+    {'weights': {'a': 'heavy'}},
+    {'weights': {'a': -1}},
+    {'min_probes': 0},
+    {'outlier_threshold': 'far'},
+    {'calibration': {'a': {'points': [[1, 1]]}}},
+])
+def test_invalid_config(sensors):
+    section = {
+        'calibration': {}, 'fusion': 'median', 'weights': {},
+        'outlier_threshold': 1.0, 'min_probes': 1,
+    }
+    with pytest.raises(ValueError):
+        ProbeFusion.from_config(dict(section, **sensors))
+
+
+def test_calibration_applied_before_fusion():
+    fusion = ProbeFusion({'a': {'offset': 1.0}}, method='mean')
+    assert fusion.calibrate({'a': 19.0, 'b': 21.0, 'c': None}) == {'a': 20.0, 'b': 21.0}
+    assert fusion.combine({'a': 19.0, 'b': 21.0}) == 20.5
+
+
+@pytest.mark.parametrize('method, expected', [
+    ('median', 20.0),
+    ('mean', 20.33),
+    # c counts twice: (19 + 20 + 2 * 22) / 4
+    ('weighted', 20.75),
+])
+def test_fusion_methods(method, expected):
+    fusion = ProbeFusion(method=method, weights={'c': 2.0}, outlier_threshold=0)
+    assert fusion.combine({'a': 19.0, 'b': 20.0, 'c': 22.0}) == expected
+
+
+def test_outlier_rejected():
+    fusion = ProbeFusion(method='mean', outlier_threshold=1.0)
+    readings = {'a': 20.0, 'b': 20.4, 'c': 35.0}
+    assert fusion.reject_outliers(readings) == {'a': 20.0, 'b': 20.4}
+    assert fusion.combine(readings) == 20.2
+
+
+def test_two_probes_never_rejected():
+    fusion = ProbeFusion(method='mean', outlier_threshold=1.0)
+    assert fusion.combine({'a': 20.0, 'b': 30.0}) == 25.0
+
+
+def test_min_probes_not_met():
+    fusion = ProbeFusion(min_probes=2)
+    assert fusion.combine({'a': 20.0, 'b': None}) is None
+    assert fusion.combine({}) is None
+    assert fusion.combine({'a': 20.0, 'b': 20.2}) == 20.1
+
+
+def test_two_clusters_keep_the_probes_nearest_the_median():
+    fusion = ProbeFusion(method='median', outlier_threshold=1.0)
+    # Median 22.0 sits between the clusters, every probe is 3 °C away
+    readings = {'a': 19.0, 'b': 19.0, 'c': 25.0, 'd': 25.0}
+    assert fusion.reject_outliers(readings) == readings
+    assert fusion.combine(readings) == 22.0
+    # Odd count: the median probe itself survives, the far ones go
+    assert fusion.reject_outliers({'a': 19.0, 'b': 22.0, 'c': 25.0}) == {'b': 22.0}
@@ -0,0 +1,56 @@
+"""
+Replay of a recorded trace against the golden relay decisions
+
+After an intended behaviour change, regenerate the golden file with
+    python3 src/replay.py --trace tests/data/trace.csv \
+        --golden tests/data/trace.golden --update-golden --config missing.yaml
+"""
+
+import logging
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from replay import Trace, diff_golden, replay, scheduled_starts
+from settings import load_config
+
+DATA = Path(__file__).parent / 'data'
+
+
+@pytest.fixture
+def run_replay(tmp_path):
+    """Replay the sample trace; restores the root logger it takes over"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    runs = []
+
+    def run_replay():
+        config = load_config(tmp_path / 'missing.yaml')
+        starts = scheduled_starts(config, date(2026, 1, 1), date(2026, 1, 3))
+        workdir = tmp_path / f'run{len(runs)}'
+        workdir.mkdir()
+        runs.append(workdir)
+        return replay(config, Trace.from_csv(DATA / 'trace.csv'), starts, workdir)
+
+    try:
+        yield run_replay
+    finally:
+        for handler in root.handlers:
+            if handler not in handlers:
+                handler.close()
+        root.handlers, root.level = handlers, level
+
+
+def test_trace_matches_golden(run_replay):
+    assert diff_golden(run_replay(), DATA / 'trace.golden') == []
+
+
+def test_replay_is_deterministic(run_replay):
+    assert run_replay() == run_replay()
+
+
+def test_state_kept_in_memory(run_replay, tmp_path):
+    run_replay()
+    # Only the lock and the controller log, no journal or counter file
+    assert {p.suffix for p in (tmp_path / 'run0').iterdir()} <= {'.lock', '.log'}
@@ -0,0 +1,95 @@
+"""
+Batch report over the live log and compressed archives
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from log_retention import LogRetention
+from report import BatchReport
+from settings import load_config
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = load_config(tmp_path / 'missing.yaml')
+    config['logging']['pump_log'] = str(tmp_path / 'logs' / 'fermentation.log')
+    config['retention']['archive_dir'] = str(tmp_path / 'logs' / 'archive')
+    (tmp_path / 'logs').mkdir()
+    config['batches'] = [
+        {'name': '<b>Kraut & Co</b>', 'start': '2026-01-01', 'end': '2026-01-02'},
+        {'name': 'Later', 'start': '2026-01-03'},
+    ]
+    return config
+
+
+def write(path, entries):
+    with open(path, 'a') as f:
+        f.writelines(f"{stamp} - INFO - {message}\n" for stamp, message in entries)
+
+
+@pytest.fixture
+def report(config):
+    """Report of two days, the first one already archived"""
+    log_file = config['logging']['pump_log']
+    write(f"{log_file}.2026-01-01", [
+        ('2026-01-01 09:00:00', '🚀 Starting pump cycle'),
+        ('2026-01-01 09:00:00', '🌡️  Initial temperature: 26.0C'),
+        ('2026-01-01 09:00:30', '🌡️  Temperature: 26.0C | Time: 30/90s'),
+        ('2026-01-01 09:01:00', '🌡️  Temperature: 26.0C | Time: 60/90s'),
+        ('2026-01-01 09:01:30', '🌡️  Temperature: 24.0C | Time: 90/90s'),
+        ('2026-01-01 09:01:30', '✅ Cycle completed successfully'),
+        ('2026-01-01 21:00:00', '🚀 Starting pump cycle'),
+        ('2026-01-01 21:00:00', '🌡️  Initial temperature: 31.0C'),
+        ('2026-01-01 21:00:00', '⚠️ Skipping cycle due to temperature'),
+    ])
+    assert LogRetention(config).compact(today=date(2026, 1, 2))['archived'] == 1
+    write(log_file, [
+        ('2026-01-02 09:00:00', '🚀 Starting pump cycle'),
+        ('2026-01-02 09:00:00', '🌡️  Initial temperature: 22.0C'),
+        ('2026-01-02 09:00:10', '⚠️ Interrupted by user'),
+        ('2026-01-03 09:00:00', '🚀 Starting pump cycle'),
+    ])
+    report = BatchReport(config, datetime(2026, 1, 1), datetime(2026, 1, 3))
+    report.build(log_file, config['retention']['archive_dir'])
+    return report
+
+
+def counts(summary):
+    return (summary.cycles, summary.completed, summary.skipped, summary.aborts)
+
+
+def test_counts_per_day_across_archive_and_live_log(report):
+    days = report.days
+    assert sorted(days) == [date(2026, 1, 1), date(2026, 1, 2)]
+    assert counts(days[date(2026, 1, 1)]) == (2, 1, 1, 0)
+    assert counts(days[date(2026, 1, 2)]) == (1, 0, 0, 1)
+    assert (days[date(2026, 1, 1)].temp_min, days[date(2026, 1, 1)].temp_max) == (24.0, 31.0)
+
+
+def test_time_above_warning_within_cycles_only(report):
+    # Three 30 s gaps after readings above 25 °C; the 31 °C reading is
+    # followed by the next day's cycle, not counted
+    assert report.total.above_warning == 90
+
+
+def test_batch_includes_its_end_day(report):
+    [(name, start, end, batch)] = report.batches
+    assert name == '<b>Kraut & Co</b>'
+    assert counts(batch) == (3, 1, 1, 1)
+
+
+def test_markdown(report):
+    text = report.to_markdown('plot.png')
+    assert '2026-01-01 – 2026-01-02' in text
+    assert '| <b>Kraut & Co</b> | 3 | 1 | 1 | 1 | 22.00 | 31.00 |' in text
+    assert '| 2026-01-02 | 1 | 0 | 0 | 1 |' in text
+    assert '![Temperature by day](plot.png)' in text
+
+
+def test_html_escapes_batch_names(report):
+    page = report.to_html(b'png')
+    assert '<td>&lt;b&gt;Kraut &amp; Co&lt;/b&gt;</td>' in page
+    assert '<b>Kraut' not in page
+    assert 'src="data:image/png;base64,cG5n"' in page
@@ -0,0 +1,208 @@
+"""
+Temperature rollup tiers
+"""
+
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from rollups import RollupStore
+from web_dashboard import DashboardHandler
+
+DAY = 86400
+START = 1767225600  # 2026-01-01 00:00 UTC
+
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def open_store(tmp_path, clock):
+    stores = []
+
+    def open_store(keep_days=None):
+        store = RollupStore(
+            tmp_path / 'rollups', keep_days or {'1m': 1, '15m': 7, '1h': 30},
+            flush_interval=60, clock=clock
+        )
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def feed(store, clock, seconds, interval=30, seed=0):
+    """Readings every interval seconds; returns them as (epoch, temp)"""
+    rng = random.Random(seed)
+    readings = []
+    for _ in range(seconds // interval):
+        clock.now += interval
+        temp = round(rng.uniform(15, 25), 2)
+        store.add(temp)
+        readings.append((clock.now, temp))
+    return readings
+
+
+def test_buckets_match_raw_readings(open_store, clock):
+    store = open_store()
+    readings = feed(store, clock, 6 * 3600)
+    for resolution, seconds in ((60, 60), (900, 900), (3600, 3600)):
+        result = store.query(START, clock.now + 1, resolution=resolution)
+        assert result['seconds'] == seconds
+        for b_start, t_min, t_max, t_mean, count in result['points']:
+            temps = [t for when, t in readings if b_start <= when < b_start + seconds]
+            assert count == len(temps)
+            assert t_min == pytest.approx(min(temps), abs=0.01)
+            assert t_max == pytest.approx(max(temps), abs=0.01)
+            assert t_mean == pytest.approx(sum(temps) / len(temps), abs=0.01)
+        assert sum(p[4] for p in result['points']) == len(readings)
+
+
+def test_finest_tier_at_least_resolution(open_store, clock):
+    store = open_store()
+    feed(store, clock, 3 * 3600)
+    end = clock.now
+    assert store.query(end - 3600, end, resolution=30)['tier'] == '1m'
+    assert store.query(end - 3600, end, resolution=60)['tier'] == '1m'
+    assert store.query(end - 3600, end, resolution=61)['tier'] == '15m'
+    assert store.query(end - 3600, end, resolution=900)['tier'] == '15m'
+
+
+@pytest.mark.parametrize('hours, max_points', [
+    (24, 500), (3, 180), (3, 179), (3, 2), (2, 1), (72, 10),
+])
+def test_max_points_is_a_maximum(open_store, clock, hours, max_points):
+    store = open_store()
+    readings = feed(store, clock, 3 * DAY, interval=60)
+    end = clock.now + 1
+    start = end - hours * 3600
+    result = store.query(start, end, max_points=max_points)
+    points = result['points']
+    assert 0 < len(points) <= max_points
+    # Merged buckets summarize exactly the readings of the tier buckets
+    # they cover, starting with the one holding `start`
+    first = start - start % dict(store.tiers)[result['tier']].seconds
+    seconds = result['seconds']
+    for b_start, t_min, t_max, t_mean, count in points:
+        temps = [t for when, t in readings
+                 if max(b_start, first) <= when < b_start + seconds]
+        assert count == len(temps)
+        assert t_min == pytest.approx(min(temps), abs=0.01)
+        assert t_max == pytest.approx(max(temps), abs=0.01)
+        assert t_mean == pytest.approx(sum(temps) / len(temps), abs=0.01)
+
+
+def test_falls_back_to_tier_still_covering_range(open_store, clock):
+    store = open_store()
+    feed(store, clock, 3 * DAY, interval=300)
+    # The minute tier keeps one day only
+    result = store.query(clock.now - 2 * DAY, clock.now, resolution=60)
+    assert result['tier'] == '15m'
+    assert result['points'][0][0] < clock.now - DAY
+
+
+def test_ring_keeps_only_recent_buckets(open_store, clock):
+    store = open_store()
+    feed(store, clock, 3 * DAY, interval=120)
+    store.flush()
+    points = store.tiers[0][1].read(START, clock.now + 1)
+    assert len(points) <= 24 * 60
+    assert points[0][0] >= clock.now - DAY
+
+
+def test_reopen_continues_open_bucket(open_store, clock):
+    store = open_store()
+    clock.now += 10
+    store.add(20.0)
+    store.close()
+
+    store = open_store()
+    clock.now += 10
+    store.add(22.0)
+    point = store.query(START, clock.now + 1, resolution=60)['points'][0]
+    assert point[1:] == [20.0, 22.0, 21.0, 2]
+
+
+def test_late_reading_never_overwrites_newer_bucket(open_store, clock):
+    store = open_store()
+    feed(store, clock, 2 * DAY, interval=600)
+    store.flush()
+    before = store.tiers[0][1].read(START, clock.now + 1)
+    # Same minute-tier slot as a bucket one day later
+    store.add(99.0, when=START + 60)
+    store.flush()
+    assert store.tiers[0][1].read(START, clock.now + 1) == before
+
+
+def test_hourly_log_rollups_skip_finer_tiers(open_store, clock):
+    store = open_store()
+    store.add_rollup(START + 1800, 19.0, 22.0, 20.5, 40)
+    assert store.query(START, START + 3600, resolution=3600)['points'] == [
+        [START, 19.0, 22.0, 20.5, 40]
+    ]
+    assert store.query(START, START + 3600, resolution=60)['points'] == []
+
+
+@pytest.fixture
+def history(open_store, clock):
+    """GET /api/history of a dashboard serving a day of minute readings"""
+    clock.now = int(time.time()) - DAY
+    store = open_store()
+    feed(store, clock, DAY, interval=60)
+
+    class Handler(DashboardHandler):
+        rollup_store = store
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+
+    def get(query):
+        url = f"http://127.0.0.1:{server.server_port}/api/history?{query}"
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    yield get
+    server.shutdown()
+    server.server_close()
+
+
+def test_history_default_within_points(history):
+    status, result = history('')
+    assert status == 200
+    assert result['tier'] == '15m'
+    assert 0 < len(result['points']) <= 500
+    status, result = history('hours=24&points=100')
+    assert len(result['points']) <= 100
+
+
+@pytest.mark.parametrize('query', [
+    'hours=inf', 'hours=nan', 'hours=-1', 'hours=0', 'hours=x',
+    'points=0', 'points=-5', 'resolution=nan', 'resolution=0',
+])
+def test_history_rejects_bad_parameters(history, query):
+    assert history(query) == (400, None)
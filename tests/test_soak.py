@@ -0,0 +1,75 @@
+"""
+Soak test of the control loop
+
+Thousands of accelerated cycles with random faults. Besides the exit-path
+invariants checked after every cycle, the per-cycle cost must stay flat:
+growing time, memory, open files or threads means something accumulates.
+Set SOAK_CYCLES for a longer run.
+"""
+
+import gc
+import os
+import random
+import statistics
+import threading
+import tracemalloc
+
+import conftest
+from conftest import Soak
+
+CYCLES = int(os.environ.get('SOAK_CYCLES', 2000))
+
+
+def open_files():
+    """File descriptors of this process"""
+    return len(os.listdir('/proc/self/fd'))
+
+
+def test_soak(soak):
+    rng = random.Random(1)
+    for _ in range(50):
+        soak.cycle()
+    files, threads = open_files(), threading.active_count()
+
+    for _ in range(CYCLES):
+        signal_after = rng.randrange(1, 80) if rng.random() < 0.01 else None
+        soak.cycle(soak.random_faults(rate=0.05), signal_after)
+
+    assert soak.outcomes['completed'] > CYCLES // 2
+    assert open_files() <= files
+    assert threading.active_count() <= threads
+
+    # Median of the first and last tenth, robust against GC pauses
+    window = max(CYCLES // 10, 10)
+    first = statistics.median(soak.durations[50:50 + window])
+    last = statistics.median(soak.durations[-window:])
+    assert last < first * 2 + 0.001, \
+        f'cycle time grew from {first * 1000:.2f}ms to {last * 1000:.2f}ms'
+
+
+def test_memory_per_cycle(make_controller, config, clock, gpio, w1):
+    # Small bucket caps, so the energy history is full after the warm-up
+    config['energy'].update({'hourly_buckets': 24, 'daily_buckets': 7})
+    soak = Soak(make_controller, config, clock, gpio, w1)
+    # Signals replace the controller and are left out: each controller
+    # stays referenced by its atexit handler
+    for _ in range(200):
+        soak.cycle(soak.random_faults(rate=0.05))
+
+    cycles = max(CYCLES // 2, 100)
+    # Only the controller, not the harness recording the cycles
+    harness = [tracemalloc.Filter(False, conftest.__file__)]
+    tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot().filter_traces(harness)
+        for _ in range(cycles):
+            soak.cycle(soak.random_faults(rate=0.05))
+        gc.collect()
+        after = tracemalloc.take_snapshot().filter_traces(harness)
+    finally:
+        tracemalloc.stop()
+
+    growth = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    assert growth / cycles < 64, \
+        f'{growth / cycles:.0f} bytes retained per cycle'
@@ -0,0 +1,60 @@
+"""
+Controller startup order
+"""
+
+import threading
+
+import temp_sensor
+from conftest import PROBE, SoakController
+
+
+class OrderController(SoakController):
+    """Records the threads alive when the watchdog would fork"""
+
+    def _setup_watchdog(self):
+        self.threads_at_fork = threading.active_count()
+        self.watchdog = None
+
+
+def test_watchdog_forks_before_any_helper_thread(config, clock, w1, tmp_path,
+                                                 make_controller):
+    config['tracing'].update({
+        'enabled': True, 'sample_interval': 0.01,
+        'output_dir': str(tmp_path / 'traces'),
+    })
+    threads = threading.active_count()
+    controller = OrderController(config, clock, tmp_path, w1.base_dir)
+    try:
+        assert controller.threads_at_fork == threads
+        assert list(controller.startup_times)[:4] == [
+            'config', 'logging', 'gpio', 'watchdog'
+        ]
+    finally:
+        controller.cleanup()
+
+
+def test_startup_within_budget(config, tmp_path, make_controller):
+    config['tracing'].update({'enabled': True, 'output_dir': str(tmp_path / 'traces')})
+    make_controller().cleanup()
+    # Second start reads the sensor manifest instead of scanning
+    controller = make_controller()
+    try:
+        assert sum(controller.startup_times.values()) < config['startup']['budget']
+    finally:
+        controller.cleanup()
+
+
+def test_sensor_manifest_kept_in_state_dir(config, tmp_path, make_controller,
+                                           monkeypatch):
+    make_controller().cleanup()
+    assert (tmp_path / 'state' / 'sensors.json').exists()
+
+    def discover(base_dir):
+        raise AssertionError('bus scanned despite a valid manifest')
+
+    monkeypatch.setattr(temp_sensor, 'discover', discover)
+    controller = make_controller()
+    try:
+        assert controller.temp_sensor.devices[0]['id'] == PROBE
+    finally:
+        controller.cleanup()
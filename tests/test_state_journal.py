@@ -0,0 +1,72 @@
+"""
+Cycle journal: resume after a crash, survive a bad card or record
+"""
+
+import json
+
+import pytest
+
+from state_journal import CycleJournal
+
+WINDOW = 3600
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'state' / 'journal.json'
+
+
+def test_resume_after_crash(path):
+    journal = CycleJournal(path, flush_interval=0)
+    journal.start_cycle(300, temp=20.5)
+    journal.update(120, 20.8)
+    # Power loss: nothing else written, a new process opens the journal
+    record = CycleJournal(path).interrupted_cycle(WINDOW, min_remaining=30)
+    assert record['remaining'] == 180
+    assert record['last_temp'] == 20.8
+
+
+def test_progress_writes_are_throttled(path):
+    journal = CycleJournal(path, flush_interval=60)
+    journal.start_cycle(300)
+    journal.update(30)
+    assert CycleJournal(path).load()['elapsed'] == 0
+
+
+def test_finished_cycle_not_resumed(path):
+    journal = CycleJournal(path, flush_interval=0)
+    journal.start_cycle(300)
+    journal.finish(CycleJournal.COMPLETED, 300)
+    assert CycleJournal(path).interrupted_cycle(WINDOW, 30) is None
+
+
+def test_almost_done_cycle_abandoned(path):
+    journal = CycleJournal(path, flush_interval=0)
+    journal.start_cycle(300)
+    journal.update(290)
+    assert CycleJournal(path).interrupted_cycle(WINDOW, 30) is None
+    assert CycleJournal(path).load()['status'] == CycleJournal.ABANDONED
+
+
+@pytest.mark.parametrize('content', [
+    '{"status": "running", "run_ti',
+    '["running"]',
+    json.dumps({'status': 'running', 'started': '2026-01-01T09:00:00'}),
+    json.dumps({'status': 'running', 'run_time': 300, 'elapsed': 10}),
+    json.dumps({'status': 'running', 'run_time': '300', 'elapsed': 10,
+                'started': '2026-01-01T09:00:00'}),
+])
+def test_corrupt_journal_means_nothing_to_resume(path, content):
+    path.parent.mkdir()
+    path.write_text(content)
+    assert CycleJournal(path).interrupted_cycle(WINDOW, 30) is None
+
+
+def test_write_failure_does_not_stop_cycle(tmp_path):
+    # A file where the journal directory should be
+    (tmp_path / 'state').write_text('')
+    journal = CycleJournal(tmp_path / 'state' / 'journal.json', flush_interval=0)
+    journal.start_cycle(300)
+    journal.update(60)
+    journal.finish(CycleJournal.COMPLETED, 300)
+    assert journal.load() is None
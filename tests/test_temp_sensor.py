@@ -0,0 +1,138 @@
+"""
+DS18B20 discovery, the discovery manifest and multi-probe reads
+"""
+
+import pytest
+
+import temp_sensor
+from conftest import PROBE
+from probe_fusion import ProbeFusion
+from temp_sensor import DS18B20Sensor, SensorManifest, discover, parse_w1_slave
+
+SECOND = '28-000000000002'
+
+
+class Clock:
+    def __init__(self):
+        self.slept = 0.0
+
+    def sleep(self, seconds):
+        self.slept += seconds
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return tmp_path / 'state' / 'sensors.json'
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Counts bus scans"""
+    calls = []
+
+    def counting(base_dir):
+        calls.append(base_dir)
+        return discover(base_dir)
+
+    monkeypatch.setattr(temp_sensor, 'discover', counting)
+    return calls
+
+
+def sensor(w1, manifest=None, fusion=None):
+    return DS18B20Sensor(str(w1.base_dir), clock=Clock(), manifest=manifest,
+                         fusion=fusion)
+
+
+@pytest.mark.parametrize('lines, expected', [
+    (['72 01 : crc=57 YES\n', '72 01 t=21375\n'], 21.375),
+    (['72 01 : crc=57 YES\n', '72 01 t=-1250\n'], -1.25),
+    (['72 01 : crc=57 NO\n', '72 01 t=21375\n'], None),
+    (['72 01 : crc=57 YES\n', '72 01 t=\n'], None),
+    (['72 01 : crc=57 YES\n'], None),
+    ([], None),
+])
+def test_parse_w1_slave(lines, expected):
+    assert parse_w1_slave(lines) == expected
+
+
+def test_discover_sorted_with_resolution(w1):
+    w1.set(SECOND, 21.0)
+    (w1.base_dir / SECOND / 'resolution').write_text('12\n')
+    (w1.base_dir / 'w1_bus_master1').mkdir()
+    devices = discover(str(w1.base_dir))
+    assert [(d['id'], d['resolution']) for d in devices] == [
+        (PROBE, None), (SECOND, 12)
+    ]
+
+
+def test_no_probe_raises(tmp_path):
+    (tmp_path / 'w1').mkdir()
+    with pytest.raises(Exception, match='not found'):
+        DS18B20Sensor(str(tmp_path / 'w1'))
+
+
+def test_manifest_skips_scan(w1, manifest, scans):
+    assert sensor(w1, manifest).read_temperature() == 20.0
+    assert sensor(w1, manifest).read_temperature() == 20.0
+    assert len(scans) == 1
+
+
+def test_stale_manifest_rescanned(w1, manifest, scans):
+    sensor(w1, manifest)
+    w1.remove(PROBE)
+    w1.set(SECOND, 22.0)
+    assert sensor(w1, manifest).read_temperature() == 22.0
+    assert len(scans) == 2
+    assert SensorManifest(manifest).load(str(w1.base_dir))[0]['id'] == SECOND
+
+
+def test_manifest_of_other_bus_ignored(w1, manifest, tmp_path):
+    SensorManifest(manifest).save(str(tmp_path / 'other'), [
+        {'id': PROBE, 'path': str(w1.base_dir / PROBE / 'w1_slave'),
+         'resolution': None}
+    ])
+    assert SensorManifest(manifest).load(str(w1.base_dir)) is None
+
+
+def test_probe_swapped_while_running(w1, manifest):
+    probe = sensor(w1, manifest)
+    w1.remove(PROBE)
+    w1.set(SECOND, 23.0)
+    assert probe.read_temperature() == 23.0
+
+
+def test_crc_failure_retried(w1):
+    probe = sensor(w1)
+    w1.set(PROBE, 20.0, crc='NO')
+    assert probe.read_temperature(retries=3) is None
+    assert probe.clock.slept == pytest.approx(0.6)
+
+
+def test_all_probes_from_one_bulk_conversion(w1):
+    w1.set(SECOND, 22.0)
+    bus = w1.base_dir / 'w1_bus_master1'
+    bus.mkdir()
+    (bus / 'therm_bulk_read').write_text('')
+    probe = sensor(w1, fusion=ProbeFusion(method='mean'))
+    assert probe.read_all() == {PROBE: 20.0, SECOND: 22.0}
+    assert (bus / 'therm_bulk_read').read_text() == 'trigger\n'
+    assert probe.read_temperature() == 21.0
+
+
+def test_failed_probe_left_to_fusion(w1):
+    w1.set(SECOND, 22.0)
+    w1.set(PROBE, 20.0, crc='NO')
+    probe = sensor(w1, fusion=ProbeFusion(min_probes=1))
+    assert probe.read_all() == {PROBE: None, SECOND: 22.0}
+    assert probe.read_temperature() == 22.0
+
+
+def test_added_probe_rescanned(w1, manifest, scans):
+    sensor(w1, manifest)
+    w1.set(SECOND, 22.0)
+    probe = sensor(w1, manifest)
+    assert [device['id'] for device in probe.devices] == [PROBE, SECOND]
+    assert len(scans) == 2
+    # Cached again for the next start
+    sensor(w1, manifest)
+    assert len(scans) == 2
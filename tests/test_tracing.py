@@ -0,0 +1,80 @@
+"""
+Span ring buffer, Chrome trace export and the sampling profiler
+"""
+
+import json
+import threading
+import time
+
+from tracing import Tracer
+
+
+def test_disabled_records_nothing():
+    tracer = Tracer(capacity=8)
+    with tracer.span('idle'):
+        pass
+    assert tracer.traced('call')(lambda: 1)() == 1
+    assert tracer.events() == []
+
+
+def test_spans_and_traced_calls():
+    tracer = Tracer(capacity=8)
+    tracer.enable()
+
+    @tracer.traced('work')
+    def work():
+        time.sleep(0.001)
+        return 'done'
+
+    with tracer.span('outer'):
+        assert work() == 'done'
+    events = tracer.events()
+    assert [e['name'] for e in events] == ['work', 'outer']
+    work_event, outer = events
+    assert work_event['dur'] >= 1000
+    assert outer['ts'] <= work_event['ts']
+    assert outer['dur'] >= work_event['dur']
+    assert work_event['tid'] == threading.get_ident()
+
+
+def test_ring_keeps_newest_spans():
+    tracer = Tracer(capacity=4)
+    tracer.enable()
+    for i in range(10):
+        tracer.record(f"span{i}", time.perf_counter_ns(), 1000)
+    assert [e['name'] for e in tracer.events()] == [
+        'span6', 'span7', 'span8', 'span9'
+    ]
+    assert tracer.dropped == 6
+
+
+def test_export_chrome(tmp_path):
+    tracer = Tracer(capacity=2)
+    tracer.enable()
+    for name in ('a', 'b', 'c'):
+        with tracer.span(name):
+            pass
+    trace = json.loads(tracer.export_chrome(tmp_path / 'trace.json').read_text())
+    assert [e['name'] for e in trace['traceEvents']] == ['b', 'c']
+    assert {e['ph'] for e in trace['traceEvents']} == {'X'}
+    assert trace['otherData'] == {'dropped_spans': 1}
+
+
+def busy(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_profiler_samples_calling_thread(tmp_path):
+    tracer = Tracer()
+    tracer.start_profiler(0.001)
+    busy(0.1)
+    path = tracer.stop_profiler(tmp_path / 'profile.folded')
+    lines = path.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert any('test_tracing.busy' in line for line in lines)
+    # Stopped: a second stop is a no-op
+    assert tracer.stop_profiler(tmp_path / 'again.folded') is None
@@ -0,0 +1,164 @@
+"""
+Relay watchdog supervisor
+
+The supervisor loop runs in a thread of the test process here, so the
+forced OFFs can be observed; one test forks the real process.
+"""
+
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from watchdog import RelayWatchdog
+
+
+class RecordingWatchdog(RelayWatchdog):
+    """Supervisor that records forced OFFs instead of driving GPIO"""
+
+    def __init__(self, **kwargs):
+        super().__init__(relay_pin=17, **kwargs)
+        self.forced = []
+
+    def _prepare_process(self):
+        pass
+
+    def _force_off(self, reason=None):
+        self.forced.append(reason)
+
+    def stop(self):
+        # No process to reap
+        if self._write_fd is not None:
+            self._send(self.MSG_QUIT)
+            self._close()
+
+
+@pytest.fixture
+def supervise():
+    started = []
+
+    def supervise(**kwargs):
+        watchdog = RecordingWatchdog(**kwargs)
+        read_fd, watchdog._write_fd = os.pipe()
+        watchdog._report_fd, report_fd = os.pipe()
+        os.set_blocking(watchdog._report_fd, False)
+        thread = threading.Thread(target=watchdog._supervise,
+                                  args=(read_fd, report_fd), daemon=True)
+        thread.start()
+        started.append((watchdog, thread, read_fd, report_fd))
+        return watchdog, thread
+
+    yield supervise
+    for watchdog, thread, read_fd, report_fd in started:
+        watchdog.stop()
+        thread.join(2)
+        os.close(read_fd)
+        os.close(report_fd)
+        watchdog._close_report()
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_missing_heartbeat_forces_off(supervise):
+    watchdog, _ = supervise(heartbeat_timeout=0.05)
+    watchdog.notify_on()
+    assert wait_for(lambda: watchdog.forced)
+    assert 'no heartbeat' in watchdog.forced[0]
+
+
+def test_forced_off_reported_until_next_on(supervise):
+    watchdog, _ = supervise(heartbeat_timeout=0.05)
+    watchdog.notify_on()
+    assert wait_for(watchdog.forced_off)
+    assert watchdog.forced_off()
+    watchdog.notify_on()
+    watchdog.heartbeat()
+    assert not watchdog.forced_off()
+
+
+def test_heartbeats_keep_pump_on(supervise):
+    watchdog, _ = supervise(heartbeat_timeout=0.5)
+    watchdog.notify_on()
+    for _ in range(10):
+        time.sleep(0.05)
+        watchdog.heartbeat()
+    assert watchdog.forced == []
+    assert not watchdog.forced_off()
+
+
+def test_max_on_time_despite_heartbeats(supervise):
+    watchdog, _ = supervise(heartbeat_timeout=0.5, max_on_time=0.2)
+    watchdog.notify_on()
+    deadline = time.monotonic() + 1
+    while not watchdog.forced and time.monotonic() < deadline:
+        time.sleep(0.02)
+        watchdog.heartbeat()
+    assert 'longer than' in watchdog.forced[0]
+
+
+def test_pump_off_needs_no_heartbeat(supervise):
+    watchdog, _ = supervise(heartbeat_timeout=0.05)
+    watchdog.notify_on()
+    watchdog.notify_off()
+    time.sleep(0.15)
+    assert watchdog.forced == []
+
+
+def test_controller_exit_while_on(supervise):
+    watchdog, thread = supervise()
+    watchdog.notify_on()
+    # Controller dies: the pipe closes without a quit message
+    watchdog._close()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert watchdog.forced == ['controller exited unexpectedly']
+
+
+def test_quit_stops_supervisor(supervise):
+    watchdog, thread = supervise()
+    watchdog.stop()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert watchdog.forced == []
+
+
+def test_forked_supervisor_exits_on_stop():
+    watchdog = RelayWatchdog(17)
+    watchdog.start()
+    try:
+        watchdog.notify_on()
+        watchdog.heartbeat()
+        watchdog.notify_off()
+    finally:
+        watchdog.stop()
+    # Reaped by stop()
+    with pytest.raises(ChildProcessError):
+        os.waitpid(watchdog.pid, os.WNOHANG)
+
+
+def test_forked_supervisor_reports_forced_off():
+    watchdog = RelayWatchdog(17, heartbeat_timeout=0.05)
+    watchdog.start()
+    try:
+        watchdog.notify_on()
+        assert wait_for(watchdog.forced_off)
+    finally:
+        watchdog.stop()
+
+
+def test_priority_failure_logged(monkeypatch, caplog):
+    def denied(*args):
+        raise PermissionError(1, 'Operation not permitted')
+
+    monkeypatch.setattr(os, 'sched_setscheduler', denied)
+    monkeypatch.setattr(os, 'nice', denied)
+    monkeypatch.setattr(signal, 'signal', lambda *args: None)
+    RelayWatchdog(17)._prepare_process()
+    assert 'normal priority' in caplog.text
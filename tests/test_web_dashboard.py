@@ -0,0 +1,218 @@
+"""
+Event fan-out, the shared sampler and the SSE stream of the web dashboard
+"""
+
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import web_dashboard
+from web_dashboard import Broadcaster, DashboardHandler, Sampler
+
+
+class Stop(Exception):
+    """Ends Sampler.run() in the scripted broadcaster"""
+
+
+class ScriptedBroadcaster(Broadcaster):
+    """Runs one scripted step per sampler tick, then ends the run loop"""
+
+    def __init__(self, steps=(), **kwargs):
+        super().__init__(**kwargs)
+        self.steps = list(steps)
+        self.events = []
+
+    def wait_for_clients(self, timeout=None):
+        if not self.steps:
+            raise Stop
+        self.steps.pop(0)()
+        return self.client_count > 0
+
+    def publish(self, event, data):
+        self.events.append((event, data))
+        super().publish(event, data)
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    """Controller state seen by the sampler"""
+    state = {'state': 'idle', 'temperature': 20.0}
+    monkeypatch.setattr(web_dashboard.PumpController, 'get_state',
+                        staticmethod(lambda: state['state']))
+    monkeypatch.setattr(web_dashboard.PumpController, 'get_temperature',
+                        staticmethod(lambda *args: state['temperature']))
+    return state
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / 'pump.log'
+    path.write_text('')
+    return path
+
+
+def append(path, lines):
+    with open(path, 'a') as f:
+        f.writelines(f'{line}\n' for line in lines)
+
+
+def logged(events):
+    return [data['line'] for event, data in events if event == 'log']
+
+
+def test_publish_reaches_every_client():
+    broadcaster = Broadcaster()
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    broadcaster.publish('reading', {'temperature': 20.0})
+    assert first.get_nowait() == second.get_nowait() == ('reading', {'temperature': 20.0})
+    broadcaster.unsubscribe(first)
+    broadcaster.unsubscribe(second)
+    assert broadcaster.client_count == 0
+    assert not broadcaster.wait_for_clients(0)
+
+
+def test_slow_client_dropped_others_kept():
+    broadcaster = Broadcaster(client_queue_size=3)
+    slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+    for n in range(4):
+        broadcaster.publish('log', {'line': str(n)})
+        fast.get_nowait()
+    assert broadcaster.client_count == 1
+    assert [slow.get_nowait() for _ in range(3)][-1] is None
+
+
+def test_new_log_lines_follow_the_log(log_file):
+    sampler = Sampler(Broadcaster(), log_file)
+    append(log_file, ['before'])
+    # Starts at the end
+    assert sampler._new_log_lines() == []
+    append(log_file, ['one', 'two'])
+    with open(log_file, 'a') as f:
+        f.write('part')
+    assert sampler._new_log_lines() == ['one', 'two']
+    with open(log_file, 'a') as f:
+        f.write('ial\n')
+    assert sampler._new_log_lines() == ['partial']
+    # Rotated: the new file is read from its start
+    log_file.write_text('new\n')
+    assert sampler._new_log_lines() == ['new']
+
+
+def test_burst_capped_to_newest_lines(log_file):
+    sampler = Sampler(Broadcaster(), log_file, max_log_lines=10)
+    sampler._new_log_lines()
+    append(log_file, [str(n) for n in range(500)])
+    assert sampler._new_log_lines() == [str(n) for n in range(490, 500)]
+    assert sampler._new_log_lines() == []
+
+
+class RecordingStore:
+    def __init__(self):
+        self.readings = []
+
+    def add(self, temp):
+        self.readings.append(temp)
+
+
+@pytest.mark.parametrize('rollups', [None, RecordingStore])
+def test_backlog_while_unwatched_not_sent(controller, log_file, rollups):
+    clients = []
+    steps = [
+        lambda: clients.append(broadcaster.subscribe()),
+        lambda: append(log_file, ['seen']),
+        # Nobody watching while the log grows
+        lambda: broadcaster.unsubscribe(clients.pop()),
+        lambda: append(log_file, [str(n) for n in range(500)]),
+        lambda: clients.append(broadcaster.subscribe()),
+        lambda: append(log_file, ['fresh']),
+    ]
+    broadcaster = ScriptedBroadcaster(steps)
+    store = rollups and rollups()
+    sampler = Sampler(broadcaster, log_file, interval=0, rollup_store=store,
+                      rollup_interval=0)
+    with pytest.raises(Stop):
+        sampler.run()
+    assert logged(broadcaster.events) == ['seen', 'fresh']
+    assert broadcaster.client_count == 1
+    assert None not in list(clients[0].queue)
+    if store:
+        # Readings also while nobody was watching
+        assert len(store.readings) == 6
+
+
+def test_sample_publishes_state_changes_only(controller, log_file):
+    broadcaster = ScriptedBroadcaster()
+    sampler = Sampler(broadcaster, log_file)
+    sampler.sample()
+    sampler.sample()
+    controller['state'] = 'running'
+    controller['temperature'] = 21.5
+    sampler.sample()
+    events = [event for event, _ in broadcaster.events]
+    assert events == ['state', 'reading', 'reading', 'state', 'reading']
+    assert sampler.get_snapshot()['temperature'] == 21.5
+
+
+@pytest.fixture
+def stream(log_file):
+    """Open /events of a dashboard whose sampler has one snapshot"""
+    broadcaster = Broadcaster(client_queue_size=5)
+    sampler = Sampler(broadcaster, log_file)
+    sampler.snapshot = {'state': 'idle', 'temperature': 20.0, 'time': 'now'}
+
+    class Handler(DashboardHandler):
+        pass
+
+    Handler.broadcaster = broadcaster
+    Handler.sampler = sampler
+    Handler.keepalive_interval = 0.05
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    response = urllib.request.urlopen(
+        f"http://127.0.0.1:{server.server_port}/events", timeout=5
+    )
+
+    def read_event():
+        """Next event as (name, data), skipping keepalives"""
+        lines = []
+        while True:
+            line = response.readline().decode('utf-8')
+            if not line:
+                return None
+            if line == '\n':
+                if lines:
+                    event = lines[0].split(': ', 1)[1]
+                    return event, json.loads(lines[1].split(': ', 1)[1])
+                continue
+            if not line.startswith(':'):
+                lines.append(line.rstrip('\n'))
+
+    yield broadcaster, read_event
+    response.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_sends_snapshot_then_events(stream):
+    broadcaster, read_event = stream
+    assert read_event() == ('snapshot', {'state': 'idle', 'temperature': 20.0, 'time': 'now'})
+    assert broadcaster.client_count == 1
+    broadcaster.publish('state', {'state': 'running', 'time': 'later'})
+    assert read_event() == ('state', {'state': 'running', 'time': 'later'})
+
+
+def test_stream_ends_for_dropped_client(stream):
+    broadcaster, read_event = stream
+    read_event()
+    # The handler may drain some of these, enough to overflow either way
+    for n in range(50):
+        broadcaster.publish('log', {'line': str(n)})
+    events = []
+    while (event := read_event()) is not None:
+        events.append(event)
+    assert broadcaster.client_count == 0
+    assert len(events) < 50